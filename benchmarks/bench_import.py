@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_import
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the time needed to import a synthetic library of drivers.
+
+    The library is written in a temporary directory and imported in a fresh
+    interpreter for each docstring extraction policy, ie:
+
+        python benchmarks/bench_import.py --drivers 300 --features 20
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+HEADER = '''# -*- coding: utf-8 -*-
+from lantz_core.has_features import subsystem, channel
+from lantz_core.features import Float, Int, Unicode
+from lantz_core.base_driver import BaseDriver
+
+'''
+
+DRIVER = '''
+
+class Driver{index}(BaseDriver):
+    """Synthetic driver number {index}.
+
+    """
+{features}
+
+    #: Output subsystem.
+    output = subsystem()
+    with output as o:
+{sub_features}
+
+    #: Input channels.
+    inputs = channel((1, 2, 3))
+    with inputs as i:
+{sub_features_i}
+'''
+
+FEATURE = '''    #: Documentation of the feature {name}
+    #: spanning two lines.
+    {name} = {kind}('{cmd}?', '{cmd} {{}}'{extra})
+'''
+
+KINDS = (('Float', ", unit='V', limits=(0, 10)"), ('Int', ''),
+         ('Unicode', ", values=('A', 'B')"))
+
+SCRIPT = '''
+import sys, time
+sys.path.insert(0, {path!r})
+from lantz_core import has_features
+has_features.DOC_EXTRACTION = {policy!r}
+t = time.time()
+for i in range({modules}):
+    __import__('bench_drivers_%d' % i)
+print(time.time() - t)
+'''
+
+
+def make_features(count, indent=''):
+    lines = []
+    for i in range(count):
+        kind, extra = KINDS[i % len(KINDS)]
+        lines.append(FEATURE.format(name='feat{}'.format(i), kind=kind,
+                                    cmd='FEAT{}'.format(i), extra=extra))
+    return '\n'.join(indent + l.replace('\n    ', '\n    ' + indent)
+                     for l in lines)
+
+
+def write_library(path, drivers, features, per_module=25):
+    """Write the synthetic drivers library and return the number of modules.
+
+    """
+    feats = make_features(features)
+    sub_feats = make_features(max(features // 4, 1), '    ')
+    sub_feats_o = sub_feats.replace('    feat', '    o.feat')
+    sub_feats_i = sub_feats.replace('    feat', '    i.feat')
+    modules = 0
+    for start in range(0, drivers, per_module):
+        name = os.path.join(path, 'bench_drivers_{}.py'.format(modules))
+        with open(name, 'w') as f:
+            f.write(HEADER)
+            for index in range(start, min(start + per_module, drivers)):
+                f.write(DRIVER.format(index=index, features=feats,
+                                      sub_features=sub_feats_o,
+                                      sub_features_i=sub_feats_i))
+        modules += 1
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--drivers', type=int, default=300)
+    parser.add_argument('--features', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE='1')
+    try:
+        modules = write_library(path, args.drivers, args.features)
+        print('Importing {} drivers with {} features each'.format(
+            args.drivers, args.features))
+        for policy in ('eager', 'lazy', None):
+            script = SCRIPT.format(path=path, policy=policy, modules=modules)
+            timings = [float(subprocess.check_output([sys.executable, '-c',
+                                                      script], env=env))
+                       for _ in range(args.repeat)]
+            print('{:>6}: {:.3f} s (best of {})'.format(str(policy),
+                                                      min(timings),
+                                                      args.repeat))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
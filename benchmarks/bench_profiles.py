@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_profiles
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the time needed to restore a configuration profile.
+
+    A synthetic driver whose every exchange with the instrument costs a fixed
+    latency is restored from a profile in which a fraction of the values
+    differs from the instrument state, ie:
+
+        python benchmarks/bench_profiles.py --features 300 --changed 0.1
+
+    The naive restoration setting the Features one by one is compared to
+    restore_profile using the cache (diff) and writing all the values in
+    batches (force).
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+from time import sleep, time
+from threading import RLock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lantz_core.features import Float, Int
+from lantz_core.has_features import HasFeatures, subsystem, channel
+from lantz_core.profiles import loads
+
+
+def make_driver(features, latency):
+    """Create a driver class whose exchanges take latency seconds.
+
+    Half the Features live on the driver, a quarter in a subsystem and the
+    last quarter is split between the two channels.
+
+    """
+    class Instrument(HasFeatures):
+
+        def __init__(self):
+            super(Instrument, self).__init__(True)
+            self.lock = RLock()
+            self.state = {}
+            self.exchanges = 0
+
+        def _exchange(self):
+            self.exchanges += 1
+            sleep(latency)
+
+        def default_get_feature(self, feat, cmd, *args, **kwargs):
+            self._exchange()
+            return self.state.get(self._key(cmd, kwargs), 0)
+
+        def default_get_features(self, requests):
+            self._exchange()
+            return [self.state.get(self._key(cmd, kw), 0)
+                    for _, cmd, kw in requests]
+
+        def default_set_feature(self, feat, cmd, *args, **kwargs):
+            self._exchange()
+            self.state[self._key(cmd, kwargs)] = args[0]
+
+        def default_set_features(self, requests):
+            self._exchange()
+            for _, cmd, value, kw in requests:
+                self.state[self._key(cmd, kw)] = value
+            return [None]*len(requests)
+
+        def default_check_operation(self, feat, value, i_value, response):
+            return True, None
+
+        def _key(self, cmd, kwargs):
+            return cmd.split(' ')[0].rstrip('?'), kwargs.get('id')
+
+    namespace = {}
+    main = features//2
+    part = max(features//4, 1)
+    for i in range(main):
+        kind = Float if i % 2 else Int
+        namespace['feat{}'.format(i)] = kind('FEAT{}?'.format(i),
+                                             'FEAT{} {{}}'.format(i))
+    cls = type(Instrument)(str('Bench'), (Instrument,), namespace)
+
+    class Driver(cls):
+        output = subsystem()
+        with output as o:
+            for i in range(part):
+                setattr(o, 'feat{}'.format(i),
+                        Float('OUT{}?'.format(i), 'OUT{} {{}}'.format(i)))
+
+        inputs = channel((1, 2))
+        with inputs as c:
+            for i in range(part//2):
+                setattr(c, 'feat{}'.format(i),
+                        Int('IN{}?'.format(i), 'IN{} {{}}'.format(i)))
+
+    return Driver
+
+
+def change(values, fraction):
+    """Modify a fraction of the values of a profile in place.
+
+    """
+    leaves = []
+
+    def walk(d):
+        for k, v in d.items():
+            if isinstance(v, dict):
+                walk(v)
+            else:
+                leaves.append((d, k))
+
+    walk(values)
+    step = max(int(1/fraction), 1) if fraction else len(leaves) + 1
+    for d, k in leaves[::step]:
+        d[k] = d[k] + 1
+    return len(leaves[::step])
+
+
+def naive_restore(driver, values):
+    """Set the values one by one.
+
+    """
+    for name, value in values.items():
+        if name in driver.__subsystems__:
+            naive_restore(getattr(driver, name), value)
+        elif name in driver.__channels__:
+            cont = getattr(driver, name)
+            for ch_id, ch_values in value.items():
+                naive_restore(cont[ch_id], ch_values)
+        else:
+            setattr(driver, name, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--features', type=int, default=300)
+    parser.add_argument('--changed', type=float, default=0.1)
+    parser.add_argument('--latency', type=float, default=0.001)
+    args = parser.parse_args()
+
+    driver = make_driver(args.features, args.latency)()
+    path = tempfile.mkdtemp()
+    try:
+        profile_path = os.path.join(path, 'profile.lzp')
+        driver.save_profile(profile_path)
+        with open(profile_path, 'rb') as f:
+            data = f.read()
+        profile = loads(data)['values']
+        changed = change(profile, args.changed)
+        print('Profile of {} bytes, {} values changed, {} s per exchange'
+              .format(len(data), changed, args.latency))
+
+        def run(label, restore):
+            # Reset the instrument state and warm the cache.
+            driver.apply_state(loads(data)['values'], force=True)
+            driver.clear_cache()
+            driver.snapshot()
+            driver.exchanges = 0
+            t = time()
+            restore()
+            print('{:>14}: {:.3f} s, {} exchanges'.format(
+                label, time() - t, driver.exchanges))
+
+        run('naive', lambda: (driver.clear_cache(),
+                              naive_restore(driver, profile)))
+        run('diff', lambda: driver.apply_state(profile))
+        run('force', lambda: driver.apply_state(profile, force=True))
+        run('diff (cold)', lambda: (driver.clear_cache(),
+                                    driver.apply_state(profile)))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
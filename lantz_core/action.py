@@ -12,16 +12,29 @@
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 
+from collections import namedtuple
+from threading import Lock
+from timeit import default_timer
 from past.builtins import basestring
+from future.utils import exec_
 from functools import update_wrapper, partial
-from types import MethodType
 
 from funcsigs import signature
 
 from .limits import IntLimitsValidator, FloatLimitsValidator
-from .unit import UNIT_SUPPORT, get_unit_registry
+from .unit import unit_support, get_unit_registry, is_quantity, magnitude_in
 from .util import (build_checker, validate_in, validate_limits,
-                   get_limits_and_validate)
+                   get_limits_and_validate, parse_wait, complete_operation,
+                   start_operation)
+
+
+#: Prefix of the driver methods implementing a batched version of an Action.
+MAP_PREFIX = '_map_'
+
+
+#: Result of Action.map. timings is None if the calls were batched.
+ActionMapResult = namedtuple('ActionMapResult',
+                             ['results', 'timings', 'elapsed'])
 
 
 class Action(object):
@@ -55,6 +68,21 @@ class Action(object):
         can a be a tuple of length 2, or 3 (min, max, step) or the name of
         the limits to use to check the input.
 
+    cache : bool, optional
+        Whether the results of the action should be cached on the driver,
+        keyed by the arguments. This should be used only for actions whose
+        result does not change during the session (identification, options,
+        ...). The cached results are discarded by the driver clear_cache
+        and clear_action_cache methods (the action name can be used as a
+        feature name, and hence in the discard argument of Features).
+
+    wait : unicode or dict, optional
+        Wait for the instrument to complete the operation started by the
+        action before returning. The only supported mode is 'opc' (see
+        HasFeatures.arm_operation_complete), which can be passed as is or as a
+        dictionary specifying the 'mode' and the 'timeout' in seconds. The
+        start method of the bound action returns a Future instead of waiting.
+
     Notes
     -----
     A single argument should be value checked or limit checked but not both,
@@ -63,6 +91,15 @@ class Action(object):
     same unit as the one used by the limits.
 
     """
+    #: Parsed units used by the fast unit support (see add_unit_support).
+    _unit_info = None
+
+    #: Whether unit conversion relies on UnitRegistry.wraps.
+    _pint_units = False
+
+    #: Parsed wait argument (see parse_wait) or None.
+    _wait = None
+
     def __init__(self, **kwargs):
 
         self.kwargs = kwargs
@@ -70,13 +107,113 @@ class Action(object):
     def __call__(self, func):
         update_wrapper(self, func)
         self.sig = signature(func)
+        self.raw_func = func
+        self._validators = {}
+        self._map_call = None
+        self._map_check = None
         self.func = self.decorate(func, self.kwargs)
         return self
 
     def __get__(self, obj, objtype=None):
         if obj is None:
             return self
-        return MethodType(self.func, obj)
+        return BoundAction(self, obj)
+
+    def map(self, driver, **arrays):
+        """Call the action for each set of values of the passed arrays.
+
+        Arguments are validated (values, limits) and converted to the
+        declared units once for all the calls, NumPy arrays being validated
+        in a vectorized fashion. The calls are then performed while holding
+        the driver lock. If the driver implements a batched version of the
+        action (a method named _map_<action name> taking the arrays as
+        keywords and returning the list of results) it is used instead of
+        calling the action repeatedly. Actions declared with wait wait only
+        once, after the last call, for the completion of the operations.
+
+        Parameters
+        ----------
+        driver : HasFeatures
+            Driver on which to call the action.
+
+        **arrays
+            Sequences of values for each argument to map. Scalars are used for
+            all calls.
+
+        Returns
+        -------
+        result : ActionMapResult
+            Named tuple containing the list of results, the duration of each
+            call (None if the calls were batched) and the total duration.
+
+        """
+        n = None
+        scalars = {}
+        for name, values in arrays.items():
+            if isinstance(values, basestring):
+                length = None
+            else:
+                try:
+                    length = len(values)
+                except TypeError:
+                    length = None
+            if length is None:
+                scalars[name] = values
+            elif n is None:
+                n = length
+            elif length != n:
+                msg = 'All mapped arguments must have the same length'
+                raise ValueError(msg)
+        if n is None:
+            raise ValueError('At least one argument should be a sequence.')
+        for name, value in scalars.items():
+            arrays[name] = [value]*n
+
+        if self._pint_units or self.kwargs.get('cache'):
+            # Each call goes through the whole chain of wrappers (except the
+            # wait which is performed once at the end).
+            return self._map_calls(driver, self._unwaited, arrays, n, None)
+
+        if self._unit_info is not None:
+            if not self._unit_info:
+                self._parse_units()
+            _, named_units, ret_unit, quantity = self._unit_info
+            for name, values in arrays.items():
+                unit = named_units.get(name)
+                if unit is None:
+                    continue
+                if is_quantity(values):
+                    arrays[name] = magnitude_in(values, unit)
+                elif any(is_quantity(v) for v in values):
+                    arrays[name] = [magnitude_in(v, unit)
+                                    if is_quantity(v) else v
+                                    for v in values]
+        else:
+            ret_unit = None
+
+        for name, validator in self._validators.items():
+            if name in arrays:
+                self._validate_many(driver, name, validator, arrays[name])
+
+        checks = self.kwargs.get('checks')
+        if self._map_call is None:
+            self._map_call = (self.add_validation(self.raw_func, {}, checks)
+                              if checks else self.raw_func)
+
+        batched = getattr(driver, MAP_PREFIX + self.__name__, None)
+        if batched is not None and checks:
+            # The batched method bypasses the action so the checks are run
+            # on each set of arguments before calling it.
+            if self._map_check is None:
+                self._map_check = self.add_validation(_no_call, {}, checks)
+            batched = partial(self._check_batch, driver, batched)
+
+        res = self._map_calls(driver, self._map_call, arrays, n, batched)
+        if ret_unit is not None:
+            res = ActionMapResult([quantity(r, ret_unit)
+                                   for r in res.results],
+                                  res.timings, res.elapsed)
+        return res
 
     def decorate(self, func, kwargs):
         """Decorate a function according to passed arguments.
@@ -84,26 +221,203 @@ class Action(object):
         Override this function to alter how
 
         """
+        validators = {}
         if 'limits' in kwargs or 'values' in kwargs:
-            func = self.add_values_limits_validation(func,
-                                                     kwargs.get('values', {}),
-                                                     kwargs.get('limits', {})
-                                                     )
+            validators = self.build_validators(kwargs.get('values', {}),
+                                               kwargs.get('limits', {}))
 
-        if 'checks' in kwargs:
-            func = self.add_checks(func, kwargs['checks'])
+        self._validators = validators
+        if validators or 'checks' in kwargs:
+            func = self.add_validation(func, validators,
+                                       kwargs.get('checks'))
 
-        if UNIT_SUPPORT and 'units' in kwargs:
+        if unit_support() and 'units' in kwargs:
             func = self.add_unit_support(func, kwargs['units'])
 
+        if kwargs.get('cache'):
+            func = self.add_cache(func)
+
+        # The calls performed by map wait only once for all the operations.
+        self._unwaited = func
+        if kwargs.get('wait'):
+            self._wait = parse_wait(kwargs['wait'])
+            func = self.add_wait(func, self._wait)
+
         return func
 
+    def add_wait(self, func, wait):
+        """Wait for the completion of the operation after calling func.
+
+        When called through BoundAction.start the wait is recorded to be
+        performed in a background thread.
+
+        """
+        timeout = wait['timeout']
+
+        def wait_wrapper(driver, *args, **kwargs):
+            with driver.lock:
+                res = func(driver, *args, **kwargs)
+                wait = driver.arm_operation_complete()
+            complete_operation(wait, timeout)
+            return res
+
+        update_wrapper(wait_wrapper, func)
+        return wait_wrapper
+
+    def add_cache(self, func):
+        """Cache the results of the calls on the driver.
+
+        The results are stored in the action cache of the driver under the
+        action name as a dictionary whose keys are the values of the
+        parameters (defaults included, so that equivalent calls share the
+        same entry) and which also counts the hits and misses (see
+        BoundAction.cache_stats). Calls with unhashable arguments are not
+        cached.
+
+        """
+        name = self.__name__
+        sig = self.sig
+        params = list(sig.parameters.values())[1:]
+
+        def make_key(driver, args, kwargs):
+            arguments = sig.bind(driver, *args, **kwargs).arguments
+            key = []
+            for p in params:
+                if p.name in arguments:
+                    value = arguments[p.name]
+                elif p.kind == p.VAR_POSITIONAL:
+                    value = ()
+                elif p.kind == p.VAR_KEYWORD:
+                    value = {}
+                else:
+                    value = p.default
+                if p.kind == p.VAR_KEYWORD:
+                    value = frozenset(value.items())
+                key.append(value)
+            key = tuple(key)
+            hash(key)
+            return key
+
+        def cache_wrapper(driver, *args, **kwargs):
+            if not driver.use_cache:
+                return func(driver, *args, **kwargs)
+            try:
+                key = make_key(driver, args, kwargs)
+            except TypeError:
+                # Unhashable arguments or invalid call, in the later case
+                # calling the function raises the proper error.
+                return func(driver, *args, **kwargs)
+
+            cache = driver._action_cache.get(name)
+            if cache is not None and key in cache:
+                return cache.hit(key)
+
+            with driver.lock:
+                cache = driver._action_cache.get(name)
+                if cache is None:
+                    cache = driver._action_cache[name] = _CachedResults()
+                elif key in cache:
+                    return cache.hit(key)
+                res = func(driver, *args, **kwargs)
+                cache.misses += 1
+                cache[key] = res
+
+            return res
+
+        update_wrapper(cache_wrapper, func)
+        return cache_wrapper
+
     def add_unit_support(self, func, units):
+        """Wrap a func to automatically convert Quantity.
+
+        Quantities are converted using the cached conversion factors and Pint
+        is not involved when only plain numbers are passed (apart from
+        building the returned Quantity). Declarations using features only
+        supported by Pint (units referring to other arguments, multiple
+        return values, Quantity as default values) fall back on
+        UnitRegistry.wraps.
+
+        """
+        ret, args_units = units
+        if isinstance(args_units, (list, tuple)):
+            args_units = tuple(args_units)
+        else:
+            args_units = (args_units,)
+        params = list(self.sig.parameters.values())
+
+        declared = args_units + (ret if isinstance(ret, (list, tuple))
+                                 else (ret,))
+        if (isinstance(ret, (list, tuple)) or
+                any(isinstance(u, basestring) and '=' in u
+                    for u in declared) or
+                any(is_quantity(p.default) for p in params)):
+            return self._add_pint_unit_support(func, units)
+
+        # Units are parsed on first call to avoid creating the UnitRegistry
+        # when the driver class is declared.
+        parsed = self._unit_info = []
+
+        def parse_units():
+            try:
+                ureg = get_unit_registry()
+            except ImportError:
+                # Pint cannot be used, the values are passed as is.
+                parsed[:] = [[], {}, None, None]
+                return
+
+            def parse(u):
+                return ureg.parse_units(u) if isinstance(u, basestring) else u
+
+            pos_units = [parse(u) if u is not None else None
+                         for u in args_units]
+            ret_unit = parse(ret) if ret is not None else None
+            parsed[:] = [pos_units,
+                         dict(zip((p.name for p in params), pos_units)),
+                         ret_unit, ureg.Quantity]
+        self._parse_units = parse_units
+
+        def unit_wrapper(*args, **kwargs):
+            if not parsed:
+                parse_units()
+            pos_units, named_units, ret_unit, quantity = parsed
+
+            if any(is_quantity(a) for a in args):
+                args = [magnitude_in(a, pos_units[i])
+                        if (i < len(pos_units) and pos_units[i] is not None and
+                            is_quantity(a))
+                        else a
+                        for i, a in enumerate(args)]
+            for k, v in kwargs.items():
+                if named_units.get(k) is not None and is_quantity(v):
+                    kwargs[k] = magnitude_in(v, named_units[k])
+
+            res = func(*args, **kwargs)
+            return res if ret_unit is None else quantity(res, ret_unit)
+
+        update_wrapper(unit_wrapper, func)
+        return unit_wrapper
+
+    def _add_pint_unit_support(self, func, units):
         """Wrap a func using Pint to automatically convert Quantity.
 
         """
-        ureg = get_unit_registry()
-        return ureg.wraps(*units, strict=False)(func)
+        # The wrapper is built on first call to avoid creating the
+        # UnitRegistry when the driver class is declared.
+        wrapped = []
+        self._pint_units = True
+
+        def unit_wrapper(*args, **kwargs):
+            if not wrapped:
+                try:
+                    ureg = get_unit_registry()
+                except ImportError:
+                    # Pint cannot be used, the values are passed as is.
+                    wrapped.append(func)
+                else:
+                    wrapped.append(ureg.wraps(*units, strict=False)(func))
+            return wrapped[0](*args, **kwargs)
+        update_wrapper(unit_wrapper, func)
+        return unit_wrapper
 
     def add_checks(self, func, checks):
         """Build a checker function and use it to decorate func.
@@ -122,13 +436,7 @@ class Action(object):
             Function wrapped with the assertion checks.
 
         """
-        check = build_checker(checks, self.sig)
-
-        def check_wrapper(*args, **kwargs):
-            check(*args, **kwargs)
-            return func(*args, **kwargs)
-        update_wrapper(check_wrapper, func)
-        return check_wrapper
+        return self.add_validation(func, {}, checks)
 
     def add_values_limits_validation(self, func, values, limits):
         """Add arguments validation to call.
@@ -146,14 +454,35 @@ class Action(object):
             Dictionary mapping the parameters name to the limits they must
             abide by.
 
-        units : dict
-            Dictionary mapping
-
         Returns
         -------
         wrapped : callable
             Function wrapped with the parameters validation.
 
+        """
+        return self.add_validation(func,
+                                   self.build_validators(values, limits))
+
+    def build_validators(self, values, limits):
+        """Build the validators of the arguments.
+
+        Parameters
+        ----------
+        values : dict
+            Dictionary mapping the parameters name to the set of allowed
+            values.
+
+        limits : dict
+            Dictionary mapping the parameters name to the limits they must
+            abide by.
+
+        Returns
+        -------
+        validators : dict
+            Dictionary mapping the parameters name to a function taking the
+            driver and the value as argument and raising if the value is
+            invalid.
+
         """
         validators = {}
         for name, vals in values.items():
@@ -181,10 +510,101 @@ class Action(object):
                 msg = 'Invalid type for limits values (key {}) : {}'
                 raise TypeError(msg.format(name, type(lims)))
 
+        return validators
+
+    def add_validation(self, func, validators, checks=None):
+        """Wrap a function in a single wrapper validating the arguments.
+
+        The wrapper is generated with the same parameters as the wrapped
+        function so that the arguments are bound by the interpreter itself
+        and the checks and validators are run inline. Signatures which cannot
+        be reproduced fall back on binding the arguments at each call.
+
+        Parameters
+        ----------
+        func : callable
+            Function to decorate.
+
+        validators : dict
+            Dictionary mapping the parameters name to their validator (see
+            build_validators).
+
+        checks : unicode, optional
+            ; separated string of expression to assert. The checks are run
+            before the validators.
+
+        Returns
+        -------
+        wrapped : callable
+            Function wrapped with the parameters validation.
+
+        """
+        params = list(self.sig.parameters.values())
+        if not params or params[0].kind != params[0].POSITIONAL_OR_KEYWORD:
+            return self._add_bound_validation(func, validators, checks)
+
+        namespace = {'_lantz_func_': func}
+        decl = []
+        call = []
+        kw_only_marker = True
+        for p in params:
+            if p.kind == p.POSITIONAL_OR_KEYWORD:
+                call.append(p.name)
+            elif p.kind == p.VAR_POSITIONAL:
+                kw_only_marker = False
+                decl.append('*' + p.name)
+                call.append('*' + p.name)
+                continue
+            elif p.kind == p.KEYWORD_ONLY:
+                if kw_only_marker:
+                    decl.append('*')
+                    kw_only_marker = False
+                call.append('{0}={0}'.format(p.name))
+            elif p.kind == p.VAR_KEYWORD:
+                decl.append('**' + p.name)
+                call.append('**' + p.name)
+                continue
+            else:
+                return self._add_bound_validation(func, validators, checks)
+
+            if p.default is not p.empty:
+                namespace['_lantz_default_' + p.name] = p.default
+                decl.append('{0}=_lantz_default_{0}'.format(p.name))
+            else:
+                decl.append(p.name)
+
+        driver = params[0].name
+        body = []
+        if checks:
+            # All the parameters are passed as plain arguments so that *args
+            # and **kwargs are seen by the checks as a tuple and a dict.
+            names = ', '.join(p.name for p in params)
+            namespace['_lantz_check_'] = build_checker(checks,
+                                                       '({})'.format(names))
+            body.append('    _lantz_check_({})'.format(names))
+        for name in validators:
+            namespace['_lantz_validate_' + name] = validators[name]
+            body.append('    _lantz_validate_{0}({1}, {0})'.format(name,
+                                                                  driver))
+        body.append('    return _lantz_func_({})'.format(', '.join(call)))
+
+        func_def = ('def action_wrapper({}):\n'.format(', '.join(decl)) +
+                    '\n'.join(body) + '\n')
+        exec_(func_def, namespace)
+        wrapper = namespace['action_wrapper']
+        update_wrapper(wrapper, func)
+        return wrapper
+
+    def _add_bound_validation(self, func, validators, checks):
+        """Validate the arguments by binding them at each call.
+
+        """
         sig = self.sig
+        check = build_checker(checks, sig) if checks else None
 
         def wrapper(*args, **kwargs):
-
+            if check:
+                check(*args, **kwargs)
             bound = sig.bind(*args, **kwargs).arguments
             driver = args[0]
             for n in validators:
@@ -194,3 +614,213 @@ class Action(object):
 
         update_wrapper(wrapper, func)
         return wrapper
+
+    def _validate_many(self, driver, name, validator, values):
+        """Validate all the values of an argument.
+
+        """
+        invalid = None
+        if isinstance(validator, partial):
+            func, kwargs = validator.func, validator.keywords
+            if func is validate_in:
+                allowed = kwargs['values']
+                invalid = [i for i, v in enumerate(values)
+                           if v not in allowed]
+            elif func is validate_limits:
+                invalid = kwargs['limits'].validate_many(values)
+            elif func is get_limits_and_validate:
+                limits = driver.get_limits(kwargs['limits'])
+                invalid = limits.validate_many(values)
+
+        if invalid is None:
+            invalid = range(len(values))
+
+        for i in invalid:
+            try:
+                validator(driver, values[i])
+            except ValueError as e:
+                msg = 'Invalid value for {} in call {}: {}'
+                raise ValueError(msg.format(name, i, e))
+
+    def _check_batch(self, driver, batched, **arrays):
+        """Run the checks on each set of arguments and call batched.
+
+        """
+        names = list(arrays)
+        columns = [arrays[k] for k in names]
+        for i in range(len(columns[0])):
+            try:
+                self._map_check(driver, **{k: c[i] for k, c
+                                           in zip(names, columns)})
+            except AssertionError as e:
+                raise AssertionError('Call {}: {}'.format(i, e))
+        return batched(**arrays)
+
+    def _map_calls(self, driver, func, arrays, n, batched):
+        """Perform the calls of map while holding the driver lock.
+
+        If the action waits for the completion of the operation, the
+        instrument is armed once after the last call and the wait happens
+        after releasing the lock.
+
+        """
+        wait = None
+        with driver.lock:
+            start = default_timer()
+            if batched is not None:
+                results = list(batched(**arrays))
+                timings = None
+            else:
+                results = []
+                timings = []
+                names = list(arrays)
+                columns = [arrays[k] for k in names]
+                for i in range(n):
+                    t = default_timer()
+                    results.append(func(driver, **{k: c[i] for k, c
+                                                   in zip(names, columns)}))
+                    timings.append(default_timer() - t)
+
+            if self._wait is not None:
+                wait = driver.arm_operation_complete()
+
+        if wait is not None:
+            complete_operation(wait, self._wait['timeout'])
+        return ActionMapResult(results, timings, default_timer() - start)
+
+
+def _no_call(*args, **kwargs):
+    """Function wrapped by the checks run before a batched call.
+
+    """
+    pass
+
+
+class _CachedResults(dict):
+    """Results of an Action cached on a driver, keyed by the arguments.
+
+    The misses are counted while holding the driver lock. As hits do not
+    require it, they are counted under a lock of their own.
+
+    """
+    __slots__ = ('hits', 'misses', '_lock')
+
+    def __init__(self):
+        super(_CachedResults, self).__init__()
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def hit(self, key):
+        """Access a cached result and count the hit.
+
+        """
+        with self._lock:
+            self.hits += 1
+        return self[key]
+
+
+class BoundAction(object):
+    # The docstring is forwarded from the action so that help and the
+    # documentation tools see the action one. Calling the bound action calls
+    # the action, map gives access to Action.map.
+    __slots__ = ('action', 'driver')
+
+    def __init__(self, action, driver):
+        self.action = action
+        self.driver = driver
+
+    def __repr__(self):
+        return '<bound action {} of {!r}>'.format(self.action.__name__,
+                                                  self.driver)
+
+    def __get__(self, obj, objtype=None):
+        # Being a descriptor makes the bound action a routine for inspect,
+        # so that pydoc documents it as such.
+        return self
+
+    def __eq__(self, other):
+        return (isinstance(other, BoundAction) and
+                other.action is self.action and other.driver is self.driver)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.action, id(self.driver)))
+
+    def __call__(self, *args, **kwargs):
+        return self.action.func(self.driver, *args, **kwargs)
+
+    def map(self, **arrays):
+        """Call the action for each set of values of the passed arrays.
+
+        See Action.map for details.
+
+        """
+        return self.action.map(self.driver, **arrays)
+
+    def start(self, *args, **kwargs):
+        """Call the action without waiting for the operation to complete.
+
+        The commands are sent before returning but the wait for the
+        completion of the operation (see the wait argument of Action) is
+        performed in a background thread. On Python 2 this requires the
+        futures backport.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future whose result is the value returned by the action, set once
+            the operation is complete.
+
+        """
+        return start_operation(self.action.func, self.driver, *args,
+                               **kwargs)
+
+    @property
+    def cache_stats(self):
+        """Number of hits and misses of the cache of the action on the driver.
+
+        None if the action does not cache its results. The counts are reset
+        when the cache of the action is cleared.
+
+        """
+        if not self.action.kwargs.get('cache'):
+            return None
+        cache = self.driver._action_cache.get(self.action.__name__)
+        if cache is None:
+            return {'hits': 0, 'misses': 0}
+        return {'hits': cache.hits, 'misses': cache.misses}
+
+    @property
+    def __doc__(self):
+        return self.action.__doc__
+
+    @property
+    def __name__(self):
+        return self.action.__name__
+
+    @property
+    def __wrapped__(self):
+        return self.action.raw_func
+
+    @property
+    def __signature__(self):
+        """Signature of the action without the driver parameter (Python 3).
+
+        """
+        try:
+            from inspect import signature as inspect_signature
+        except ImportError:
+            return None
+        sig = inspect_signature(self.action.raw_func)
+        return sig.replace(parameters=list(sig.parameters.values())[1:])
+
+    @property
+    def __self__(self):
+        return self.driver
+
+    @property
+    def __func__(self):
+        return self.action.func
@@ -15,7 +15,10 @@ from __future__ import (division, unicode_literals, print_function,
 import os
 import logging
 from inspect import cleandoc
-from time import sleep
+from functools import partial
+from string import Formatter
+from threading import Event
+from time import sleep, time
 from future.builtins import str
 from future.utils import raise_with_traceback
 
@@ -30,9 +33,10 @@ except ImportError:
     raise_with_traceback(ImportError(msg))
 
 from ..base_driver import BaseDriver
-from ..util import byte_to_dict
+from ..util import poll_until
 from ..action import Action
 from ..errors import InterfaceNotSupported, TimeoutError
+from ..features.register import register_value_class
 
 
 _RESOURCE_MANAGERS = None
@@ -316,7 +320,7 @@ class BaseVisaDriver(BaseDriver):
         A VISA clear command is issued after re-opening the connection to make
         sure the instrument queues do not keep corrupted data. This might be
         an issue with some instruments in such a case simply override this
-        method.
+        method. The results cached by the actions are discarded.
 
         """
         self.finalize()
@@ -324,6 +328,7 @@ class BaseVisaDriver(BaseDriver):
         self._resource.clear()
         # Make sure the clear command completed before sending more commands.
         sleep(0.3)
+        self.clear_action_cache()
 
     # --- Pyvisa wrappers
 
@@ -368,6 +373,169 @@ class BaseVisaDriver(BaseDriver):
                                          user_handle)
 
 
+def _escape(string):
+    """Escape the braces of a string used as a format string.
+
+    """
+    return string.replace('{', '{{').replace('}', '}}')
+
+
+def _unescape(string):
+    """Revert _escape.
+
+    """
+    return string.replace('{{', '{').replace('}}', '}')
+
+
+class CommandTemplate(object):
+    """Command string pre-processed to be formatted and encoded quickly.
+
+    The keyword fields (such as the channel id) are substituted once for all
+    when the template is built. The remaining positional fields are formatted
+    on each call. When a single positional field remains (typically the value
+    of a setter) the parts of the command surrounding it are encoded once and
+    only the value is formatted and encoded on each call.
+
+    Parameters
+    ----------
+    cmd : unicode
+        Command string, using the str.format syntax.
+
+    kwargs : dict
+        Keyword arguments to substitute in the command.
+
+    Attributes
+    ----------
+    message : unicode or None
+        Fully formatted command if no positional field remains.
+
+    """
+    __slots__ = ('message', '_fmt', '_prefix', '_suffix', '_conv', '_spec',
+                 '_encoding_key', '_b_prefix', '_b_suffix')
+
+    def __init__(self, cmd, kwargs):
+        self.message = None
+        self._fmt = None
+        self._prefix = self._suffix = self._conv = self._spec = None
+        self._encoding_key = None
+
+        parts = []
+        fields = []
+        auto_index = 0
+        for literal, field, spec, conv in Formatter().parse(cmd):
+            parts.append(_escape(literal))
+            if field is None:
+                continue
+            if spec and '{' in spec:
+                # Nested fields are too rare to deserve a special treatment.
+                self._fmt = partial(cmd.format, **kwargs)
+                return
+            first = field.split('.', 1)[0].split('[', 1)[0]
+            field_str = ('{' + field + ('!' + conv if conv else '') +
+                         (':' + spec if spec else '') + '}')
+            if not first.isdigit() and first:
+                field_str = field_str.format(**kwargs)
+                parts.append(_escape(field_str))
+                continue
+            if not first:
+                field_str = field_str.replace('{', '{%d' % auto_index, 1)
+                auto_index += 1
+            parts.append(field_str)
+            fields.append((len(parts) - 1, field, first, conv, spec))
+
+        fmt = ''.join(parts)
+        if not fields:
+            self.message = _unescape(fmt)
+        elif (len(fields) == 1 and fields[0][1] in ('', '0') and
+                fields[0][3] in (None, 's', 'r')):
+            i = fields[0][0]
+            self._prefix = _unescape(''.join(parts[:i]))
+            self._suffix = _unescape(''.join(parts[i+1:]))
+            self._conv = {None: None, 's': str, 'r': repr}[fields[0][3]]
+            self._spec = fields[0][4] or ''
+        else:
+            self._fmt = fmt.format
+
+    def format(self, *args):
+        """Build the command string using the provided positional arguments.
+
+        """
+        if self.message is not None:
+            return self.message
+        if self._fmt is not None:
+            return self._fmt(*args)
+        value = args[0]
+        if self._conv:
+            value = self._conv(value)
+        return self._prefix + format(value, self._spec) + self._suffix
+
+    def encode(self, encoding, termination, *args):
+        """Build the bytes to send to the instrument.
+
+        Parameters
+        ----------
+        encoding : unicode
+            Encoding to use.
+
+        termination : unicode
+            Termination to append to the command.
+
+        *args :
+            Positional arguments to use to format the command.
+
+        """
+        if self._fmt is not None:
+            return (self._fmt(*args) + termination).encode(encoding)
+
+        key = (encoding, termination)
+        if key != self._encoding_key:
+            if self.message is not None:
+                self._b_prefix = (self.message + termination).encode(encoding)
+            else:
+                self._b_prefix = self._prefix.encode(encoding)
+                self._b_suffix = (self._suffix + termination).encode(encoding)
+            self._encoding_key = key
+
+        if self.message is not None:
+            return self._b_prefix
+
+        value = args[0]
+        if self._conv:
+            value = self._conv(value)
+        return (self._b_prefix + format(value, self._spec).encode(encoding) +
+                self._b_suffix)
+
+
+def compact_scpi(commands):
+    """Join SCPI commands in a single program message using relative headers.
+
+    After a ';' an instrument interprets a header not starting with ':'
+    relatively to the path of the previous header. This is used to shorten
+    the commands sharing the beginning of their path, ie
+    [':SOUR:VOLT:LEV?', ':SOUR:VOLT:OFFS?'] becomes 'SOUR:VOLT:LEV?;OFFS?'.
+    Commands without a leading ':' are considered relative to the root and
+    common commands (starting with '*') do not affect the path.
+
+    """
+    parts = []
+    path = []
+    for cmd in commands:
+        if cmd.startswith('*'):
+            parts.append(cmd)
+            continue
+        header, sep, args = cmd.partition(' ')
+        nodes = header.lstrip(':').split(':')
+        n = len(path)
+        if nodes[:n] == path and len(nodes) > n:
+            header = ':'.join(nodes[n:])
+        else:
+            header = ':' + ':'.join(nodes)
+        parts.append(header + sep + args)
+        path = nodes[:-1]
+
+    return ';'.join(parts)
+
+
 class VisaMessageDriver(BaseVisaDriver):
     """Base class for driver communicating using VISA through text based
     messages.
@@ -395,9 +563,201 @@ class VisaMessageDriver(BaseVisaDriver):
                    'Request',
                    7)
 
+    #: Whether the instrument accepts multiple ';' separated commands in a
+    #: single message and answers multiple queries with a ';' separated
+    #: response as specified by SCPI. When True, default_get_features and
+    #: default_set_features group commands in a single exchange using the
+    #: compact relative SCPI form (see compact_scpi).
+    COMPOUND_COMMANDS = False
+
+    #: Bounds (in s) of the interval between two reads of the status byte
+    #: when polling it in wait_for_status (or of the event status register
+    #: when OPC_METHOD is 'esr').
+    STATUS_POLLING = (0.001, 0.1)
+
+    #: How the completion of operations is detected (see
+    #: arm_operation_complete):
+    #: - 'esr': *OPC is sent and the event status register is polled using
+    #:   *ESR? (which clears it).
+    #: - 'srq': *OPC is sent and the Event status bit of the status byte is
+    #:   waited for using wait_for_status. The instrument must be configured
+    #:   to report the operation complete event in the status byte (*ESE 1)
+    #:   and, to avoid polling, to request service when it does (*SRE 32).
+    #: - 'query': *OPC? is queried, which blocks until the operations are
+    #:   complete. The driver lock is held during the wait.
+    OPC_METHOD = 'esr'
+
+    #: Maximal number of command templates kept by a driver. Commands are
+    #: usually the few declared by the features but the cache is keyed on
+    #: arbitrary strings so templates built once it is full are not stored.
+    TEMPLATE_CACHE_SIZE = 256
+
+    def __init__(self, *args, **kwargs):
+        super(VisaMessageDriver, self).__init__(*args, **kwargs)
+        self._templates = {}
+
     @Action()
     def read_status_byte(self):
-        return byte_to_dict(self._resource.read_stb(), self.STATUS_BYTE)
+        """Read the status byte of the instrument.
+
+        Returns
+        -------
+        status : RegisterValue
+            Status byte whose bits are named according to STATUS_BYTE.
+
+        """
+        with self.lock:
+            return self._status_byte_cls()(self._resource.read_stb())
+
+    def wait_for_status(self, bits, timeout=None, use_srq=True):
+        """Wait for some bits of the status byte to be set.
+
+        If use_srq is True and the session supports it, the status byte is
+        read only when the instrument emits a service request. This requires
+        the instrument to be configured to request service when those bits are
+        set (using *SRE for IEEE 488.2 instruments). Otherwise the status byte
+        is polled with an interval growing between the bounds given by
+        STATUS_POLLING. In both cases the driver lock is released while
+        waiting so that other threads can communicate with the instrument.
+
+        Parameters
+        ----------
+        bits : int, unicode or iterable
+            Mask of the bits to wait for, or name or names (as declared in
+            STATUS_BYTE) of those bits. Integers are always interpreted as
+            masks.
+
+        timeout : float, optional
+            Maximal time to wait in seconds. None means waiting forever.
+
+        use_srq : bool, optional
+            Whether to try to rely on service request events.
+
+        Returns
+        -------
+        status : RegisterValue
+            First read status byte in which all the bits are set.
+
+        Raises
+        ------
+        TimeoutError :
+            If the bits are not set before the timeout expires.
+
+        """
+        if isinstance(bits, int):
+            mask = bits
+        else:
+            fields = self._status_byte_cls().fields
+            mask = 0
+            for b in ((bits,) if isinstance(bits, str) else bits):
+                mask |= fields[b][1]
+        if not mask:
+            return self.read_status_byte()
+
+        def status_set():
+            status = self.read_status_byte()
+            return status if status & mask == mask else None
+
+        if use_srq:
+            srq = constants.EventType.service_request
+            event = Event()
+
+            def handler(session, event_type, context, user_handle):
+                event.set()
+
+            try:
+                with self.lock:
+                    handle = self.install_handler(srq, handler)
+                    try:
+                        self._resource.enable_event(
+                            srq, constants.EventMechanism.handler)
+                    except Exception:
+                        self.uninstall_handler(srq, handler, handle)
+                        raise
+            except (errors.Error, NotImplementedError):
+                logger = logging.getLogger(__name__)
+                logger.debug('Service requests not supported by %s, falling'
+                             ' back on polling', self.resource_name)
+            else:
+                try:
+                    return self._wait_for_srq(status_set, event, timeout)
+                finally:
+                    with self.lock:
+                        self._resource.disable_event(
+                            srq, constants.EventMechanism.handler)
+                        self.uninstall_handler(srq, handler, handle)
+
+        return poll_until(status_set, timeout, *self.STATUS_POLLING)
+
+    def _wait_for_srq(self, status_set, event, timeout):
+        """Read the status byte each time a service request is received.
+
+        """
+        deadline = None if timeout is None else time() + timeout
+        while True:
+            # Clear before reading so that no request can be missed.
+            event.clear()
+            status = status_set()
+            if status is not None:
+                return status
+            remaining = None if deadline is None else deadline - time()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError('Status not set after %s s' % timeout)
+            event.wait(remaining)
+
+    def arm_operation_complete(self):
+        """Start tracking the completion of the pending operations.
+
+        See OPC_METHOD for the supported methods and
+        HasFeatures.arm_operation_complete for the expected behavior.
+
+        """
+        method = self.OPC_METHOD
+        if method == 'query':
+            return self._query_operation_complete
+
+        self.write('*OPC')
+        if method == 'srq':
+            def wait(timeout=None):
+                self.wait_for_status('Event status', timeout)
+                self.query('*ESR?')
+        else:
+            def wait(timeout=None):
+                poll_until(lambda: int(self.query('*ESR?')) & 1, timeout,
+                           *self.STATUS_POLLING)
+
+        return wait
+
+    def _query_operation_complete(self, timeout=None):
+        """Wait for the operations to complete by querying *OPC?.
+
+        The VISA timeout is replaced by the specified one during the query.
+
+        """
+        with self.lock:
+            resource = self._resource
+            visa_timeout = resource.timeout
+            resource.timeout = None if timeout is None else timeout*1000
+            try:
+                self.query('*OPC?')
+            except errors.VisaIOError as e:
+                if e.error_code != constants.StatusCode.error_timeout:
+                    raise
+                raise TimeoutError('Operation not complete after %s s' %
+                                   timeout)
+            finally:
+                resource.timeout = visa_timeout
+
+    @classmethod
+    def _status_byte_cls(cls):
+        """Class used to represent the status byte of the driver.
+
+        """
+        if '_status_cls' not in cls.__dict__ or\
+                cls._status_cls[0] != cls.STATUS_BYTE:
+            cls._status_cls = (cls.STATUS_BYTE,
+                               register_value_class(cls.STATUS_BYTE))
+        return cls._status_cls[1]
 
     def default_get_feature(self, iprop, cmd, *args, **kwargs):
         """Query the value using the provided command.
@@ -406,7 +766,11 @@ class VisaMessageDriver(BaseVisaDriver):
         being passed on to the instrument.
 
         """
-        return self._resource.query(cmd.format(*args, **kwargs))
+        resource = self._resource
+        template = self.get_template(cmd, kwargs)
+        data = template.encode(resource.encoding, resource.write_termination,
+                               *args)
+        return self._query_raw(data)
 
     def default_set_feature(self, iprop, cmd, *args, **kwargs):
         """Set the iproperty value of the instrument.
@@ -415,7 +779,86 @@ class VisaMessageDriver(BaseVisaDriver):
         being passed on to the instrument.
 
         """
-        return self._resource.write(cmd.format(*args, **kwargs))
+        resource = self._resource
+        template = self.get_template(cmd, kwargs)
+        data = template.encode(resource.encoding, resource.write_termination,
+                               *args)
+        return resource.write_raw(data)
+
+    def default_get_features(self, requests):
+        """Query multiple values in a single exchange.
+
+        This is used only if COMPOUND_COMMANDS is True. If the number of
+        fields of the answer does not match the number of requests (for
+        example because a string value contains a ';') the values are queried
+        again one by one.
+
+        """
+        if not self.COMPOUND_COMMANDS or len(requests) < 2:
+            return super(VisaMessageDriver,
+                         self).default_get_features(requests)
+
+        resource = self._resource
+        message = compact_scpi([self.get_template(cmd, kwargs).format()
+                                for _, cmd, kwargs in requests])
+        data = (message + resource.write_termination).encode(resource.encoding)
+        answers = self._query_raw(data).split(';')
+        if len(answers) != len(requests):
+            logger = logging.getLogger(__name__)
+            logger.debug('Expected %d answers to %s, got %r, querying the '
+                         'values individually', len(requests), message,
+                         answers)
+            return super(VisaMessageDriver,
+                         self).default_get_features(requests)
+        return answers
+
+    def default_set_features(self, requests):
+        """Set multiple values in a single exchange.
+
+        This is used only if COMPOUND_COMMANDS is True.
+
+        """
+        if not self.COMPOUND_COMMANDS or len(requests) < 2:
+            return super(VisaMessageDriver,
+                         self).default_set_features(requests)
+
+        message = compact_scpi([self.get_template(cmd, kwargs).format(value)
+                                for _, cmd, value, kwargs in requests])
+        resp = self._resource.write(message)
+        return [resp]*len(requests)
+
+    def _query_raw(self, data):
+        """Send an encoded query and read the answer.
+
+        This is the exchange shared by single and grouped reads.
+
+        """
+        resource = self._resource
+        with self.lock:
+            resource.write_raw(data)
+            delay = resource.query_delay
+            if delay > 0.0:
+                sleep(delay)
+            return resource.read()
+
+    def get_template(self, cmd, kwargs):
+        """Access the CommandTemplate matching a command and keywords.
+
+        Templates are built on first use and then cached, up to
+        TEMPLATE_CACHE_SIZE entries.
+
+        """
+        key = (cmd, tuple(kwargs.items())) if kwargs else cmd
+        try:
+            return self._templates[key]
+        except KeyError:
+            template = CommandTemplate(cmd, kwargs)
+            if len(self._templates) < self.TEMPLATE_CACHE_SIZE:
+                self._templates[key] = template
+            return template
+        except TypeError:
+            # Unhashable keyword values, the template cannot be cached.
+            return CommandTemplate(cmd, kwargs)
 
     @classmethod
     def _via_usb(cls, resource_type='INSTR', serial_number=None,
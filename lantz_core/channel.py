@@ -12,9 +12,18 @@
 
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+from collections import OrderedDict
+from time import time
+from future.builtins import str
 
 from .has_features import AbstractChannel
-from .subsystem import SubSystem
+from .subsystem import SubSystem, PIPING_METHODS, _func
+from .util import WaitCollector
+
+# Prefixes of the parent methods used to access a feature on multiple
+# channels at once.
+BULK_GET_PREFIX = '_bulk_get_'
+BULK_SET_PREFIX = '_bulk_set_'
 
 
 class Channel(SubSystem):
@@ -27,8 +36,11 @@ class Channel(SubSystem):
     ids.
 
     By default channels passes their id to their parent when they call
-    default_*_feat as the kwarg 'ch_id' which can be used by the parent
-    to direct the call to the right channel.
+    default_*_feat as the kwarg 'id' which can be used by the parent
+    to direct the call to the right channel. When channels are nested the id
+    of the innermost channel is the one passed as 'id' and the ids of all the
+    channels along the path, from the outermost to the innermost, are passed
+    as the tuple 'ids'.
 
     Parameters
     ----------
@@ -45,26 +57,21 @@ class Channel(SubSystem):
 
     """
     def __init__(self, parent, id, **kwargs):
-        super(Channel, self).__init__(parent, **kwargs)
         self.id = id
-
-    @property
-    def lock(self):
-        """Access parent lock."""
-        return self.parent.lock
+        super(Channel, self).__init__(parent, **kwargs)
 
     def default_get_feature(self, feat, cmd, *args, **kwargs):
         """Channels simply pipes the call to their parent.
 
         """
-        kwargs['id'] = self.id
+        kwargs.update(self._routing_kwargs())
         return self.parent.default_get_feature(feat, cmd, *args, **kwargs)
 
     def default_set_feature(self, feat, cmd, *args, **kwargs):
         """Channels simply pipes the call to their parent.
 
         """
-        kwargs['id'] = self.id
+        kwargs.update(self._routing_kwargs())
         return self.parent.default_set_feature(feat, cmd, *args, **kwargs)
 
     def default_check_operation(self, feat, value, i_value, response):
@@ -74,7 +81,25 @@ class Channel(SubSystem):
         return self.parent.default_check_operation(feat, value, i_value,
                                                    response)
 
+    def _routing_kwargs(self):
+        """Pass the channel id, and the ids of the enclosing channels if any,
+        to the parent.
+
+        """
+        ids = [self.id]
+        parent = self.parent
+        while isinstance(parent, SubSystem):
+            if isinstance(parent, Channel):
+                ids.append(parent.id)
+            parent = parent.parent
+        if len(ids) == 1:
+            return {'id': self.id}
+        return {'id': self.id, 'ids': tuple(reversed(ids))}
+
 AbstractChannel.register(Channel)
+PIPING_METHODS.update((_func(Channel.default_get_feature),
+                       _func(Channel.default_set_feature),
+                       _func(Channel.default_check_operation)))
 
 
 class ChannelContainer(object):
@@ -91,18 +116,48 @@ class ChannelContainer(object):
     name : unicode
         Name of the channel subpart on the parent.
 
-    list_available : unicode
-        Name of the parent method to use to query the available channels.
+    list_available : unicode, tuple or list
+        Name of the parent method to use to query the available channels or
+        list of the channel ids.
+
+    ttl : float, optional
+        Time in seconds after which the list of available channels is
+        queried again. If None the list is only queried once and should be
+        refreshed explicitly using refresh_available.
+
+    Attributes
+    ----------
+    ttl : float or None
+        Validity duration of the list of available channels.
+
+    Notes
+    -----
+    The parent can speed up get_all and set_all by declaring specially named
+    methods using the instrument ability to address multiple channels in a
+    single command (see format_channel_list) :
+
+    - _bulk_get_(channel name)_(feature name)(self, feat, ids) should return
+      the raw instrument answers (before any post_get processing) for the
+      given channel ids in the same order.
+    - _bulk_set_(channel name)_(feature name)(self, feat, values) receives an
+      OrderedDict mapping channel ids to the values computed by pre_set.
 
     """
 
-    def __init__(self, cls, parent, name, available):
+    def __init__(self, cls, parent, name, available, ttl=None):
         self._cls = cls
         self._channels = {}
         self._name = name
         self._parent = parent
+        self.ttl = ttl
+        self._available = None
+        self._available_ids = frozenset()
+        self._timestamp = 0.
+        self._queries = 0
+        self._hits = 0
         if isinstance(available, (tuple, list)):
-            self._list = lambda: available
+            self._list = None
+            self._set_available(available)
         else:
             self._list = getattr(parent, available)
 
@@ -110,13 +165,54 @@ class ChannelContainer(object):
     def available(self):
         """List the available channels.
 
+        The list is queried from the parent only when no valid copy is cached.
+
         """
-        return self._list()
+        if self._list is not None:
+            if (self._available is None or
+                    (self.ttl is not None and
+                     time() - self._timestamp > self.ttl)):
+                return self.refresh_available()
+            self._hits += 1
+        return self._available
+
+    @property
+    def available_stats(self):
+        """Number of times the list of available channels was queried from the
+        parent ('queries') and served from the cache ('hits').
+
+        """
+        return {'queries': self._queries, 'hits': self._hits}
+
+    def refresh_available(self):
+        """Query again the list of available channels from the parent.
+
+        Channels which are no longer available are forgotten.
+
+        Returns
+        -------
+        available : tuple or list
+            The updated list of available channels.
+
+        """
+        if self._list is not None:
+            self._queries += 1
+            self._set_available(self._list())
+            self._timestamp = time()
+            for ch_id in list(self._channels):
+                if ch_id not in self._available_ids:
+                    del self._channels[ch_id]
+        return self._available
 
     def __getitem__(self, ch_id):
         if ch_id in self._channels:
             return self._channels[ch_id]
 
+        # The second test refreshes the list of ids if it is outdated.
+        if ch_id not in self._available_ids and ch_id not in self.available:
+            msg = '{} is not an available id for channel {}'
+            raise KeyError(msg.format(ch_id, self._name))
+
         parent = self._parent
         ch = self._cls(parent, ch_id,
                        caching_allowed=parent.use_cache
@@ -127,3 +223,143 @@ class ChannelContainer(object):
     def __iter__(self):
         for id in self.available:
             yield self[id]
+
+    def __contains__(self, ch_id):
+        return ch_id in self._available_ids or ch_id in self.available
+
+    def get_all(self, name, ids=None):
+        """Read the value of a Feature on multiple channels.
+
+        Cached values are reused and the remaining channels are queried
+        through the parent bulk getter if one exists, one by one otherwise.
+        The cache of each channel is updated.
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature to read.
+
+        ids : iterable, optional
+            Ids of the channels to read. All available channels are read if
+            omitted.
+
+        Returns
+        -------
+        values : OrderedDict
+            Values of the Feature for each channel id, in the order of ids.
+
+        """
+        ids = self.available if ids is None else ids
+        channels = [self[ch_id] for ch_id in ids]
+        bulk = getattr(self._parent, BULK_GET_PREFIX + self._name + '_' + name,
+                       None)
+        if bulk is None:
+            return OrderedDict((ch.id, getattr(ch, name)) for ch in channels)
+
+        feat = getattr(self._cls, name)
+        with self._parent.lock:
+            values = OrderedDict((ch.id, None) for ch in channels)
+            to_query = []
+            for ch in channels:
+                if name in ch._cache:
+                    values[ch.id] = getattr(ch, name)
+                else:
+                    to_query.append(ch)
+
+            if to_query:
+                for ch in to_query:
+                    feat.pre_get(ch)
+                answers = bulk(feat, [ch.id for ch in to_query])
+                for ch, answer in zip(to_query, answers):
+                    val = feat.post_get(ch, answer)
+                    feat._cache_get(ch, val)
+                    values[ch.id] = val
+
+            return values
+
+    def set_all(self, name, values):
+        """Set the value of a Feature on multiple channels.
+
+        The parent bulk setter is used if one exists, otherwise each channel
+        is set one by one.
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature to set.
+
+        values : dict or iterable
+            Mapping between channel ids and values or values to set on all
+            the available channels (in the order of available).
+
+        """
+        if isinstance(values, dict):
+            items = list(values.items())
+        else:
+            items = list(zip(self.available, values))
+
+        bulk = getattr(self._parent, BULK_SET_PREFIX + self._name + '_' + name,
+                       None)
+        if bulk is None:
+            for ch_id, value in items:
+                setattr(self[ch_id], name, value)
+            return
+
+        feat = getattr(self._cls, name)
+        with WaitCollector() as collector:
+            self._bulk_set(feat, items, bulk)
+        collector.wait()
+
+    def _bulk_set(self, feat, items, bulk):
+        """Set the values through the parent bulk setter.
+
+        """
+        with self._parent.lock:
+            channels = [self[ch_id] for ch_id, _ in items]
+            i_values = OrderedDict((ch.id, feat.pre_set(ch, value))
+                                   for ch, (_, value) in zip(channels, items))
+            resp = bulk(feat, i_values)
+            for ch, (ch_id, value) in zip(channels, items):
+                feat.post_set(ch, value, i_values[ch_id], resp)
+                feat._cache_set(ch, value)
+                if ch.use_cache:
+                    feat._cache_i_value(ch, i_values[ch_id])
+
+    def _set_available(self, available):
+        """Store the list of available channels.
+
+        """
+        self._available = available
+        self._available_ids = frozenset(available)
+
+
+def format_channel_list(ids):
+    """Format channel ids using the SCPI channel list syntax.
+
+    Consecutive integer ids are compressed into ranges, ie (1, 2, 3, 5) is
+    formatted as '(@1:3,5)'.
+
+    """
+    parts = []
+    start = prev = None
+    for ch_id in ids:
+        if (isinstance(ch_id, int) and prev is not None and
+                isinstance(prev, int) and ch_id == prev + 1):
+            prev = ch_id
+            continue
+        if start is not None:
+            parts.append(_format_range(start, prev))
+        start = prev = ch_id
+    if start is not None:
+        parts.append(_format_range(start, prev))
+
+    return '(@' + ','.join(parts) + ')'
+
+
+def _format_range(start, stop):
+    """Format a range of channel ids.
+
+    """
+    if start == stop:
+        return str(start)
+    return str(start) + ':' + str(stop)
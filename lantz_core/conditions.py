@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.conditions
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tools used to wait for a Feature to reach a given state.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from threading import Event, Lock, Thread
+from time import sleep, time
+
+from .errors import TimeoutError
+
+
+class ConditionWaiter(object):
+    """Condition a thread is waiting for.
+
+    Parameters
+    ----------
+    predicate : callable
+        Function called with the value of the Feature and returning True
+        once the condition is met.
+
+    """
+    __slots__ = ('predicate', 'event', 'value', 'error')
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+        self.event = Event()
+        self.value = None
+        self.error = None
+
+    def check(self, value):
+        """Evaluate the condition and notify the waiting thread if it is met.
+
+        """
+        try:
+            met = self.predicate(value)
+        except Exception as e:
+            met = True
+            self.error = e
+        if met:
+            self.value = value
+            self.event.set()
+        return met
+
+    def fail(self, error):
+        """Notify the waiting thread that the Feature cannot be read.
+
+        """
+        self.error = error
+        self.event.set()
+
+    def result(self):
+        """Value meeting the condition (or the error which occured).
+
+        """
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ConditionPoller(object):
+    """Poll a Feature and check the conditions of all its waiters.
+
+    The Feature is read bypassing the cache and the driver lock is released
+    between two reads. The interval between reads is halved each time the
+    value changes and doubled when it does not, within the given bounds, so
+    that a slowly evolving state is not read uselessly often.
+
+    Parameters
+    ----------
+    driver : HasFeatures
+        Object from which the Feature is read.
+
+    name : unicode
+        Name of the Feature (dotted names can be used to access subsystems).
+
+    min_interval, max_interval : float
+        Bounds of the interval between two reads in seconds.
+
+    """
+    def __init__(self, driver, name, min_interval, max_interval):
+        self.driver = driver
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.waiters = []
+        self.lock = Lock()
+        self._interval = min_interval
+        self._last = self
+
+    def add(self, waiter):
+        """Add a waiter, returns False if the polling is over.
+
+        """
+        with self.lock:
+            if self.waiters is None:
+                return False
+            self.waiters.append(waiter)
+            return True
+
+    def remove(self, waiter):
+        """Remove a waiter (typically after a timeout).
+
+        """
+        with self.lock:
+            if self.waiters and waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def poll(self, deadline=None):
+        """Read the Feature until all the waiters are satisfied.
+
+        Parameters
+        ----------
+        deadline : float, optional
+            Time after which to stop polling even if some waiters remain.
+
+        """
+        while True:
+            try:
+                value = self.read()
+            except Exception as e:
+                with self.lock:
+                    waiters, self.waiters = self.waiters, None
+                for w in waiters:
+                    w.fail(e)
+                return
+
+            with self.lock:
+                self.waiters = [w for w in self.waiters if not w.check(value)]
+                if not self.waiters:
+                    self.waiters = None
+                    return
+
+            interval = self.next_interval(value)
+            if deadline is not None:
+                remaining = deadline - time()
+                if remaining <= 0:
+                    return
+                interval = min(interval, remaining)
+            sleep(interval)
+
+    def read(self):
+        """Read the value of the Feature bypassing the cache.
+
+        """
+        feat, obj = self.driver._resolve_feature(self.name)
+        with obj.lock:
+            obj.clear_cache(features=(feat.name,))
+            return feat.__get__(obj)
+
+    def next_interval(self, value):
+        """Compute the interval before the next read.
+
+        """
+        last, self._last = self._last, value
+        if last is not self and value != last:
+            self._interval = max(self.min_interval, self._interval/2)
+        else:
+            self._interval = min(self.max_interval, self._interval*2)
+        return self._interval
+
+
+def wait_until(driver, name, predicate, timeout=None, min_interval=0.01,
+               max_interval=1., shared=False):
+    """Wait for a Feature to meet a condition.
+
+    See HasFeatures.wait_until for the description of the arguments.
+
+    """
+    if not callable(predicate):
+        expected = predicate
+
+        def predicate(value):
+            return value == expected
+
+    waiter = ConditionWaiter(predicate)
+    if not shared:
+        poller = ConditionPoller(driver, name, min_interval, max_interval)
+        poller.add(waiter)
+        poller.poll(None if timeout is None else time() + timeout)
+        if not waiter.event.is_set():
+            _raise_timeout(name, timeout)
+        return waiter.result()
+
+    pollers = driver._pollers
+    with driver.lock:
+        poller = pollers.get(name)
+        if poller is None or not poller.add(waiter):
+            poller = ConditionPoller(driver, name, min_interval, max_interval)
+            poller.add(waiter)
+            pollers[name] = poller
+            thread = Thread(target=_run_shared, args=(poller, pollers))
+            thread.daemon = True
+            thread.start()
+
+    if not waiter.event.wait(timeout):
+        poller.remove(waiter)
+        # The condition may have been met in between.
+        if not waiter.event.is_set():
+            _raise_timeout(name, timeout)
+    return waiter.result()
+
+
+def _run_shared(poller, pollers):
+    """Poll in a background thread and forget the poller once done.
+
+    """
+    try:
+        poller.poll()
+    finally:
+        with poller.driver.lock:
+            if pollers.get(poller.name) is poller:
+                del pollers[poller.name]
+
+
+def _raise_timeout(name, timeout):
+    raise TimeoutError('{} did not meet the condition after {} s'.format(
+        name, timeout))
@@ -28,9 +28,9 @@ class Bool(Mapping):
 
     """
     def __init__(self, getter=None, setter=None, mapping=None, aliases=None,
-                 extract='', retries=0, checks=None, discard=None, ):
+                 extract='', retries=0, checks=None, discard=None, wait=None):
         Mapping.__init__(self, getter, setter, mapping, extract,
-                         retries, checks, discard)
+                         retries, checks, discard, wait)
 
         self._aliases = {True: True, False: False}
         if aliases:
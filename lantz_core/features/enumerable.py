@@ -26,9 +26,9 @@ class Enumerable(Feature):
 
     """
     def __init__(self, getter=None, setter=None, values=(), extract='',
-                 retries=0, checks=None, discard=None):
+                 retries=0, checks=None, discard=None, wait=None):
         super(Enumerable, self).__init__(getter, setter, extract, retries,
-                                         checks, discard)
+                                         checks, discard, wait)
         self.values = set(values)
         self.creation_kwargs['values'] = values
 
@@ -13,14 +13,58 @@ from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 from types import MethodType
 from collections import OrderedDict
-from stringparser import Parser
+from future.utils import with_metaclass
+from past.builtins import basestring
 
 from .util import wrap_custom_feat_method, MethodsComposer, COMPOSERS
 from ..errors import LantzError
-from ..util import build_checker
+from ..util import (build_checker, parse_wait, complete_operation,
+                    WaitCollector)
+from ..observers import notify_observers
 
 
-class Feature(property):
+class _FeatureDoc(object):
+    """Data descriptor giving access to the docstring of a Feature.
+
+    The docstring of a Feature declared on a HasFeatures class is built from
+    the comments found in the source of the class. The source is analysed
+    only when the docstring is first requested (see `_doc_source_`). When
+    accessed on the class the class docstring is returned.
+
+    """
+    __slots__ = ('class_doc',)
+
+    def __init__(self, class_doc):
+        self.class_doc = class_doc
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self.class_doc
+        dct = obj.__dict__
+        if '_doc_source_' in dct:
+            docs, name = dct.pop('_doc_source_')
+            doc = docs.get(name)
+            if doc is not None:
+                obj.make_doc(doc)
+        return dct.get('__doc__')
+
+    def __set__(self, obj, value):
+        obj.__dict__.pop('_doc_source_', None)
+        obj.__dict__['__doc__'] = value
+
+
+class FeatureMeta(type):
+    """Metaclass installing a _FeatureDoc descriptor on each Feature class.
+
+    Without it the class docstring would shadow the one of the instances.
+
+    """
+    def __new__(meta, name, bases, dct):
+        dct['__doc__'] = _FeatureDoc(dct.get('__doc__'))
+        return super(FeatureMeta, meta).__new__(meta, name, bases, dct)
+
+
+class Feature(with_metaclass(FeatureMeta, property)):
     """Descriptor representing the most basic instrument property.
 
     Features should not be used outside the definition of a class to avoid
@@ -70,6 +114,14 @@ class Feature(property):
         setting the Feature or dictionary specifying a list of feature whose
         cache should be discarded under the 'feature' key and a list of limits
         to discard under the 'limits' key.
+    wait : unicode or dict
+        Wait for the instrument to complete the operation triggered by setting
+        the Feature before returning. The only supported mode is 'opc' (see
+        HasFeatures.arm_operation_complete), which can be passed as is or as a
+        dictionary specifying the 'mode' and the 'timeout' in seconds. The
+        instrument is armed while holding the driver lock but the wait
+        happens once it is released. HasFeatures.start_set returns a Future
+        instead of waiting.
 
     Attributes
     ----------
@@ -81,8 +133,11 @@ class Feature(property):
         subclass customisation. This should not be manipulated by user code.
 
     """
+    #: Parsed wait argument (see parse_wait) or None.
+    _wait = None
+
     def __init__(self, getter=None, setter=None, extract='', retries=0,
-                 checks=None, discard=None):
+                 checks=None, discard=None, wait=None):
         self._getter = getter
         self._setter = setter
         self._retries = retries
@@ -106,12 +161,17 @@ class Feature(property):
             self._discard = discard
             self.modify_behavior('post_set', self.discard_cache,
                                  ('discard', 'append'), True)
+        if wait:
+            # Stored only when used so that set_feat keeps working with
+            # subclasses not accepting this argument.
+            self.creation_kwargs['wait'] = wait
+            self._wait = parse_wait(wait)
+            self.modify_behavior('post_set', self.wait_operation,
+                                 ('wait', 'append'), True)
 
         if extract:
-            if isinstance(extract, Parser):
-                self._parser = extract
-            else:
-                self._parser = Parser(extract)
+            # The Parser is built on first use (see extract).
+            self._parser = None if isinstance(extract, basestring) else extract
             self.modify_behavior('post_get', self.extract,
                                  ('extract', 'prepend'), True)
         self.name = ''
@@ -282,11 +342,25 @@ class Feature(property):
         if 'limits' in self._discard:
             driver.discard_limits(self._discard['limits'])
 
+    def wait_operation(self, driver, value, i_value, response):
+        """Wait for the instrument to complete the operation.
+
+        The wait is only recorded when the set is performed by _set or
+        set_features so that it happens once the driver lock is released.
+
+        """
+        complete_operation(driver.arm_operation_complete(),
+                           self._wait['timeout'])
+
     def extract(self, driver, value):
         """Extract the return value using the extract value.
 
         """
-        return self._parser(value)
+        parser = self._parser
+        if parser is None:
+            from stringparser import Parser
+            parser = self._parser = Parser(self.creation_kwargs['extract'])
+        return parser(value)
 
     def clone(self):
         """Clone the Feature by copying all the local attributes and driver
@@ -294,7 +368,6 @@ class Feature(property):
 
         """
         p = self.__class__(self._getter, self._setter, retries=self._retries)
-        p.__doc__ = self.__doc__
 
         for k, v in self.__dict__.items():
             if isinstance(v, MethodType):
@@ -306,6 +379,11 @@ class Feature(property):
             else:
                 setattr(p, k, v)
 
+        # Setting __doc__ discards the pending doc source so restore it to
+        # avoid analysing the source of the class now.
+        if '_doc_source_' in self.__dict__:
+            p.__dict__['_doc_source_'] = self.__dict__['_doc_source_']
+
         return p
 
     def make_doc(self, doc):
@@ -486,13 +564,12 @@ class Feature(property):
             checks = (checks, checks)
 
         if checks[0]:
-            self.get_check = MethodType(build(checks[0], '(self, driver)'),
-                                        self)
+            self.get_check = MethodType(
+                _with_prefetch(build(checks[0], '(self, driver)')), self)
         if checks[1]:
-            self.set_check = MethodType(build(checks[1],
-                                              '(self, driver, value)',
-                                              'value'),
-                                        self)
+            self.set_check = MethodType(
+                _with_prefetch(build(checks[1], '(self, driver, value)',
+                                     'value')), self)
 
         if hasattr(self, 'get_check'):
             self.modify_behavior('pre_get', self.get_check,
@@ -512,24 +589,98 @@ class Feature(property):
                 return cache[name]
 
             val = get_chain(self, driver)
-            if driver.use_cache:
-                cache[name] = val
+            self._cache_get(driver, val)
 
             return val
 
     def _set(self, driver, value):
         """Setter defined when the user provides a value for the set arg.
 
+        """
+        if self._wait is not None:
+            with WaitCollector() as collector:
+                self._set_locked(driver, value)
+            collector.wait()
+        else:
+            self._set_locked(driver, value)
+
+    def _set_locked(self, driver, value):
+        """Set the value while holding the driver lock.
+
         """
         with driver.lock:
-            cache = driver._cache
-            name = self.name
-            if name in cache and value == cache[name]:
+            if self._matches_cache(driver, value):
+                return
+
+            i_val = self.pre_set(driver, value)
+            if self._matches_i_value(driver, i_val):
                 return
 
-            set_chain(self, driver, value)
+            send_chain(self, driver, value, i_val)
+            self._cache_set(driver, value)
             if driver.use_cache:
-                cache[name] = value
+                self._cache_i_value(driver, i_val)
+
+    def _matches_cache(self, driver, value):
+        """Check whether the cached value means setting value is useless.
+
+        """
+        cache = driver._cache
+        name = self.name
+        return name in cache and value == cache[name]
+
+    def _matches_i_value(self, driver, i_value):
+        """Check whether the instrument is known to already use a value once
+        formatted by pre_set.
+
+        The formatted value of the last set is valid only as long as the
+        cached value it was stored with has not been cleared or replaced.
+
+        """
+        name = self.name
+        if name not in driver._i_values:
+            return False
+        entry, cached = driver._i_values[name]
+        cache = driver._cache
+        return (name in cache and cache[name] is entry and
+                self._same_i_value(cached, i_value))
+
+    def _same_i_value(self, cached, i_value):
+        """Compare two values as formatted by pre_set.
+
+        """
+        return cached == i_value
+
+    def _cache_i_value(self, driver, i_value):
+        """Remember the value sent to the instrument along the cached value.
+
+        This must be called after _cache_set.
+
+        """
+        name = self.name
+        driver._i_values[name] = (driver._cache[name], i_value)
+
+    def _cache_get(self, driver, value):
+        """Store in the driver cache a value read from the instrument.
+
+        The observers are notified even if the driver does not use its cache.
+
+        """
+        if driver.use_cache:
+            driver._cache[self.name] = value
+        if driver._observers:
+            notify_observers(driver, self.name, value)
+
+    def _cache_set(self, driver, value):
+        """Store in the driver cache a value written to the instrument.
+
+        The observers are notified even if the driver does not use its cache.
+
+        """
+        if driver.use_cache:
+            driver._cache[self.name] = value
+        if driver._observers:
+            notify_observers(driver, self.name, value)
 
     def _del(self, driver):
         """Deleter clearing the cache of the instrument for this Feature.
@@ -566,7 +717,13 @@ def set_chain(feat, driver, value):
     """Generic set chain for Features.
 
     """
-    i_val = feat.pre_set(driver, value)
+    send_chain(feat, driver, value, feat.pre_set(driver, value))
+
+
+def send_chain(feat, driver, value, i_val):
+    """Set chain for Features once the value has been formatted by pre_set.
+
+    """
     i = -1
     while i < feat._retries:
         try:
@@ -580,3 +737,186 @@ def set_chain(feat, driver, value):
             else:
                 raise
     feat.post_set(driver, value, i_val, resp)
+
+
+def _is_default(feat, meth_name):
+    """Check whether a Feature method has been customized.
+
+    """
+    meth = getattr(type(feat), meth_name)
+    return (meth_name not in feat.__dict__ and
+            getattr(meth, '__func__', meth) is _DEFAULTS[meth_name])
+
+_DEFAULTS = {'get': getattr(Feature.get, '__func__', Feature.get),
+             'set': getattr(Feature.set, '__func__', Feature.set)}
+
+
+def _route(driver):
+    """Object implementing the default_* methods for a driver and the keywords
+    to pass it.
+
+    """
+    return (getattr(driver, '_route_target', driver),
+            getattr(driver, '_route_kwargs', {}))
+
+
+def get_features(items):
+    """Get the values of multiple Features, grouping the queries.
+
+    Cached values are used when available. The Features relying on the
+    default get method are queried through the default_get_features method of
+    the object implementing default_get_feature, the others are accessed one
+    by one.
+
+    Parameters
+    ----------
+    items : iterable
+        Iterable of tuples (feat, driver).
+
+    Returns
+    -------
+    values : list
+        Values of the features in the order of items.
+
+    """
+    values = [None]*len(items)
+    groups = OrderedDict()
+    for i, (feat, driver) in enumerate(items):
+        if feat.name in driver._cache or not _is_default(feat, 'get') or\
+                not isinstance(feat._getter, basestring):
+            values[i] = feat.__get__(driver)
+            continue
+        target, kwargs = _route(driver)
+        groups.setdefault(target, []).append((i, feat, driver, kwargs))
+
+    for target, group in groups.items():
+        with target.lock:
+            for _, feat, driver, _ in group:
+                feat.pre_get(driver)
+            answers = target.default_get_features([(f, f._getter, kw)
+                                                   for _, f, _, kw in group])
+            for (i, feat, driver, _), answer in zip(group, answers):
+                val = feat.post_get(driver, answer)
+                feat._cache_get(driver, val)
+                values[i] = val
+
+    return values
+
+
+def prefetch_features(driver, names):
+    """Read the uncached Features among the given names in a single batch.
+
+    Names which do not refer to a Feature (possibly through subsystems) are
+    ignored. Nothing is done if caching is disabled as the values would
+    be read again anyway.
+
+    Parameters
+    ----------
+    driver : HasFeatures
+        Object from which the names are resolved.
+
+    names : iterable of unicode
+        Dotted names of the attributes to prefetch.
+
+    """
+    if not driver.use_cache:
+        return
+    items = []
+    for name in names:
+        obj = driver
+        for part in name.split('.'):
+            attr = getattr(type(obj), part, None)
+            if isinstance(attr, Feature):
+                if attr.fget and attr.name not in obj._cache and\
+                        (attr, obj) not in items:
+                    items.append((attr, obj))
+                break
+            if part not in obj.__subsystems__:
+                break
+            obj = getattr(obj, part)
+
+    # A single Feature is read when the checks are evaluated.
+    if len(items) > 1:
+        get_features(items)
+
+
+def _with_prefetch(checker):
+    """Prefetch the Features referenced by a checker before running it.
+
+    """
+    names = checker.features
+    if not names:
+        return checker
+
+    def check(self, driver, *args):
+        prefetch_features(driver, names)
+        return checker(self, driver, *args)
+
+    check.features = names
+    return check
+
+
+def set_features(items):
+    """Set the values of multiple Features, grouping the commands.
+
+    The operations are performed in order. Consecutive Features relying on
+    the default set method and sharing the same object implementing
+    default_set_feature are set through a single call to its
+    default_set_features method. The others are set one by one. Values
+    matching the cache are skipped. The completion of the operations of the
+    Features declared with wait is awaited once all the values are written.
+
+    Parameters
+    ----------
+    items : iterable
+        Iterable of tuples (feat, driver, value).
+
+    """
+    with WaitCollector() as collector:
+        group = []
+        group_target = None
+        for feat, driver, value in items:
+            if feat._matches_cache(driver, value):
+                continue
+            if not _is_default(feat, 'set') or\
+                    not isinstance(feat._setter, basestring):
+                _flush_set_group(group_target, group)
+                group = []
+                feat.__set__(driver, value)
+                continue
+            target, kwargs = _route(driver)
+            if target is not group_target:
+                _flush_set_group(group_target, group)
+                group = []
+                group_target = target
+            group.append((feat, driver, value, kwargs))
+
+        _flush_set_group(group_target, group)
+    collector.wait()
+
+
+def _flush_set_group(target, group):
+    """Set a group of Features values sharing the same target.
+
+    """
+    if not group:
+        return
+
+    with target.lock:
+        # Values already used by the instrument once formatted are skipped.
+        pending = []
+        for feat, driver, value, kwargs in group:
+            i_val = feat.pre_set(driver, value)
+            if not feat._matches_i_value(driver, i_val):
+                pending.append((feat, driver, value, kwargs, i_val))
+        if not pending:
+            return
+
+        resps = target.default_set_features([(f, f._setter, i_val, kw)
+                                             for f, _, _, kw, i_val
+                                             in pending])
+        for (feat, driver, value, _, i_val), resp in zip(pending, resps):
+            feat.post_set(driver, value, i_val, resp)
+            feat._cache_set(driver, value)
+            if driver.use_cache:
+                feat._cache_i_value(driver, i_val)
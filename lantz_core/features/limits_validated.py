@@ -30,9 +30,9 @@ class LimitsValidated(Feature):
 
     """
     def __init__(self, getter=None, setter=None, limits=None, extract='',
-                 retries=0, checks=None, discard=None):
+                 retries=0, checks=None, discard=None, wait=None):
         Feature.__init__(self, getter, setter, extract,
-                         retries, checks, discard)
+                         retries, checks, discard, wait)
         if limits:
             if isinstance(limits, AbstractLimitsValidator):
                 self.limits = limits
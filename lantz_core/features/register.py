@@ -3,7 +3,7 @@
     lantz_core.features.register
     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    Module defining a Feature used to deal with 8-bits binary register.
+    Module defining a Feature used to deal with binary registers.
 
     :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
     :license: BSD, see LICENSE for more details.
@@ -11,45 +11,165 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+from collections import OrderedDict
+from numbers import Integral
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from past.builtins import long
 
 from .feature import Feature
-from ..util import byte_to_dict, dict_to_byte
+
+
+class RegisterValue(long):
+    """Immutable view of the value of a register.
+
+    The value is stored as an integer (a long on Python 2 so that registers
+    of up to 64 bits can be represented) and the fields are decoded on access
+    using the masks precomputed by the Register. Fields can be accessed either
+    as items or, when their name is a valid identifier, as attributes.
+    Single bit fields are returned as bools, multi-bits fields as ints.
+
+    The view behaves as a read-only mapping between the fields names and
+    their values and compares equal to both the integer value and the
+    equivalent dict.
+
+    """
+    __slots__ = ()
+
+    #: Mapping between the fields names and a tuple (shift, mask, is_bit).
+    #: Set on the subclasses created by the Register.
+    fields = OrderedDict()
+
+    def __getitem__(self, name):
+        try:
+            shift, mask, is_bit = self.fields[name]
+        except KeyError:
+            raise KeyError('{} is not a field of the register'.format(name))
+        val = (self & mask) >> shift
+        return bool(val) if is_bit else val
+
+    def __getattr__(self, name):
+        if name in self.fields:
+            return self[name]
+        msg = '{} object has no attribute {}'
+        raise AttributeError(msg.format(type(self).__name__, name))
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, name):
+        return name in self.fields
+
+    def keys(self):
+        return list(self.fields)
+
+    def values(self):
+        return [self[n] for n in self.fields]
+
+    def items(self):
+        return [(n, self[n]) for n in self.fields]
+
+    def get(self, name, default=None):
+        return self[name] if name in self.fields else default
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other)
+        return long(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = long.__hash__
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(n, v) for n, v in self.items())
+        return '{}({:#x}: {})'.format(type(self).__name__, long(self), fields)
+
+
+def register_value_class(names, length=8):
+    """Create the RegisterValue subclass decoding a register.
+
+    Parameters
+    ----------
+    names : iterable or dict
+        Description of the fields of the register (see Register).
+
+    length : int, optional
+        Number of bits of the register.
+
+    Returns
+    -------
+    value_cls : type
+        Subclass of RegisterValue whose fields match the description.
+
+    """
+    fields = {}
+    if isinstance(names, dict):
+        used = 0
+        for n, bits in names.items():
+            start, width = (bits, 1) if isinstance(bits, Integral) else bits
+            mask = ((1 << width) - 1) << start
+            if start < 0 or width < 1 or start + width > length:
+                msg = 'Field {} does not fit in a {} bits register'
+                raise ValueError(msg.format(n, length))
+            if used & mask:
+                raise ValueError('Field {} overlaps another one'.format(n))
+            used |= mask
+            fields[n] = (start, mask, width == 1)
+        for i in range(length):
+            if not used & (1 << i):
+                fields[i] = (i, 1 << i, True)
+
+    else:
+        names = list(names)
+        if len(names) != length:
+            raise ValueError('Register necessitates %d names' % length)
+
+        # Makes sure every key is unique by using the bit index if None is
+        # found
+        for i, n in enumerate(names):
+            fields[i if n is None else n] = (i, 1 << i, True)
+
+    fields = OrderedDict(sorted(fields.items(), key=lambda f: f[1][0]))
+    return type(str('RegisterValue'), (RegisterValue,),
+                {'__slots__': (), 'fields': fields})
 
 
 class Register(Feature):
     """Property handling a bit field as a mapping.
 
+    The value read from the instrument is returned as a RegisterValue. When
+    setting, either an integer, a RegisterValue or a dict mapping fields to
+    their value can be used (omitted fields are set to 0).
+
     Parameters
     ----------
     names : iterable or dict
-        Names to associate to each bit fields from 0 to 7. When using an
-        iterable None can be used to mark a useless bit. When using a dict
-        the values are used to specify the bits to consider.
+        Names to associate to each bit fields from 0 to length - 1. When using
+        an iterable None can be used to mark a useless bit. When using a dict
+        the values are used to specify the bits to consider, either as the
+        index of a single bit or as a tuple (first bit, number of bits) for
+        multi-bits fields. The unnamed bits are named after their index.
+
+    length : int, optional
+        Number of bits of the register (8, 16, 32 and 64 are common values).
 
     """
     def __init__(self, getter=None, setter=None, names=(), length=8,
-                 extract='', retries=0, checks=None, discard=None):
+                 extract='', retries=0, checks=None, discard=None, wait=None):
         Feature.__init__(self, getter, setter, extract, retries,
-                         checks, discard)
-
-        if isinstance(names, dict):
-            aux = list(range(length))
-            for n, i in names.items():
-                aux[i] = n
-            names = aux
-
-        else:
-            names = list(names)
-            if len(names) != length:
-                raise ValueError('Register necessitates %d names' % length)
-
-            # Makes sure every key is unique by using the bit index if None is
-            # found
-            for i, n in enumerate(names[:]):
-                if n is None:
-                    names[i] = i
-
-        self.names = tuple(names)
+                         checks, discard, wait)
+
+        self.value_cls = register_value_class(names, length)
+        self.names = tuple(self.value_cls.fields)
+        self.length = length
         self.creation_kwargs['names'] = names
         self.creation_kwargs['length'] = length
 
@@ -60,15 +180,29 @@ class Register(Feature):
                              ('dict_to_byte', 'append'), True)
 
     def byte_to_dict(self, driver, value):
-        """Convert the byte returned by the instrument to a dict.
+        """Convert the value returned by the instrument to a RegisterValue.
 
         """
-        val = int(value)
-
-        return byte_to_dict(val, self.names)
+        return self.value_cls(value)
 
     def dict_to_byte(self, driver, value):
-        """Convert a dict into a byte value.
+        """Convert a dict into the integer value of the register.
 
         """
-        return dict_to_byte(value, self.names)
+        if isinstance(value, Integral):
+            return int(value)
+
+        fields = self.value_cls.fields
+        byte = 0
+        for name, val in value.items():
+            try:
+                shift, mask, _ = fields[name]
+            except KeyError:
+                msg = '{} is not a field of the register {}'
+                raise ValueError(msg.format(name, self.name))
+            val = int(val) << shift
+            if val & ~mask:
+                msg = 'Value {} does not fit in the field {} of {}'
+                raise ValueError(msg.format(value[name], name, self.name))
+            byte |= val
+        return byte
@@ -13,17 +13,17 @@ from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 # Used to get a 2/3 independent unicode conversion.
 from future.builtins import str as ustr
+from past.builtins import basestring
+from numbers import Real
 
 from .enumerable import Enumerable
 from .limits_validated import LimitsValidated
 from .mapping import Mapping
-from ..unit import get_unit_registry, UNIT_SUPPORT
+from ..unit import parse_unit, is_quantity, magnitude_in, unit_support
 from ..util import raise_limits_error
+from ..observers import notify_observers
 from ..limits import IntLimitsValidator, FloatLimitsValidator
-from lantz_core.features.feature import set_chain, get_chain
-
-if UNIT_SUPPORT:
-    from pint.quantity import _Quantity
+from lantz_core.features.feature import get_chain
 
 
 class Unicode(Mapping, Enumerable):
@@ -32,14 +32,14 @@ class Unicode(Mapping, Enumerable):
 
     """
     def __init__(self, getter=None, setter=None, values=(), mapping=None,
-                 extract='', retries=0, checks=None, discard=None):
+                 extract='', retries=0, checks=None, discard=None, wait=None):
 
         if mapping:
             Mapping.__init__(self, getter, setter, mapping, extract,
-                             retries, checks, discard)
+                             retries, checks, discard, wait)
         else:
             Enumerable.__init__(self, getter, setter, values, extract,
-                                retries, checks, discard)
+                                retries, checks, discard, wait)
 
         self.modify_behavior('post_get', self.cast_to_unicode,
                              ('cast_to_unicode', 'append'), True)
@@ -56,18 +56,18 @@ class Int(LimitsValidated, Mapping, Enumerable):
     """
     def __init__(self, getter=None, setter=None, values=(), mapping=None,
                  limits=None, extract='', retries=0, checks=None,
-                 discard=None):
+                 discard=None, wait=None):
         if mapping:
             Mapping.__init__(self, getter, setter, mapping, extract,
-                             retries, checks, discard)
+                             retries, checks, discard, wait)
         elif values and not limits:
             Enumerable.__init__(self, getter, setter, values, extract,
-                                retries, checks, discard)
+                                retries, checks, discard, wait)
         else:
             if isinstance(limits, (tuple, list)):
                 limits = IntLimitsValidator(*limits)
             LimitsValidated.__init__(self, getter, setter, limits, extract,
-                                     retries, checks, discard)
+                                     retries, checks, discard, wait)
 
         self.modify_behavior('post_get', self.cast_to_int,
                              ('cast', 'append'), True)
@@ -87,32 +87,49 @@ class Float(LimitsValidated, Mapping, Enumerable):
     This Feature handle the cache in a specific fashion as values can have a
     unit but may be specified without one.
 
+    The unit is parsed on first access to avoid creating the UnitRegistry
+    when the driver class is declared.
+
+    Setting a value is skipped when it matches the last value sent to the
+    instrument within the resolution of the instrument. If no resolution is
+    specified a relative tolerance of REL_TOLERANCE is used. The step of the
+    limits is not considered as off-step values are rejected by the
+    validation which happens before the comparison.
+
+    Parameters
+    ----------
+    resolution : float, optional
+        Smallest difference between two values the instrument can resolve,
+        expressed in the unit of the Feature.
+
     """
+    #: Relative tolerance used to compare set values when no resolution is
+    #: known.
+    REL_TOLERANCE = 1e-9
+
     def __init__(self, getter=None, setter=None, values=(), mapping=None,
                  limits=None, unit=None, extract='', retries=0, checks=None,
-                 discard=None):
+                 discard=None, wait=None, resolution=None):
         if mapping:
             Mapping.__init__(self, getter, setter, mapping, extract,
-                             retries, checks, discard)
+                             retries, checks, discard, wait)
         elif values and not limits:
             Enumerable.__init__(self, getter, setter, values, extract,
-                                retries, checks, discard)
+                                retries, checks, discard, wait)
         else:
             if isinstance(limits, (tuple, list)):
                 limits = FloatLimitsValidator(*limits, unit=unit)
             LimitsValidated.__init__(self, getter, setter, limits, extract,
-                                     retries, checks, discard)
+                                     retries, checks, discard, wait)
 
-        if UNIT_SUPPORT and unit:
-            ureg = get_unit_registry()
-            self.unit = ureg.parse_expression(unit)
-        else:
-            self.unit = None
+        self._unit = unit if unit_support() and unit else None
+        self.resolution = resolution
 
         self.creation_kwargs.update({'unit': unit, 'values': values,
-                                     'limits': limits})
+                                     'limits': limits,
+                                     'resolution': resolution})
 
-        if UNIT_SUPPORT:
+        if unit_support():
             spec = (('convert', 'add_before', 'validate') if (values or limits)
                     else ('convert', 'prepend'))
             self.modify_behavior('pre_set',  self.convert,
@@ -121,6 +138,20 @@ class Float(LimitsValidated, Mapping, Enumerable):
         self.modify_behavior('post_get', self.cast_to_float,
                              ('cast', 'append'), True)
 
+    @property
+    def unit(self):
+        """Unit of the Feature or None.
+
+        """
+        unit = self._unit
+        if isinstance(unit, basestring):
+            unit = self._unit = parse_unit(unit)
+        return unit
+
+    @unit.setter
+    def unit(self, value):
+        self._unit = value
+
     def cast_to_float(self, driver, value):
         """Cast the value returned by the instrument to float or Quantity.
 
@@ -136,9 +167,9 @@ class Float(LimitsValidated, Mapping, Enumerable):
         """Convert unit.
 
         """
-        if isinstance(value, _Quantity):
+        if is_quantity(value):
             if self.unit:
-                value = value.to(self.unit).magnitude
+                value = magnitude_in(value, self.unit)
             else:
                 self.unit = value.units
                 value = value.magnitude
@@ -156,30 +187,6 @@ class Float(LimitsValidated, Mapping, Enumerable):
         else:
             return value
 
-    def _set(self, driver, value):
-        """Float setter, adapted to store both raw value and value with unit
-        in the cache.
-
-
-        """
-        with driver.lock:
-            cache = driver._cache
-            name = self.name
-            if name in cache and value in cache[name]:
-                return
-
-            set_chain(self, driver, value)
-
-            if driver.use_cache:
-                if UNIT_SUPPORT and self.unit:
-                    if isinstance(value, _Quantity):
-                        value = (value.magnitude, value)
-                    else:
-                        value = (value, value*self.unit)
-                else:
-                    value = (value,)
-                cache[name] = value
-
     def _get(self, driver):
         """Float getter adapted to the specific Float caching
 
@@ -191,9 +198,53 @@ class Float(LimitsValidated, Mapping, Enumerable):
                 return cache[name][-1]
 
             val = get_chain(self, driver)
-            if driver.use_cache:
-                if UNIT_SUPPORT and self.unit:
-                    cache[name] = (val.magnitude, val)
-                else:
-                    cache[name] = (val,)
+            self._cache_get(driver, val)
             return val
+
+    def _matches_cache(self, driver, value):
+        """Compare to both the raw value and the value with unit.
+
+        """
+        cache = driver._cache
+        name = self.name
+        return name in cache and value in cache[name]
+
+    def _same_i_value(self, cached, i_value):
+        """Compare the values within the tolerance of the instrument.
+
+        """
+        if not (isinstance(cached, Real) and isinstance(i_value, Real)):
+            return cached == i_value
+        if self.resolution:
+            tol = self.resolution/2
+        else:
+            tol = self.REL_TOLERANCE*max(abs(cached), abs(i_value))
+        return abs(cached - i_value) <= tol
+
+    def _cache_get(self, driver, value):
+        """Store both the magnitude and the value with unit.
+
+        """
+        if driver.use_cache:
+            if unit_support() and self.unit:
+                driver._cache[self.name] = (value.magnitude, value)
+            else:
+                driver._cache[self.name] = (value,)
+        if driver._observers:
+            notify_observers(driver, self.name, value)
+
+    def _cache_set(self, driver, value):
+        """Store both the raw value and the value with unit.
+
+        """
+        if unit_support() and self.unit:
+            if is_quantity(value):
+                value = (value.magnitude, value)
+            else:
+                value = (value, value*self.unit)
+        else:
+            value = (value,)
+        if driver.use_cache:
+            driver._cache[self.name] = value
+        if driver._observers:
+            notify_observers(driver, self.name, value[-1])
@@ -14,14 +14,22 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+import sys
 from future.utils import with_metaclass
+from past.builtins import basestring
 from types import FunctionType
 from inspect import cleandoc, getsourcelines, currentframe
 from itertools import chain
 from abc import ABCMeta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
-from .features.feature import Feature
+from .features.feature import Feature, get_features, set_features
+from .conditions import wait_until
+from .observers import observe
+from .util import start_operation
+from .history import record_history
+from .snapshot import snapshot, apply_state
+from .profiles import save_profile, restore_profile
 
 # Prefixes for Features and Action specially named methods.
 PRE_GET_PREFIX = '_pre_get_'
@@ -39,6 +47,15 @@ CUSTOMIZABLE = ((PRE_GET_PREFIX, 'pre_get'), (GET_PREFIX, 'get'),
 
 LIMITS_PREFIX = '_limits_'
 
+#: Policy used to build the docstrings of the features and subparts from the
+#: '#:' comments found in the source of the class declaring them:
+#: - 'lazy': the source is analysed when a docstring is first requested.
+#: - 'eager': the source is analysed when the class is created.
+#: - None: no docstring is collected (no source analysis at all).
+#: The value is read at class creation time so it should be set before
+#: importing the drivers.
+DOC_EXTRACTION = 'lazy' if sys.flags.optimize < 2 else None
+
 
 class set_feat(object):
     """Placeholder used to alter a feature in a subclass.
@@ -110,8 +127,11 @@ class _subpart(object):
         Class or classes to use as base class when no matching subpart exists
         on the driver.
 
+    prefix : unicode, optional
+        Command prefix of the subpart (see SubSystem.command_prefix).
+
     """
-    def __init__(self, bases=()):
+    def __init__(self, bases=(), prefix=None):
         self._name_ = ''
         if not isinstance(bases, tuple):
             bases = (bases,)
@@ -119,6 +139,8 @@ class _subpart(object):
         self._parent_ = None
         self._aliases_ = []
         self._temp_frame_ = None
+        if prefix is not None:
+            self.command_prefix = prefix
 
     def __setattr__(self, name, value):
         if isinstance(value, _subpart):
@@ -178,6 +200,10 @@ class subsystem(_subpart):
         Class or classes to use as base class when no matching subpart exists
         on the driver.
 
+    prefix : unicode, optional
+        Command prefix of the subsystem (see SubSystem.command_prefix). A
+        relative prefix is appended to the one of the parent.
+
     """
     pass
 
@@ -197,10 +223,128 @@ class channel(_subpart):
         Class or classes to use as base class when no matching subpart exists
         on the driver.
 
+    ttl : float, optional
+        Time in seconds during which the list of available channels is
+        considered valid. By default the list is queried only once and should
+        be refreshed explicitly using the container refresh_available method.
+        If absent the value of the declaration on the base class is used.
+
+    prefix : unicode, optional
+        Command prefix of the channel (see SubSystem.command_prefix). A
+        relative prefix is appended to the one of the parent. The channel id
+        can be used in the prefix (ex: ':SOUR{id}').
+
     """
-    def __init__(self, available=None, bases=()):
-        super(channel, self).__init__(bases)
+    def __init__(self, available=None, bases=(), ttl=None, prefix=None):
+        super(channel, self).__init__(bases, prefix)
         self._available_ = available
+        self._ttl_ = ttl
+
+
+def extract_docs(cls):
+    """Collect the docstrings of the class attributes from the source.
+
+    A docstring is made of the lines starting with '#:' preceding the
+    attribute assignment. This will work as long as two subpart are not
+    aliased in the same way which is probabbly good enough.
+
+    Parameters
+    ----------
+    cls : type
+        Class whose source should be analysed.
+
+    Returns
+    -------
+    docs : dict
+        Mapping between the attributes names (potentially prefixed by the
+        alias of a subpart) and their docstrings. If the source cannot be
+        retrieved the dictionary is empty.
+
+    """
+    docs = {}
+    try:
+        lines, _ = getsourcelines(cls)
+    except (IOError, TypeError):
+        return docs
+    doc = ''
+    for line in lines:
+        l = line.strip()
+        if l.startswith('#:'):
+            doc += ' ' + l[2:].strip()
+        elif ' = ' in l:
+            attr_name = l.split(' = ', 1)[0]
+            docs[attr_name] = doc.strip()
+            doc = ''
+
+    return docs
+
+
+def filter_subpart_docs(docs, aliases):
+    """Extract from the docs of a class the ones relevant to a subpart.
+
+    """
+    s_docs = {tuple(k.split('.', 1)): v for k, v in docs.items()}
+    return {k[-1]: v for k, v in s_docs.items()
+            if k[0] in aliases and len(k) == 2}
+
+
+class LazyDocs(object):
+    """Docstrings of the attributes of a class extracted on first access.
+
+    Parameters
+    ----------
+    cls : type, optional
+        Class whose source should be analysed.
+    parent : LazyDocs, optional
+        Docstrings of the parent class when used for a subpart.
+    aliases : iterable, optional
+        Aliases under which the subpart attributes appear in the parent
+        source.
+
+    """
+    __slots__ = ('cls', 'parent', 'aliases', '_docs')
+
+    def __init__(self, cls=None, parent=None, aliases=()):
+        self.cls = cls
+        self.parent = parent
+        self.aliases = aliases
+        self._docs = None
+
+    @property
+    def docs(self):
+        """Dictionary of the docstrings, built on first access.
+
+        """
+        if self._docs is None:
+            if self.parent is not None:
+                self._docs = filter_subpart_docs(self.parent.docs,
+                                                 self.aliases)
+            else:
+                self._docs = extract_docs(self.cls)
+            self.cls = None
+        return self._docs
+
+    def get(self, name, default=None):
+        return self.docs.get(name, default)
+
+    def __contains__(self, name):
+        return name in self.docs
+
+
+class _LazyClassDoc(object):
+    """Descriptor used as class docstring and resolved on first access.
+
+    """
+    __slots__ = ('docs', 'name')
+
+    def __init__(self, docs, name):
+        self.docs = docs
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if not isinstance(self.docs, basestring):
+            self.docs = self.docs.get(self.name, '')
+        return self.docs
 
 
 def make_cls_from_subpart(parent_name, part_name, part, base, docs):
@@ -224,7 +368,7 @@ def make_cls_from_subpart(parent_name, part_name, part, base, docs):
         Base type for the new class. Will be prepended to any class specified
         in the subpart declaration.
 
-    docs : dict
+    docs : dict or LazyDocs
         Dictionary containing the docstring collected on the parent.
 
     """
@@ -246,10 +390,12 @@ def make_cls_from_subpart(parent_name, part_name, part, base, docs):
             bases = tuple([Channel] + list(bases))
 
     # Extract the docstring specific to this subpart.
-    part_doc = docs.get(part_name, '')
-    s_docs = {tuple(k.split('.', 1)): v for k, v in docs.items()}
-    docs = {k[-1]: v for k, v in s_docs.items()
-            if k[0] in part._aliases_ and len(k) == 2}
+    if isinstance(docs, LazyDocs):
+        part_doc = _LazyClassDoc(docs, part_name)
+        docs = LazyDocs(parent=docs, aliases=part._aliases_)
+    else:
+        part_doc = docs.get(part_name, '')
+        docs = filter_subpart_docs(docs, part._aliases_)
 
     meta = type(bases[0])
     # Python 2 fix : class name can't be unicode
@@ -265,6 +411,19 @@ def make_cls_from_subpart(parent_name, part_name, part, base, docs):
     return new_class
 
 
+def prefix_command(prefix, cmd):
+    """Prepend a prefix to a relative command.
+
+    Commands which are not strings (custom getter/setter), absolute (starting
+    with ':') or common commands (starting with '*') are left untouched.
+
+    """
+    if not prefix or not isinstance(cmd, basestring) or not cmd or\
+            cmd[0] in (':', '*'):
+        return cmd
+    return prefix.rstrip(':') + ':' + cmd
+
+
 class AbstractHasFeatures(with_metaclass(ABCMeta, object)):
     """Sentinel class for the collections of Features.
 
@@ -365,25 +524,33 @@ class HasFeaturesMeta(type):
         bases = [b for b in bases if issubclass(b, AbstractHasFeatures)]
 
         # Analyse the source code to find the doc for the defined Features.
-        # This will work as long as two subpart are not aliased in the same
-        # way which is probabbly good enough.
         if docs is None:
-            docs = {}
-            lines, _ = getsourcelines(cls)
-            doc = ''
-            for line in lines:
-                l = line.strip()
-                if l.startswith('#:'):
-                    doc += ' ' + l[2:].strip()
-                elif ' = ' in l:
-                    attr_name = l.split(' = ', 1)[0]
-                    docs[attr_name] = doc.strip()
-                    doc = ''
-
-        # Make the feature build their docs from the provided docstrings.
-        for f in feats:
-            if f in docs:
-                feats[f].make_doc(docs[f])
+            if DOC_EXTRACTION == 'lazy':
+                docs = LazyDocs(cls)
+            elif DOC_EXTRACTION == 'eager':
+                docs = extract_docs(cls)
+            else:
+                docs = {}
+
+        # Make the feature build their docs from the provided docstrings
+        # (when first requested if the docs are collected lazily).
+        if isinstance(docs, LazyDocs):
+            for f in feats:
+                feats[f]._doc_source_ = (docs, f)
+        else:
+            for f in feats:
+                if f in docs:
+                    feats[f].make_doc(docs[f])
+
+        # Fold the command prefix into the commands of the features declared
+        # on this class (inherited ones already went through this).
+        prefix = getattr(cls, 'command_prefix', '')
+        if prefix:
+            for feat in feats.values():
+                getter = prefix_command(prefix, feat._getter)
+                setter = prefix_command(prefix, feat._setter)
+                feat._getter = feat.creation_kwargs['getter'] = getter
+                feat._setter = feat.creation_kwargs['setter'] = setter
 
         # Handle the subparts by creating dynamic subclasses.
         inherited_ss = dict([(k, v) for b in bases
@@ -395,6 +562,14 @@ class HasFeaturesMeta(type):
             part_name = k
             if not hasattr(part, 'retries_exceptions'):
                 part.retries_exceptions = cls.retries_exceptions
+            # Compose the subpart command prefix with ours. If the subpart
+            # does not declare one it uses ours unless it inherits one.
+            if prefix:
+                if 'command_prefix' in part.__dict__:
+                    part.command_prefix = prefix_command(prefix,
+                                                         part.command_prefix)
+                elif k not in inherited_ss and k not in inherited_ch:
+                    part.command_prefix = prefix
             # If a subpart with the same name has already been declared on a
             # parent class we use its class as a base class for the one we are
             # about to create.
@@ -411,7 +586,9 @@ class HasFeaturesMeta(type):
                 # Must be valid otherwise parent declaration would be messed up
                 available = (part._available_ if part._available_ else
                              inherited_ch[k][1])
-                channels[part_name] = (ch_cls, available)
+                ttl = (part._ttl_ if part._ttl_ is not None else
+                       inherited_ch[k][2])
+                channels[part_name] = (ch_cls, available, ttl)
 
             else:
                 if isinstance(part, subsystem):
@@ -425,7 +602,8 @@ class HasFeaturesMeta(type):
                     if not part._available_:
                         msg = 'No way to identify channels defined for {}'
                         raise ValueError(msg.format(k))
-                    channels[part_name] = (ch_cls, part._available_)
+                    channels[part_name] = (ch_cls, part._available_,
+                                           part._ttl_)
 
         # Put references to the subsystem and channel classes on the class.
         for k, v in subsystems.items():
@@ -459,6 +637,13 @@ class HasFeaturesMeta(type):
         # declared.
         for k, v in feat_paras.items():
             feat = v.customize(all_feats[k])
+            # Newly specified commands must be prefixed.
+            if 'getter' in v.custom_attrs:
+                feat._getter = prefix_command(prefix, feat._getter)
+                feat.creation_kwargs['getter'] = feat._getter
+            if 'setter' in v.custom_attrs:
+                feat._setter = prefix_command(prefix, feat._setter)
+                feat.creation_kwargs['setter'] = feat._setter
             owned_feats.add(k)
             all_feats[k] = feat
             setattr(cls, k, feat)
@@ -526,8 +711,19 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
     def __init__(self, caching_allowed=True):
 
         self._cache = {}
+        # Results of the Actions declared with cache=True by name (see
+        # Action.add_cache).
+        self._action_cache = {}
+        # Values sent to the instrument by the last set of each Feature (see
+        # Feature._matches_i_value).
+        self._i_values = {}
         self._limits_cache = {}
         self._proxies = {}
+        # Pollers shared by the threads waiting on a Feature (see wait_until).
+        self._pollers = {}
+        # Observers of the cache updates by Feature name, None is used for
+        # the patterns (see observe).
+        self._observers = {}
 
         subsystems = self.__subsystems__
         channels = self.__channels__
@@ -540,11 +736,51 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
             setattr(self, ss, subsystem)
 
         # Creating a channel container for each kind of declared channels.
-        for ch, (cls, listing) in channels.items():
+        for ch, (cls, listing, ttl) in channels.items():
             from .channel import ChannelContainer
-            ch_holder = ChannelContainer(cls, self, ch, listing)
+            ch_holder = ChannelContainer(cls, self, ch, listing, ttl)
             setattr(self, ch, ch_holder)
 
+    def read_features(self, names):
+        """Read the values of multiple Features at once.
+
+        The queries of the Features using the default get behaviour are
+        grouped and sent through default_get_features.
+
+        Parameters
+        ----------
+        names : iterable of unicode
+            Names of the Features to read. Dotted names can be used to access
+            subsystems.
+
+        Returns
+        -------
+        values : OrderedDict
+            Values of the Features, keyed by the provided names.
+
+        """
+        items = [self._resolve_feature(name) for name in names]
+        return OrderedDict(zip(names, get_features(items)))
+
+    def write_features(self, values):
+        """Set the values of multiple Features at once.
+
+        The commands of the Features using the default set behaviour are
+        grouped and sent through default_set_features. The order of the
+        values is preserved.
+
+        Parameters
+        ----------
+        values : dict
+            Mapping between Features names and the values to set. Dotted names
+            can be used to access subsystems. Use an OrderedDict when the
+            order of the operations matters.
+
+        """
+        items = [self._resolve_feature(name) + (value,)
+                 for name, value in values.items()]
+        set_features(items)
+
     def get_feat(self, name):
         """ Acces the feature matching the given name.
 
@@ -594,8 +830,9 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
                         sss[aux].append(n)
                     else:
                         chs[aux].append(n)
-                elif name in cache:
-                    del cache[name]
+                else:
+                    cache.pop(name, None)
+                    self._action_cache.pop(name, None)
 
             if par:
                 self.parent.clear_cache(features=par)
@@ -609,6 +846,8 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
                         o.clear_cache(features=chs[ch])
         else:
             self._cache = {}
+            self._action_cache = {}
+            self._i_values = {}
             if subsystems:
                 for ss in self.__subsystems__:
                     getattr(self, ss).clear_cache(channels=channels)
@@ -617,6 +856,37 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
                     for ch in getattr(self, chs):
                         ch.clear_cache(subsystems)
 
+    def clear_action_cache(self, actions=None, subsystems=True,
+                           channels=True):
+        """Clear the results cached by the Actions declared with cache=True.
+
+        Parameters
+        ----------
+        actions : iterable of str, optional
+            Names of the actions whose cache should be cleared. If None the
+            cache of all the actions is cleared.
+        subsystems : bool, optional
+            Whether or not to clear the subsystems. This argument is used only
+            if actions is None.
+        channels : bool, optional
+            Whether or not to clear the channels. This argument is used only
+            if actions is None.
+
+        """
+        if actions is not None:
+            for name in actions:
+                self._action_cache.pop(name, None)
+            return
+
+        self._action_cache = {}
+        if subsystems:
+            for ss in self.__subsystems__:
+                getattr(self, ss).clear_action_cache(channels=channels)
+        if channels and self.__channels__:
+            for chs in self.__channels__:
+                for ch in getattr(self, chs):
+                    ch.clear_action_cache(subsystems=subsystems)
+
     def check_cache(self, subsystems=True, channels=True, features=None):
         """Return the value of the cache of the object.
 
@@ -731,6 +1001,9 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
     def reopen_connection(self):
         """Reopen the connection to the instrument.
 
+        Implementations should call clear_action_cache as the instrument
+        state may have changed.
+
         """
         raise NotImplementedError()
 
@@ -773,6 +1046,49 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
         """
         raise NotImplementedError()
 
+    def default_get_features(self, requests):
+        """Method used to retrieve multiple values from an instrument at once.
+
+        By default this calls default_get_feature for each request. Backends
+        able to group multiple queries in a single exchange should override it.
+
+        Parameters
+        ----------
+        requests : list
+            List of tuple (feat, cmd, kwargs) describing the calls which would
+            have been made to default_get_feature.
+
+        Returns
+        -------
+        answers : list
+            Answers for each request in the same order.
+
+        """
+        return [self.default_get_feature(feat, cmd, **kwargs)
+                for feat, cmd, kwargs in requests]
+
+    def default_set_features(self, requests):
+        """Method used to set multiple instrument values at once.
+
+        By default this calls default_set_feature for each request. Backends
+        able to group multiple commands in a single exchange should override
+        it.
+
+        Parameters
+        ----------
+        requests : list
+            List of tuple (feat, cmd, value, kwargs) describing the calls
+            which would have been made to default_set_feature.
+
+        Returns
+        -------
+        responses : list
+            Responses for each request in the same order.
+
+        """
+        return [self.default_set_feature(feat, cmd, value, **kwargs)
+                for feat, cmd, value, kwargs in requests]
+
     def default_check_operation(self, feat, value, i_value, state=None):
         """Method used by default by the Feature to check the instrument
         operation.
@@ -799,5 +1115,295 @@ class HasFeatures(with_metaclass(HasFeaturesMeta, object)):
         """
         raise NotImplementedError()
 
+    def observe(self, name, callback, coalesce=None):
+        """Observe the updates of the cached values of Features.
+
+        The callback is called each time a Feature value is read from or
+        written to the instrument (and stored in the cache if the driver uses
+        it).
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature to observe. Dotted names can be used to access
+            subsystems and fnmatch patterns (ie '*' or 'output.volt*') to
+            observe multiple Features. Passing the name of a subsystem is
+            equivalent to observing all its Features. Channels are observed by
+            calling this method on the channel instances.
+
+        callback : callable
+            Function called with the name of the Feature (relative to this
+            object) and its new value.
+
+        coalesce : float, optional
+            If specified, notifications are delayed by this amount of seconds
+            and only the last value of each Feature updated in this window is
+            passed to the callback (from a background thread). Otherwise the
+            callback is called immediately, while holding the driver lock.
+
+        Returns
+        -------
+        observer : Observer
+            Object whose cancel method stops the observation.
+
+        """
+        return observe(self, name, callback, coalesce)
+
+    def record_history(self, name, depth=1000, dtype=float):
+        """Record the successive values of a numerical Feature.
+
+        The values read from or written to the instrument are stored, with
+        the time at which they were received, in preallocated NumPy ring
+        buffers which can be queried by time window or decimated for
+        plotting. NumPy is required.
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature. Dotted names can be used to access
+            subsystems.
+
+        depth : int, optional
+            Number of values to keep, older values are overwritten.
+
+        dtype : numpy.dtype, optional
+            Type used to store the values (magnitudes for quantities).
+
+        Returns
+        -------
+        history : FeatureHistory
+            History whose stop method ends the recording.
+
+        """
+        return record_history(self, name, depth, dtype)
+
+    def snapshot(self, refresh=False):
+        """Read the values of all the readable Features.
+
+        The Features of the subsystems and of all the available channels are
+        included. Cached values are reused (unless refresh is True) and the
+        remaining queries are grouped (see read_features), channels Features
+        being read on all the channels at once when the driver declares a
+        bulk getter (see ChannelContainer). The driver lock is held during
+        the whole capture so that the values are consistent. Use
+        lantz_core.snapshot.snapshot_all to capture multiple drivers in
+        parallel.
+
+        When a grouped read fails, the Features are read one by one and the
+        errors of the failing ones are recorded in Snapshot.errors, the other
+        values being returned.
+
+        Parameters
+        ----------
+        refresh : bool, optional
+            Whether to clear the cached values of the Features before reading
+            them. The cached results of the actions are kept.
+
+        Returns
+        -------
+        snapshot : Snapshot
+            Nested values along with the capture time, duration and errors.
+
+        """
+        return snapshot(self, refresh)
+
+    def apply_state(self, target, refresh=False, force=False):
+        """Set the Features differing from a target state.
+
+        The current values are taken from the cache, the uncached ones being
+        read in a single batch, and only the Features whose value differs are
+        written, along with the Features whose value or limits are discarded
+        by those writes. The writes are ordered so that a Feature is set after
+        the Features discarding its value or limits (ie a range before a
+        level) and the ones referenced by its checks, and the independent
+        writes are grouped (see write_features).
+
+        Parameters
+        ----------
+        target : dict or Snapshot
+            Values to set, structured as the values of a Snapshot: nested
+            dicts for subsystems and dicts mapping channel ids to nested dicts
+            for channels.
+
+        refresh : bool, optional
+            Whether to read again the current values instead of trusting the
+            cache.
+
+        force : bool, optional
+            Whether to write all the values without comparing them to the
+            current ones, which saves the reads when most values differ.
+
+        Returns
+        -------
+        changes : StateChanges
+            Written values along with the previous ones and the duration of
+            the operation.
+
+        """
+        return apply_state(self, target, refresh, force)
+
+    def save_profile(self, path):
+        """Save the configuration of the instrument in a binary profile.
+
+        The values of all the Features which can be both read and written,
+        including the ones of subsystems and channels, are captured (see
+        snapshot) and stored in a compact versioned format (see
+        lantz_core.profiles, which also provides a ProfileStore managing
+        named profiles). The file is written atomically: it is either
+        replaced by the complete profile or left untouched.
+
+        Parameters
+        ----------
+        path : unicode
+            Path of the file in which to write the profile.
+
+        """
+        save_profile(self, path)
+
+    def restore_profile(self, path, refresh=False, force=False,
+                        strict=True):
+        """Restore the configuration saved in a binary profile.
+
+        Only the values differing from the cached ones are written, unless
+        force is True (see apply_state).
+
+        Parameters
+        ----------
+        path : unicode
+            Path of the profile file.
+
+        refresh, force : bool, optional
+            See apply_state.
+
+        strict : bool, optional
+            Whether to refuse profiles saved from a driver class which is
+            neither the class of this driver nor one of its bases.
+
+        Returns
+        -------
+        changes : StateChanges
+            Report of the written values.
+
+        Raises
+        ------
+        ValueError :
+            If strict is True and the profile comes from another driver.
+
+        """
+        return restore_profile(self, path, refresh, force, strict)
+
+    def wait_until(self, name, predicate, timeout=None, min_interval=0.01,
+                   max_interval=1., shared=False):
+        """Wait for a Feature to meet a condition.
+
+        The Feature is read bypassing the cache. The driver lock is released
+        between two reads whose interval adapts to the evolution of the value:
+        it is halved when the value changes and doubled when it does not.
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature. Dotted names can be used to access
+            subsystems.
+
+        predicate : callable or object
+            Function called with the value of the Feature and returning True
+            once the condition is met. Other objects are compared to the
+            value.
+
+        timeout : float, optional
+            Maximal time to wait in seconds. None means waiting forever.
+
+        min_interval, max_interval : float, optional
+            Bounds of the interval between two reads in seconds.
+
+        shared : bool, optional
+            Whether to share the reads with the other threads waiting on the
+            same Feature with shared=True. The reads then happen in a
+            background thread, using the intervals of the first waiter, and
+            each value is checked against all the conditions.
+
+        Returns
+        -------
+        value :
+            First read value meeting the condition.
+
+        Raises
+        ------
+        TimeoutError :
+            If the condition is not met before the timeout expires.
+
+        """
+        return wait_until(self, name, predicate, timeout, min_interval,
+                          max_interval, shared)
+
+    def arm_operation_complete(self):
+        """Start tracking the completion of the pending operations.
+
+        This is called right after sending the commands triggering a long
+        operation (while still holding the driver lock) by the Features and
+        Actions declared with wait='opc'. Drivers should typically implement
+        it by issuing an *OPC or equivalent command.
+
+        Returns
+        -------
+        wait : callable
+            Function taking an optional timeout (in seconds) and returning
+            once the operations are complete. It should not hold the driver
+            lock while waiting and raise a TimeoutError if the operations do
+            not complete in time.
+
+        """
+        raise NotImplementedError()
+
+    def start_set(self, name, value):
+        """Set a Feature without waiting for the operation to complete.
+
+        The value is sent before returning but the wait for the completion
+        of the operation (see the wait argument of Feature) is performed in a
+        background thread. On Python 2 this requires the futures backport.
+
+        Parameters
+        ----------
+        name : unicode
+            Name of the Feature. Dotted names can be used to access
+            subsystems.
+
+        value :
+            Value to set.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future whose result is None, set once the operation is complete.
+
+        """
+        feat, obj = self._resolve_feature(name)
+        return start_operation(feat.__set__, obj, value)
+
+    def wait_operation_complete(self, timeout=None):
+        """Wait for the completion of the pending operations.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximal time to wait in seconds, None means waiting forever.
+
+        """
+        with self.lock:
+            wait = self.arm_operation_complete()
+        wait(timeout)
+
+    def _resolve_feature(self, name):
+        """Find the Feature and the object holding it from a dotted name.
+
+        """
+        obj = self
+        if '.' in name:
+            path, name = name.rsplit('.', 1)
+            for part in path.split('.'):
+                obj = getattr(obj, part)
+        return (getattr(type(obj), name), obj)
+
 
 AbstractHasFeatures.register(HasFeatures)
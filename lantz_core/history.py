@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.history
+    ~~~~~~~~~~~~~~~~~~
+
+    Recording of the successive values of numerical Features.
+
+    The values are stored in preallocated NumPy ring buffers so that the
+    memory used by a long running monitoring session is bounded and windows of
+    the history can be retrieved without iterating over Python objects. NumPy
+    is only imported when a history is created.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from threading import Lock
+from time import time
+
+from .unit import is_quantity
+
+
+class FeatureHistory(object):
+    """Ring buffer storing the last values of a Feature and their timestamps.
+
+    Parameters
+    ----------
+    depth : int
+        Maximal number of values to keep.
+
+    dtype : numpy.dtype, optional
+        Type of the stored values.
+
+    Attributes
+    ----------
+    observer : Observer or None
+        Observer feeding the history when created by
+        HasFeatures.record_history.
+
+    """
+    def __init__(self, depth, dtype=float):
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('NumPy is necessary to record the history of '
+                              'Features.')
+        self._np = numpy
+        self.depth = depth
+        self.times = numpy.empty(depth)
+        self.values = numpy.empty(depth, dtype=dtype)
+        self.observer = None
+        self._index = 0
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value, timestamp=None):
+        """Add a value to the history.
+
+        Quantities are stored as their magnitude.
+
+        """
+        if is_quantity(value):
+            value = value.magnitude
+        with self._lock:
+            i = self._index
+            self.times[i] = time() if timestamp is None else timestamp
+            self.values[i] = value
+            self._index = (i + 1) % self.depth
+            self._count = min(self._count + 1, self.depth)
+
+    def clear(self):
+        """Forget all the recorded values.
+
+        """
+        with self._lock:
+            self._index = self._count = 0
+
+    def stop(self):
+        """Stop recording the values of the Feature.
+
+        """
+        if self.observer is not None:
+            self.observer.cancel()
+            self.observer = None
+
+    def get(self, start=None, stop=None):
+        """Access the values recorded in a time window.
+
+        Parameters
+        ----------
+        start, stop : float, optional
+            Bounds of the window (as returned by time.time). The bounds are
+            included and None means no bound.
+
+        Returns
+        -------
+        times, values : numpy.ndarray
+            Copies of the timestamps and values in chronological order.
+
+        """
+        np = self._np
+        with self._lock:
+            times, values = [], []
+            for t, v in self._segments():
+                lo = 0 if start is None else np.searchsorted(t, start, 'left')
+                hi = (len(t) if stop is None else
+                      np.searchsorted(t, stop, 'right'))
+                times.append(t[lo:hi])
+                values.append(v[lo:hi])
+            return np.concatenate(times), np.concatenate(values)
+
+    def decimate(self, points, start=None, stop=None):
+        """Reduce the values in a time window to a given number of points.
+
+        The values are split into at most points consecutive buckets of
+        (almost) equal size and the minimum and maximum of each bucket are
+        returned so that plotting the envelope preserves the extrema.
+
+        Parameters
+        ----------
+        points : int
+            Maximal number of buckets.
+
+        start, stop : float, optional
+            Bounds of the window (see get).
+
+        Returns
+        -------
+        times, minima, maxima : numpy.ndarray
+            Mean timestamp, minimum and maximum of each bucket.
+
+        """
+        np = self._np
+        times, values = self.get(start, stop)
+        n = len(times)
+        if n <= points:
+            return times, values, values.copy()
+        bounds = np.linspace(0, n, points + 1).astype(int)
+        starts = bounds[:-1]
+        sizes = np.diff(bounds)
+        return (np.add.reduceat(times, starts)/sizes,
+                np.minimum.reduceat(values, starts),
+                np.maximum.reduceat(values, starts))
+
+    def _segments(self):
+        """Views on the stored data in chronological order.
+
+        """
+        i, n = self._index, self._count
+        t, v = self.times, self.values
+        if n < self.depth:
+            return [(t[:n], v[:n])]
+        return [(t[i:], v[i:]), (t[:i], v[:i])]
+
+
+def record_history(obj, name, depth, dtype=float):
+    """Record the values of a Feature (see HasFeatures.record_history).
+
+    """
+    history = FeatureHistory(depth, dtype)
+    history.observer = obj.observe(name,
+                                   lambda n, value: history.append(value))
+    return history
@@ -11,13 +11,14 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+import sys
 from types import MethodType
 from math import modf
 from functools import update_wrapper
+from past.builtins import basestring
 
-from .unit import UNIT_SUPPORT, get_unit_registry
-if UNIT_SUPPORT:
-    from pint.quantity import _Quantity
+from .unit import (unit_support, parse_unit, is_quantity,
+                   get_conversion_factor, convert_magnitude, magnitude_in)
 
 
 class AbstractLimitsValidator(object):
@@ -36,10 +37,50 @@ class AbstractLimitsValidator(object):
     -------
     validate :
         Validate a given value against the range.
+    validate_many :
+        Validate a sequence of values at once.
 
     """
     __slots__ = ('minimum', 'maximum', 'step', 'validate')
 
+    def validate_many(self, values):
+        """Validate a sequence of values.
+
+        NumPy arrays are validated in a vectorized fashion, other sequences
+        element by element.
+
+        Returns
+        -------
+        invalid : list
+            Indexes of the invalid values.
+
+        """
+        np = _numpy_for(values)
+        if np is not None:
+            return np.flatnonzero(~self._validate_array(np, values)).tolist()
+        validate = self.validate
+        return [i for i, v in enumerate(values) if not validate(v)]
+
+    def _validate_array(self, np, values):
+        """Validate a NumPy array and return the array of valid elements.
+
+        """
+        valid = np.ones(values.shape, dtype=bool)
+        if self.minimum is not None:
+            valid &= values >= self.minimum
+        if self.maximum is not None:
+            valid &= values <= self.maximum
+        if self.step:
+            ref = self.minimum if self.minimum is not None else self.maximum
+            valid &= self._on_step(np, values - ref)
+        return valid
+
+    def _on_step(self, np, offsets):
+        """Check that offsets from the reference are multiple of the step.
+
+        """
+        raise NotImplementedError()
+
 
 class IntLimitsValidator(AbstractLimitsValidator):
     """Limits used to validate a the value of an integer.
@@ -95,6 +136,12 @@ class IntLimitsValidator(AbstractLimitsValidator):
             else:
                 self.validate = self._validate_smaller
 
+    def _on_step(self, np, offsets):
+        """Check that offsets from the reference are multiple of the step.
+
+        """
+        return offsets % self.step == 0
+
     def _validate_smaller(self, value):
         """Check if the value is smaller than the maximum.
 
@@ -150,7 +197,7 @@ class FloatLimitsValidator(AbstractLimitsValidator):
     Attributes
     ----------
     unit : Unit or None
-        Unit used when validating.
+        Unit used when validating. The unit is parsed on first access.
 
     Methods
     -------
@@ -161,7 +208,7 @@ class FloatLimitsValidator(AbstractLimitsValidator):
 
     """
 
-    __slots__ = ('unit')
+    __slots__ = ('_unit')
 
     def __init__(self, min=None, max=None, step=None, unit=None):
         mess = 'The {} of an FloatLimitsValidator must be a float not {}.'
@@ -178,11 +225,11 @@ class FloatLimitsValidator(AbstractLimitsValidator):
         self.maximum = float(max) if max is not None else None
         self.step = float(step) if step is not None else None
 
-        if UNIT_SUPPORT and unit:
-            ureg = get_unit_registry()
-            self.unit = ureg.parse_expression(unit)
+        if unit_support() and unit:
+            self._unit = unit
             wrap = self._unit_conversion
         else:
+            self._unit = None
             wrap = lambda x: x
 
         if min is not None:
@@ -202,6 +249,44 @@ class FloatLimitsValidator(AbstractLimitsValidator):
             else:
                 self.validate = wrap(self._validate_smaller)
 
+    @property
+    def unit(self):
+        """Unit used when validating.
+
+        """
+        unit = self._unit
+        if isinstance(unit, basestring):
+            unit = self._unit = parse_unit(unit)
+        return unit
+
+    def validate_many(self, values, unit=None):
+        """Validate a sequence of values expressed in the given unit.
+
+        Returns
+        -------
+        invalid : list
+            Indexes of the invalid values.
+
+        """
+        if self._unit:
+            if is_quantity(values):
+                values = magnitude_in(values, self.unit)
+            elif unit:
+                factor = get_conversion_factor(unit, self.unit)
+                if factor is None or _numpy_for(values) is None:
+                    values = [convert_magnitude(v, unit, self.unit)
+                              for v in values]
+                elif factor != 1:
+                    values = values*factor
+        return super(FloatLimitsValidator, self).validate_many(values)
+
+    def _on_step(self, np, offsets):
+        """Check that offsets from the reference are multiple of the step.
+
+        """
+        ratio = np.round(np.abs(offsets/self.step), 9)
+        return np.modf(ratio)[0] < 1e-9
+
     def _unit_conversion(self, cmp_func):
         """Decorator handling unit conversion to the unit.
 
@@ -210,11 +295,11 @@ class FloatLimitsValidator(AbstractLimitsValidator):
             cmp_func = cmp_func.__func__
 
         def wrapper(self, value, unit=None):
-            if unit and unit != self.unit:
-                value *= (1*unit).to(self.unit).magnitude
+            if is_quantity(value):
+                value = magnitude_in(value, self.unit)
 
-            elif isinstance(value, _Quantity):
-                value = value.to(self.unit).magnitude
+            elif unit:
+                value = convert_magnitude(value, unit, self.unit)
 
             return cmp_func(self, value)
 
@@ -261,3 +346,15 @@ class FloatLimitsValidator(AbstractLimitsValidator):
         ratio = round(abs((value-self.minimum)/self.step), 9)
         return self.minimum <= value <= self.maximum\
             and abs(modf(ratio)[0]) < 1e-9
+
+
+def _numpy_for(values):
+    """Get the NumPy module if values is a NumPy array.
+
+    NumPy is never imported by this function as no array can exist before.
+
+    """
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray):
+        return np
+    return None
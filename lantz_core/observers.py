@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.observers
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Notification of the updates of the cached values of Features.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+import logging
+from fnmatch import fnmatchcase
+from threading import Lock, Timer
+
+#: Characters marking a name as a pattern.
+WILDCARDS = frozenset('*?[')
+
+
+class Observer(object):
+    """Callback notified of the updates of the cache of some Features.
+
+    Parameters
+    ----------
+    obj : HasFeatures
+        Object on which the observed Features are declared.
+
+    pattern : unicode
+        Name of the Feature or fnmatch pattern matching the names of the
+        Features.
+
+    callback : callable
+        Function called with the name of the Feature (prefixed by the path of
+        the subsystem relative to the observing object) and its new value.
+
+    prefix : unicode, optional
+        Prefix to add to the names passed to the callback.
+
+    coalesce : float, optional
+        If specified, the notifications are delayed by this amount of seconds
+        and only the last value of each Feature updated in that window is
+        passed to the callback, from a background thread. Otherwise the
+        callback is called immediately while the driver lock is held.
+
+    """
+    def __init__(self, obj, pattern, callback, prefix='', coalesce=None):
+        self.obj = obj
+        self.pattern = pattern
+        self.callback = callback
+        self.prefix = prefix
+        self.coalesce = coalesce
+        self._lock = Lock()
+        self._pending = {}
+        self._timer = None
+
+    @property
+    def key(self):
+        """Key under which the observer is stored on the object.
+
+        None is used for patterns.
+
+        """
+        return None if WILDCARDS & set(self.pattern) else self.pattern
+
+    def notify(self, name, value):
+        """Notify the update of a Feature value.
+
+        """
+        if self.coalesce is None:
+            self._call(name, value)
+            return
+
+        with self._lock:
+            self._pending[name] = value
+            if self._timer is None:
+                self._timer = Timer(self.coalesce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Deliver the pending notifications.
+
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+        for name, value in pending.items():
+            self._call(name, value)
+
+    def cancel(self):
+        """Stop observing.
+
+        """
+        observers = self.obj._observers
+        entries = observers.get(self.key, [])
+        if self in entries:
+            # Replace the list as notify_observers may be iterating over it.
+            entries = [o for o in entries if o is not self]
+            if entries:
+                observers[self.key] = entries
+            else:
+                del observers[self.key]
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = {}
+
+    def _call(self, name, value):
+        try:
+            self.callback(self.prefix + name, value)
+        except Exception:
+            logger = logging.getLogger(__name__)
+            logger.exception('Error in the observer of %s', name)
+
+
+def observe(obj, name, callback, coalesce=None):
+    """Observe the updates of the cache of Features.
+
+    See HasFeatures.observe for the description of the arguments.
+
+    """
+    parts = name.split('.')
+    pattern = parts.pop()
+    prefix = ''
+    for part in parts:
+        obj = getattr(obj, part)
+        prefix += part + '.'
+    if pattern in obj.__subsystems__:
+        obj = getattr(obj, pattern)
+        prefix += pattern + '.'
+        pattern = '*'
+
+    observer = Observer(obj, pattern, callback, prefix, coalesce)
+    key = observer.key
+    obj._observers[key] = obj._observers.get(key, []) + [observer]
+    return observer
+
+
+def notify_observers(obj, name, value):
+    """Notify the observers of an object that a Feature value was updated.
+
+    """
+    observers = obj._observers
+    for observer in observers.get(name, ()):
+        observer.notify(name, value)
+    for observer in observers.get(None, ()):
+        if fnmatchcase(name, observer.pattern):
+            observer.notify(name, value)
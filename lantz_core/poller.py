@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.poller
+    ~~~~~~~~~~~~~~~~~
+
+    Service polling Features in the background on behalf of multiple
+    consumers.
+
+    Consumers (GUIs, loggers, ...) subscribe to a Feature of a driver with the
+    interval at which they need fresh values. The subscriptions are merged per
+    driver so that each Feature is read once at the smallest requested
+    interval, the Features due at the same time are read in a single batch
+    (see HasFeatures.read_features) and a minimal spacing between two reads of
+    the same driver can be enforced. Each driver is polled by its own thread
+    so that slow instruments do not delay the others.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+import logging
+from threading import Condition, Lock, Thread
+from time import time
+
+_POLLER = None
+
+_POLLER_LOCK = Lock()
+
+
+class Subscription(object):
+    """Subscription of a consumer to the values of a Feature.
+
+    """
+    __slots__ = ('poller', 'driver', 'name', 'interval', 'callback')
+
+    def __init__(self, poller, driver, name, interval, callback):
+        self.poller = poller
+        self.driver = driver
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+
+    def cancel(self):
+        """Stop receiving values.
+
+        """
+        self.poller.unsubscribe(self)
+
+
+class FeaturePoller(object):
+    """Service polling Features in the background.
+
+    Parameters
+    ----------
+    min_spacing : float, optional
+        Default minimal time in seconds between the end of a batch of reads
+        and the start of the next one on the same driver.
+
+    grouping : float, optional
+        Features due within this time (in seconds) after the first due one
+        are read in the same batch.
+
+    """
+    def __init__(self, min_spacing=0., grouping=0.01):
+        self.min_spacing = min_spacing
+        self.grouping = grouping
+        self._lock = Lock()
+        self._schedules = {}
+        self._spacings = {}
+
+    def subscribe(self, driver, name, interval, callback):
+        """Receive the values of a Feature at a given interval.
+
+        Parameters
+        ----------
+        driver : HasFeatures
+            Driver holding the Feature.
+
+        name : unicode
+            Name of the Feature, dotted names can be used to access
+            subsystems.
+
+        interval : float
+            Interval in seconds between two values.
+
+        callback : callable
+            Function called from the polling thread with the name of the
+            Feature, its value and the time at which it was read. It should
+            return quickly as it delays the next reads.
+
+        Returns
+        -------
+        subscription : Subscription
+            Object whose cancel method ends the subscription.
+
+        """
+        sub = Subscription(self, driver, name, interval, callback)
+        with self._lock:
+            schedule = self._schedules.get(driver)
+            if schedule is None:
+                spacing = self._spacings.get(driver, self.min_spacing)
+                schedule = _DriverSchedule(self, driver, spacing)
+                self._schedules[driver] = schedule
+                schedule.add(sub)
+                schedule.start()
+            else:
+                schedule.add(sub)
+        return sub
+
+    def unsubscribe(self, subscription):
+        """End a subscription.
+
+        """
+        with self._lock:
+            schedule = self._schedules.get(subscription.driver)
+            if schedule and schedule.remove(subscription):
+                del self._schedules[subscription.driver]
+                schedule.stop()
+
+    def set_min_spacing(self, driver, spacing):
+        """Set the minimal time between two batches of reads on a driver.
+
+        """
+        with self._lock:
+            self._spacings[driver] = spacing
+            schedule = self._schedules.get(driver)
+            if schedule:
+                schedule.spacing = spacing
+
+    def stop(self):
+        """End all the subscriptions and wait for the polling threads.
+
+        """
+        with self._lock:
+            schedules = list(self._schedules.values())
+            self._schedules.clear()
+        for s in schedules:
+            s.stop()
+            s.join()
+
+
+class _DriverSchedule(object):
+    """Polling thread of a driver.
+
+    """
+    def __init__(self, poller, driver, spacing):
+        self.poller = poller
+        self.driver = driver
+        self.spacing = spacing
+        # Subscriptions and next read time by Feature name.
+        self.subscriptions = {}
+        self.due = {}
+        self.condition = Condition()
+        self.running = True
+        self.thread = Thread(target=self.run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def join(self):
+        self.thread.join()
+
+    def add(self, sub):
+        with self.condition:
+            self.subscriptions.setdefault(sub.name, []).append(sub)
+            if sub.name not in self.due:
+                # Leave the time to other subscriptions to be added to the
+                # first batch.
+                self.due[sub.name] = time() + self.poller.grouping
+            self.condition.notify()
+
+    def remove(self, sub):
+        """Remove a subscription and return whether none remains.
+
+        """
+        with self.condition:
+            subs = self.subscriptions.get(sub.name, [])
+            if sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self.subscriptions[sub.name]
+                    del self.due[sub.name]
+            return not self.subscriptions
+
+    def run(self):
+        last = None
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    now = time()
+                    start = min(self.due.values()) if self.due else None
+                    if start is not None and last is not None:
+                        start = max(start, last + self.spacing)
+                    if start is not None and start <= now:
+                        break
+                    self.condition.wait(None if start is None
+                                        else start - now)
+
+                limit = now + self.poller.grouping
+                names = [n for n, t in self.due.items() if t <= limit]
+                subs = dict((n, list(self.subscriptions[n])) for n in names)
+
+            values = self.read(names)
+            last = time()
+
+            with self.condition:
+                for n in names:
+                    if n in self.due:
+                        interval = min(s.interval
+                                       for s in self.subscriptions[n])
+                        self.due[n] = now + interval
+
+            if values is None:
+                continue
+            for n in names:
+                for s in subs[n]:
+                    try:
+                        s.callback(n, values[n], last)
+                    except Exception:
+                        logger = logging.getLogger(__name__)
+                        logger.exception('Error in callback for %s', n)
+
+    def read(self, names):
+        """Read the Features bypassing the cache.
+
+        """
+        driver = self.driver
+        try:
+            with driver.lock:
+                driver.clear_cache(features=names)
+                return driver.read_features(names)
+        except Exception:
+            logger = logging.getLogger(__name__)
+            logger.exception('Failed to poll %s on %s', names, driver)
+            return None
+
+
+def get_poller():
+    """Access the FeaturePoller shared by the whole application.
+
+    """
+    global _POLLER
+    with _POLLER_LOCK:
+        if _POLLER is None:
+            _POLLER = FeaturePoller()
+        return _POLLER
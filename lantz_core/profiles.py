@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.profiles
+    ~~~~~~~~~~~~~~~~~~~
+
+    Storage of the configuration of drivers in compact binary profiles.
+
+    A profile holds the values of all the Features of a driver which can be
+    both read and written, structured as the values of a Snapshot. Profiles
+    are serialized in a versioned binary format using only the standard
+    library:
+
+    - a header made of the MAGIC bytes, the format version and a flag byte
+      indicating whether the payload is compressed with zlib.
+    - the payload: a mapping containing the name of the driver class, the
+      time of the capture and the values, encoded using one type tag byte per
+      value (see PROFILE_VERSION).
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+import io
+import os
+import stat
+import zlib
+import tempfile
+from collections import OrderedDict
+from numbers import Integral, Real
+from struct import Struct
+
+from past.builtins import basestring
+
+from .features.feature import Feature
+from .snapshot import snapshot
+from .unit import is_quantity, get_unit_registry
+
+#: Bytes starting all profiles.
+MAGIC = b'LZPF'
+
+#: Version of the format of the profiles. Bumped when the encoding changes.
+PROFILE_VERSION = 1
+
+#: Extension of the files of a ProfileStore.
+PROFILE_EXTENSION = '.lzp'
+
+_HEADER = Struct('<4sBB')
+_COMPRESSED = 1
+
+_LENGTH = Struct('<I')
+_INT = Struct('<q')
+_FLOAT = Struct('<d')
+
+_INT_BOUNDS = (-2**63, 2**63 - 1)
+
+
+def dumps(values, driver=None, timestamp=None):
+    """Serialize the values of a profile.
+
+    Parameters
+    ----------
+    values : dict
+        Nested values as stored in Snapshot.values.
+
+    driver : unicode, optional
+        Qualified name of the class of the driver the values come from.
+
+    timestamp : float, optional
+        Time at which the values were captured.
+
+    Returns
+    -------
+    data : bytes
+        Binary representation of the profile.
+
+    """
+    buf = io.BytesIO()
+    _encode(OrderedDict([('driver', driver), ('timestamp', timestamp),
+                         ('values', values)]), buf.write)
+    payload = buf.getvalue()
+    compressed = zlib.compress(payload)
+    if len(compressed) < len(payload):
+        return _HEADER.pack(MAGIC, PROFILE_VERSION, _COMPRESSED) + compressed
+    return _HEADER.pack(MAGIC, PROFILE_VERSION, 0) + payload
+
+
+def loads(data):
+    """Deserialize a profile.
+
+    Returns
+    -------
+    profile : OrderedDict
+        Mapping with the keys 'driver', 'timestamp' and 'values'.
+
+    Raises
+    ------
+    ValueError :
+        If the data is not a profile or uses an unsupported version.
+
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError('Data too short to be a profile.')
+    magic, version, flags = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Data is not a profile.')
+    if version != PROFILE_VERSION:
+        raise ValueError('Unsupported profile version {} (expected {})'
+                         .format(version, PROFILE_VERSION))
+    payload = data[_HEADER.size:]
+    if flags & _COMPRESSED:
+        payload = zlib.decompress(payload)
+    profile, end = _decode(payload, 0)
+    if end != len(payload):
+        raise ValueError('Trailing data after the profile.')
+    return profile
+
+
+def capture_profile(driver):
+    """Collect the values of the Features of a driver worth storing.
+
+    Only the Features which can be both read and written are kept.
+
+    Returns
+    -------
+    values : OrderedDict
+        Nested values structured as in Snapshot.values.
+
+    timestamp : float
+        Time of the capture.
+
+    """
+    snap = snapshot(driver)
+    return _settable(driver, snap.values), snap.timestamp
+
+
+def save_profile(driver, path):
+    """Save the values of the Features of a driver in a file.
+
+    See HasFeatures.save_profile.
+
+    """
+    values, timestamp = capture_profile(driver)
+    data = dumps(values, _class_name(type(driver)), timestamp)
+    # The profile is written next to its final location and then moved so
+    # that an interrupted save never leaves a truncated file.
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                suffix='.tmp')
+    try:
+        with io.open(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file readable only by its owner, give it the
+        # permissions of the replaced file or the default ones.
+        os.chmod(temp, _file_mode(path))
+        _replace(temp, path)
+    except Exception:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def restore_profile(driver, path, refresh=False, force=False, strict=True):
+    """Restore the values of the Features of a driver from a file.
+
+    See HasFeatures.restore_profile.
+
+    """
+    with io.open(path, 'rb') as f:
+        profile = loads(f.read())
+    saved = profile['driver']
+    if strict and saved is not None and\
+            saved not in (_class_name(c) for c in type(driver).__mro__):
+        msg = ('Profile {} was saved from {} and cannot be restored on {} '
+               '(use strict=False to bypass this check).')
+        raise ValueError(msg.format(path, saved, _class_name(type(driver))))
+    return driver.apply_state(profile['values'], refresh, force)
+
+
+class ProfileStore(object):
+    """Directory holding named profiles.
+
+    Parameters
+    ----------
+    path : unicode
+        Directory in which to store the profiles. It is created if it does
+        not exist.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @property
+    def names(self):
+        """Sorted names of the stored profiles.
+
+        """
+        n = len(PROFILE_EXTENSION)
+        return sorted(f[:-n] for f in os.listdir(self.path)
+                      if f.endswith(PROFILE_EXTENSION))
+
+    def save(self, driver, name):
+        """Save the current configuration of a driver under a name.
+
+        """
+        save_profile(driver, self._path(name))
+
+    def load(self, name):
+        """Read a stored profile (see loads).
+
+        """
+        with io.open(self._path(name), 'rb') as f:
+            return loads(f.read())
+
+    def restore(self, driver, name, refresh=False, force=False,
+                strict=True):
+        """Restore a stored profile (see HasFeatures.restore_profile).
+
+        """
+        return restore_profile(driver, self._path(name), refresh, force,
+                               strict)
+
+    def remove(self, name):
+        """Delete a stored profile.
+
+        """
+        os.remove(self._path(name))
+
+    def _path(self, name):
+        return os.path.join(self.path, name + PROFILE_EXTENSION)
+
+
+def _class_name(cls):
+    """Qualified name of a class as stored in the profiles.
+
+    """
+    return cls.__module__ + '.' + cls.__name__
+
+
+def _file_mode(path):
+    """Permissions to give to the file written at path.
+
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _replace(src, dst):
+    """Atomically replace dst by src.
+
+    """
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # Python 2
+        if os.path.exists(dst) and os.name == 'nt':
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def _settable(obj, values):
+    """Filter the values of a Snapshot to keep the settable Features.
+
+    """
+    kept = OrderedDict()
+    for name, value in values.items():
+        if name in obj.__subsystems__:
+            sub = _settable(getattr(obj, name), value)
+            if sub:
+                kept[name] = sub
+        elif name in obj.__channels__:
+            cont = getattr(obj, name)
+            chs = OrderedDict()
+            for ch_id, ch_values in value.items():
+                sub = _settable(cont[ch_id], ch_values)
+                if sub:
+                    chs[ch_id] = sub
+            if chs:
+                kept[name] = chs
+        else:
+            feat = getattr(type(obj), name)
+            if isinstance(feat, Feature) and feat.fset is not None:
+                kept[name] = value
+    return kept
+
+
+# --- Encoding ----------------------------------------------------------------
+
+def _encode_text(value, write):
+    raw = value.encode('utf-8')
+    write(_LENGTH.pack(len(raw)))
+    write(raw)
+
+
+def _encode(value, write):
+    """Write the tagged binary representation of a value.
+
+    """
+    if value is None:
+        write(b'N')
+    elif value is True:
+        write(b'T')
+    elif value is False:
+        write(b'F')
+    elif is_quantity(value):
+        write(b'Q')
+        _encode(value.magnitude, write)
+        _encode_text(str(value.units), write)
+    elif isinstance(value, Integral):
+        value = int(value)
+        if _INT_BOUNDS[0] <= value <= _INT_BOUNDS[1]:
+            write(b'i')
+            write(_INT.pack(value))
+        else:
+            write(b'I')
+            _encode_text(str(value), write)
+    elif isinstance(value, Real):
+        write(b'd')
+        write(_FLOAT.pack(value))
+    elif isinstance(value, bytes):
+        write(b'b')
+        write(_LENGTH.pack(len(value)))
+        write(value)
+    elif isinstance(value, basestring):
+        write(b'u')
+        _encode_text(value, write)
+    elif isinstance(value, (list, tuple)):
+        write(b'l' if isinstance(value, list) else b't')
+        write(_LENGTH.pack(len(value)))
+        for v in value:
+            _encode(v, write)
+    elif isinstance(value, dict):
+        write(b'm')
+        write(_LENGTH.pack(len(value)))
+        for k, v in value.items():
+            _encode(k, write)
+            _encode(v, write)
+    else:
+        raise TypeError('Cannot store {!r} in a profile.'.format(value))
+
+
+def _decode_text(data, pos):
+    length, = _LENGTH.unpack_from(data, pos)
+    pos += _LENGTH.size
+    return data[pos:pos+length].decode('utf-8'), pos + length
+
+
+def _decode(data, pos):
+    """Read the value starting at pos and return it with the next position.
+
+    """
+    tag = data[pos:pos+1]
+    pos += 1
+    if tag == b'N':
+        return None, pos
+    elif tag == b'T':
+        return True, pos
+    elif tag == b'F':
+        return False, pos
+    elif tag == b'i':
+        return _INT.unpack_from(data, pos)[0], pos + _INT.size
+    elif tag == b'I':
+        text, pos = _decode_text(data, pos)
+        return int(text), pos
+    elif tag == b'd':
+        return _FLOAT.unpack_from(data, pos)[0], pos + _FLOAT.size
+    elif tag == b'u':
+        return _decode_text(data, pos)
+    elif tag == b'b':
+        length, = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        return bytes(data[pos:pos+length]), pos + length
+    elif tag == b'Q':
+        magnitude, pos = _decode(data, pos)
+        units, pos = _decode_text(data, pos)
+        return get_unit_registry().Quantity(magnitude, units), pos
+    elif tag in (b'l', b't'):
+        length, = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        items = []
+        for _ in range(length):
+            v, pos = _decode(data, pos)
+            items.append(v)
+        return (items if tag == b'l' else tuple(items)), pos
+    elif tag == b'm':
+        length, = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        mapping = OrderedDict()
+        for _ in range(length):
+            k, pos = _decode(data, pos)
+            mapping[k], pos = _decode(data, pos)
+        return mapping, pos
+    raise ValueError('Corrupted profile: unknown tag {!r}'.format(tag))
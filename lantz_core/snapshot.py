@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+    lantz_core.snapshot
+    ~~~~~~~~~~~~~~~~~~~
+
+    Capture and restoration of the values of all the Features of drivers.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from collections import OrderedDict
+from threading import Thread
+from time import time
+
+from .features.feature import Feature, get_features, set_features
+
+#: Marker of the values which could not be read.
+_FAILED = object()
+
+
+class Snapshot(object):
+    """Values of the Features of a driver at a given time.
+
+    Attributes
+    ----------
+    driver : HasFeatures
+        Driver whose Features were read.
+
+    values : OrderedDict
+        Values of the Features keyed by name. The values of a subsystem are
+        stored in a nested OrderedDict under the subsystem name and the ones
+        of channels in an OrderedDict mapping the channel ids to the channels
+        values.
+
+    timestamp : float
+        Time at which the capture started.
+
+    duration : float
+        Time taken by the capture in seconds.
+
+    cached : int
+        Number of values taken from the cache.
+
+    queried : int
+        Number of values read from the instrument.
+
+    errors : OrderedDict
+        Exceptions raised when reading Features, keyed by the dotted names of
+        the Features. Those Features are absent from the values.
+
+    """
+    def __init__(self, driver, values, timestamp, duration, cached, queried,
+                 errors=None):
+        self.driver = driver
+        self.values = values
+        self.timestamp = timestamp
+        self.duration = duration
+        self.cached = cached
+        self.queried = queried
+        self.errors = errors if errors is not None else OrderedDict()
+
+    def flatten(self):
+        """Values keyed by dotted names (channel ids being formatted).
+
+        """
+        flat = OrderedDict()
+
+        def add(prefix, values):
+            for k, v in values.items():
+                if isinstance(v, OrderedDict):
+                    add(prefix + '{}.'.format(k), v)
+                else:
+                    flat[prefix + k] = v
+
+        add('', self.values)
+        return flat
+
+
+def snapshot(driver, refresh=False):
+    """Read all the readable Features of a driver.
+
+    See HasFeatures.snapshot for the description of the arguments.
+
+    """
+    with driver.lock:
+        start = time()
+        values = OrderedDict()
+        items = []
+        bulks = []
+        _collect(driver, values, items, bulks, '')
+
+        if refresh:
+            # Only the cache of the Features is cleared, not the results of
+            # the actions.
+            to_clear = OrderedDict()
+            for _, feat, obj, _ in items:
+                to_clear.setdefault(id(obj), (obj, []))[1].append(feat.name)
+            for _, cont, name, ids, _ in bulks:
+                for i in ids:
+                    to_clear.setdefault(id(cont[i]), (cont[i], []))[1].append(
+                        name)
+            for obj, names in to_clear.values():
+                obj.clear_cache(features=names)
+
+        cached = sum(1 for _, feat, obj, _ in items if feat.name in obj._cache)
+        for _, cont, name, ids, _ in bulks:
+            cached += sum(1 for i in ids if name in cont[i]._cache)
+        queried = len(items) + sum(len(b[3]) for b in bulks) - cached
+
+        errors = OrderedDict()
+        try:
+            read = get_features([(feat, obj) for _, feat, obj, _ in items])
+        except Exception:
+            # Read the Features one by one to identify the failing ones.
+            read = []
+            for _, feat, obj, path in items:
+                try:
+                    read.append(feat.__get__(obj))
+                except Exception as e:
+                    errors[path] = e
+                    read.append(_FAILED)
+        for (target, feat, _, _), value in zip(items, read):
+            if value is _FAILED:
+                del target[feat.name]
+            else:
+                target[feat.name] = value
+
+        for targets, cont, name, ids, prefix in bulks:
+            try:
+                read = cont.get_all(name, ids)
+            except Exception:
+                read = OrderedDict()
+                for i in ids:
+                    try:
+                        read[i] = getattr(cont[i], name)
+                    except Exception as e:
+                        errors['{}{}.{}'.format(prefix, i, name)] = e
+                        del targets[i][name]
+            for ch_id, value in read.items():
+                targets[ch_id][name] = value
+
+        return Snapshot(driver, values, start, time() - start, cached,
+                        queried, errors)
+
+
+class StateChanges(object):
+    """Report of the application of a state to a driver.
+
+    Attributes
+    ----------
+    changes : OrderedDict
+        Tuples (old value, new value) keyed by the dotted names of the
+        Features which were written, in the order of the writes. The old value
+        is None for Features which cannot be read (or were not cached when
+        forcing the writes).
+
+    unchanged : list
+        Dotted names of the Features already having the target value.
+
+    duration : float
+        Time taken by the operation in seconds.
+
+    """
+    def __init__(self, changes, unchanged, duration):
+        self.changes = changes
+        self.unchanged = unchanged
+        self.duration = duration
+
+
+def apply_state(driver, target, refresh=False, force=False):
+    """Write the values differing from a target state.
+
+    See HasFeatures.apply_state for the description of the arguments.
+
+    """
+    if isinstance(target, Snapshot):
+        target = target.values
+
+    with driver.lock:
+        start = time()
+        items = []
+        _resolve_state(driver, target, '', items)
+
+        after, invalidated = _dependencies(items)
+        if force:
+            # The cache is cleared so that no value is skipped.
+            olds = dict((i, feat.__get__(obj) if feat.name in obj._cache
+                         else None) for i, (_, feat, obj, _)
+                        in enumerate(items))
+            for _, feat, obj, _ in items:
+                obj.clear_cache(features=(feat.name,))
+            to_write = set(range(len(items)))
+        else:
+            readable = [(feat, obj) for _, feat, obj, _ in items
+                        if feat.fget is not None]
+            if refresh:
+                for feat, obj in readable:
+                    obj.clear_cache(features=(feat.name,))
+            get_features(readable)
+
+            # Writing a Feature may invalidate the value of the Features it
+            # discards, which must hence be written afterwards even if their
+            # current value matches.
+            to_write = set(i for i, (_, feat, obj, value) in enumerate(items)
+                           if not feat._matches_cache(obj, value))
+            stack = list(to_write)
+            while stack:
+                for j in invalidated[stack.pop()] - to_write:
+                    to_write.add(j)
+                    stack.append(j)
+            olds = dict((i, items[i][1].__get__(items[i][2])
+                         if items[i][1].fget else None) for i in to_write)
+
+        unchanged = [items[i][0] for i in range(len(items))
+                     if i not in to_write]
+        changes = OrderedDict()
+        for level in _order_writes(sorted(to_write), after):
+            set_features([items[i][1:] for i in level])
+            for i in level:
+                changes[items[i][0]] = (olds[i], items[i][3])
+
+        return StateChanges(changes, unchanged, time() - start)
+
+
+def snapshot_all(drivers, refresh=False):
+    """Snapshot multiple drivers in parallel.
+
+    Each driver is read from its own thread so that the communications with
+    independent instruments overlap. Drivers sharing a lock are naturally
+    serialized.
+
+    Parameters
+    ----------
+    drivers : iterable of HasFeatures
+        Drivers to read.
+
+    refresh : bool, optional
+        Whether to bypass the cached values.
+
+    Returns
+    -------
+    snapshots : list of Snapshot
+        Snapshots in the order of the drivers.
+
+    """
+    drivers = list(drivers)
+    results = [None]*len(drivers)
+
+    def run(i, driver):
+        try:
+            results[i] = snapshot(driver, refresh)
+        except Exception as e:
+            results[i] = e
+
+    threads = [Thread(target=run, args=(i, d)) for i, d in enumerate(drivers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for res in results:
+        if isinstance(res, Exception):
+            raise res
+    return results
+
+
+def _collect(obj, values, items, bulks, prefix):
+    """List the Features to read on an object and its subparts.
+
+    The Features are read in a single batch at the end, except for channels
+    Features which the parent can read on all channels at once.
+
+    """
+    from .channel import BULK_GET_PREFIX
+    for name, feat in _all_features(type(obj)).items():
+        if feat.fget is not None:
+            values[name] = None
+            items.append((values, feat, obj, prefix + name))
+
+    for name in obj.__subsystems__:
+        values[name] = OrderedDict()
+        _collect(getattr(obj, name), values[name], items, bulks,
+                 prefix + name + '.')
+
+    for name, (cls, _, _) in obj.__channels__.items():
+        cont = getattr(obj, name)
+        ids = list(cont.available)
+        channels = OrderedDict((i, OrderedDict()) for i in ids)
+        values[name] = channels
+        if not ids:
+            continue
+        ch_prefix = prefix + name + '.'
+        bulk_feats = [n for n, f in _all_features(cls).items()
+                      if f.fget is not None and
+                      hasattr(obj, BULK_GET_PREFIX + name + '_' + n)]
+        for n in bulk_feats:
+            bulks.append((channels, cont, n, ids, ch_prefix))
+        for i in ids:
+            ch_values = channels[i]
+            sub_items = []
+            _collect(cont[i], ch_values, sub_items, bulks,
+                     '{}{}.'.format(ch_prefix, i))
+            items.extend(it for it in sub_items
+                         if it[1].name not in bulk_feats or
+                         it[0] is not ch_values)
+
+
+def _all_features(cls):
+    """Features of a class including the inherited ones.
+
+    __feats__ only holds the Features owned by the class.
+
+    """
+    feats = OrderedDict()
+    for base in reversed(cls.__mro__):
+        for name in getattr(base, '__feats__', ()):
+            feats[name] = getattr(cls, name)
+    return feats
+
+
+def _resolve_state(obj, state, prefix, items):
+    """List the Features to write to reach a state.
+
+    """
+    for name, value in state.items():
+        if name in obj.__subsystems__:
+            _resolve_state(getattr(obj, name), value, prefix + name + '.',
+                           items)
+        elif name in obj.__channels__:
+            cont = getattr(obj, name)
+            for ch_id, ch_state in value.items():
+                _resolve_state(cont[ch_id], ch_state,
+                               '{}{}.{}.'.format(prefix, name, ch_id), items)
+        else:
+            feat = getattr(type(obj), name, None)
+            if not isinstance(feat, Feature) or feat.fset is None:
+                raise AttributeError('{} has no settable Feature {}'.format(
+                    obj, name))
+            items.append((prefix + name, feat, obj, value))
+
+
+def _dependencies(items):
+    """Analyse the dependencies between the writes of a state.
+
+    A Feature is written after the Features whose set discards its cached
+    value or its limits and after the Features referenced by its set checks,
+    as those affect the validation of its value.
+
+    Returns
+    -------
+    after : list of set
+        Indexes of the items which must be written before each item.
+
+    invalidated : list of set
+        Indexes of the items whose cached value is discarded by each item.
+
+    """
+    index = dict(((feat, obj), i) for i, (_, feat, obj, _) in enumerate(items))
+    after = [set() for _ in items]
+    invalidated = [set() for _ in items]
+    for i, (_, feat, obj, _) in enumerate(items):
+        discard = getattr(feat, '_discard', {})
+        for name in discard.get('features', ()):
+            j = index.get(_resolve(obj, name))
+            if j is not None:
+                invalidated[i].add(j)
+        for j in invalidated[i]:
+            after[j].add(i)
+        limits = discard.get('limits', ())
+        if limits:
+            for j, (_, f, o, _) in enumerate(items):
+                if o is obj and getattr(f, 'limits_id', None) in limits:
+                    after[j].add(i)
+        check = getattr(feat, 'set_check', None)
+        for name in getattr(check, 'features', ()):
+            j = index.get(_resolve(obj, name))
+            if j is not None:
+                after[i].add(j)
+    return after, invalidated
+
+
+def _order_writes(indexes, after):
+    """Split the writes into successive batches respecting the dependencies.
+
+    The writes of a batch only depend on the writes of the previous batches.
+    In case of circular dependencies the remaining writes are performed in
+    the provided order.
+
+    """
+    levels = []
+    remaining = list(indexes)
+    pending = set(indexes)
+    while remaining:
+        level = [i for i in remaining if not (after[i] & pending) - {i}]
+        if not level:
+            level = remaining
+        pending.difference_update(level)
+        remaining = [i for i in remaining if i in pending]
+        levels.append(level)
+    return levels
+
+
+def _resolve(obj, name):
+    """Resolve a dotted name to a (Feature, object) pair or None.
+
+    """
+    try:
+        return obj._resolve_feature(name)
+    except AttributeError:
+        return None
@@ -12,9 +12,34 @@
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 from future.utils import with_metaclass
+from functools import partial
 
 from .has_features import HasFeaturesMeta, HasFeatures, AbstractSubSystem
 
+#: Names of the methods which are simply passed to the parent by SubSystem and
+#: Channel.
+ROUTED_METHODS = ('default_get_feature', 'default_set_feature',
+                  'default_check_operation', 'reopen_connection',
+                  'arm_operation_complete')
+
+#: Implementations of the ROUTED_METHODS simply piping the calls to the
+#: parent. Channel registers its own implementations in there.
+PIPING_METHODS = set()
+
+
+def _func(meth):
+    """Access the function underlying a method (Python 2 compatibility).
+
+    """
+    return getattr(meth, '__func__', meth)
+
+
+def _is_piping(cls, name):
+    """Check whether the method of a class simply pipes to the parent.
+
+    """
+    return _func(getattr(cls, name)) in PIPING_METHODS
+
 
 class DeclarationMeta(HasFeaturesMeta):
     """Metaclass used to avoid creating an instance in classes declaration.
@@ -37,20 +62,35 @@ class SubSystem(with_metaclass(DeclarationMeta, HasFeatures)):
     This mechanism allow to avoid crowding the instrument namespace with very
     long Feature names.
 
+    When created a subsystem resolves, once for all, which object will
+    actually answer the calls to the default_* methods and reopen_connection
+    and binds those directly so that the cost of a call does not depend on
+    the depth of the subsystem in the driver hierarchy. Subclasses overriding
+    one of those methods are left untouched.
+
     Attributes
     ----------
     parent : HasFeatures
         Parent object of the subsystem.
 
     """
+    #: Prefix prepended to all the relative string commands of the Features
+    #: declared on the subsystem (ex: ':SOUR1:VOLT'). Commands starting with
+    #: ':' or '*' are considered absolute and left untouched.
+    command_prefix = ''
+
     def __init__(self, parent, **kwargs):
-        super(SubSystem, self).__init__(**kwargs)
+        # Routing must be set up before creating the inner subparts as they
+        # rely on it.
         self.parent = parent
+        self._root = getattr(parent, '_root', parent)
+        self._setup_routing()
+        super(SubSystem, self).__init__(**kwargs)
 
     @property
     def lock(self):
-        """Access to parent lock."""
-        return self.parent.lock
+        """Access to the driver lock."""
+        return self._root.lock
 
     def reopen_connection(self):
         """Subsystems simply pipes the call to their parent.
@@ -77,4 +117,79 @@ class SubSystem(with_metaclass(DeclarationMeta, HasFeatures)):
         return self.parent.default_check_operation(feat, value, i_value,
                                                    response)
 
+    def arm_operation_complete(self):
+        """Subsystems simply pipes the call to their parent.
+
+        """
+        return self.parent.arm_operation_complete()
+
+    def default_get_features(self, requests):
+        """Subsystems pipe the call to the object implementing
+        default_get_feature after adding their routing keywords.
+
+        """
+        target = self._route_target
+        if target is self:
+            return super(SubSystem, self).default_get_features(requests)
+        route = self._route_kwargs
+        if route:
+            requests = [(f, cmd, dict(kwargs, **route))
+                        for f, cmd, kwargs in requests]
+        return target.default_get_features(requests)
+
+    def default_set_features(self, requests):
+        """Subsystems pipe the call to the object implementing
+        default_set_feature after adding their routing keywords.
+
+        """
+        target = self._route_target
+        if target is self:
+            return super(SubSystem, self).default_set_features(requests)
+        route = self._route_kwargs
+        if route:
+            requests = [(f, cmd, value, dict(kwargs, **route))
+                        for f, cmd, value, kwargs in requests]
+        return target.default_set_features(requests)
+
+    def _routing_kwargs(self):
+        """Keyword arguments to add to the default_get/set_feature calls.
+
+        """
+        return {}
+
+    def _setup_routing(self):
+        """Bind the piping methods to the parent methods.
+
+        As the parent performed the same operation, the bound methods are the
+        ones of the first object up the hierarchy actually implementing them.
+
+        The object implementing default_get/set_feature and the keywords to
+        pass to it are stored under _route_target and _route_kwargs. If this
+        class overrides one of those methods the target is the subsystem
+        itself.
+
+        """
+        cls = type(self)
+        parent = self.parent
+        if (_is_piping(cls, 'default_get_feature') and
+                _is_piping(cls, 'default_set_feature')):
+            self._route_target = getattr(parent, '_route_target', parent)
+            self._route_kwargs = dict(getattr(parent, '_route_kwargs', {}),
+                                      **self._routing_kwargs())
+            target = self._route_target
+            for name in ('default_get_feature', 'default_set_feature'):
+                meth = getattr(target, name)
+                if self._route_kwargs:
+                    meth = partial(meth, **self._route_kwargs)
+                setattr(self, name, meth)
+        else:
+            self._route_target = self
+            self._route_kwargs = {}
+
+        for name in ('default_check_operation', 'reopen_connection',
+                     'arm_operation_complete'):
+            if _is_piping(cls, name):
+                setattr(self, name, getattr(parent, name))
+
 AbstractSubSystem.register(SubSystem)
+PIPING_METHODS.update(_func(getattr(SubSystem, n)) for n in ROUTED_METHODS)
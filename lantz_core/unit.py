@@ -4,7 +4,10 @@
     ~~~~~~~~~~~~~~~
 
     Unit handling is done using the Pint library. If absent the unit support is
-    simply disabled.
+    simply disabled. Pint is only imported when it is first needed (creation
+    of the UnitRegistry) as importing it is costly. Its presence is hence
+    only detected at import time, the import itself being guarded when it
+    happens.
 
     This module allows the user to specify the UnitRegistry to be used by Lantz
     and exposes some useful Pint features.
@@ -16,18 +19,31 @@
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 
+import sys
 import logging
 
-UNIT_SUPPORT = True
-
 try:
-    from pint import UnitRegistry
-except ImportError:
-    UNIT_SUPPORT = False
+    from importlib.util import find_spec
+except ImportError:  # Python 2
+    from imp import find_module
+
+    def find_spec(name):
+        try:
+            return find_module(name)
+        except ImportError:
+            return None
+
+#: Whether Pint is installed. Set to False if importing it later fails.
+UNIT_SUPPORT = find_spec('pint') is not None
 
 
 UNIT_REGISTRY = None
 
+_QUANTITY = None
+
+# Cache of the conversion factors between units.
+_FACTORS = {}
+
 
 def set_unit_registry(unit_registry):
     """Set the UnitRegistry used by Lantz.
@@ -62,11 +78,124 @@ def get_unit_registry():
     If no UnitRegistry has been previously declared using `set_unit_registry`,
     a new UnitRegistry  is created.
 
+    Raises
+    ------
+    ImportError:
+        If Pint cannot be imported.
+
     """
-    global UNIT_REGISTRY
+    global UNIT_REGISTRY, UNIT_SUPPORT
     if not UNIT_REGISTRY:
         logger = logging.getLogger(__name__)
         logger.debug('Creating default UnitRegistry for Lantz')
+        try:
+            from pint import UnitRegistry
+        except ImportError as e:
+            UNIT_SUPPORT = False
+            raise ImportError('Pint is necessary to handle units: '
+                              '{}'.format(e))
         UNIT_REGISTRY = UnitRegistry()
 
     return UNIT_REGISTRY
+
+
+def unit_support():
+    """Whether units can be handled.
+
+    Contrary to the UNIT_SUPPORT value imported by other modules, this
+    reflects a failure of the deferred import of Pint.
+
+    """
+    return UNIT_SUPPORT
+
+
+def parse_unit(unit):
+    """Parse a unit declared as a string.
+
+    Returns
+    -------
+    unit : Unit or None
+        Parsed unit, or None if Pint cannot be imported, the unit support
+        being then disabled.
+
+    """
+    try:
+        ureg = get_unit_registry()
+    except ImportError:
+        return None
+    return ureg.parse_expression(unit)
+
+
+def is_quantity(value):
+    """Check whether a value is a Pint Quantity.
+
+    As long as Pint has not been imported no Quantity can exist, so the check
+    does not trigger its import.
+
+    """
+    global _QUANTITY
+    if _QUANTITY is None:
+        if 'pint' not in sys.modules:
+            return False
+        try:
+            from pint.quantity import _Quantity
+        except ImportError:
+            return False
+        _QUANTITY = _Quantity
+
+    return isinstance(value, _QUANTITY)
+
+
+def get_conversion_factor(from_unit, to_unit):
+    """Get the factor converting a magnitude from one unit to another.
+
+    Factors are cached so that, once computed, a conversion boils down to a
+    single multiplication.
+
+    Parameters
+    ----------
+    from_unit, to_unit : Unit or Quantity
+        Units between which to convert. The magnitude of Quantities is
+        ignored.
+
+    Returns
+    -------
+    factor : float or None
+        Multiplicative factor or None if the conversion is not a simple
+        multiplication (offset units such as degC).
+
+    """
+    key = (getattr(from_unit, '_units', from_unit),
+           getattr(to_unit, '_units', to_unit))
+    try:
+        return _FACTORS[key]
+    except KeyError:
+        pass
+
+    quantity = get_unit_registry().Quantity
+    factor = quantity(1.0, key[0]).to(key[1]).magnitude
+    if quantity(0.0, key[0]).to(key[1]).magnitude != 0:
+        factor = None
+    _FACTORS[key] = factor
+    return factor
+
+
+def convert_magnitude(value, from_unit, to_unit):
+    """Convert a magnitude expressed in a unit to another unit.
+
+    """
+    factor = get_conversion_factor(from_unit, to_unit)
+    if factor is None:
+        quantity = get_unit_registry().Quantity
+        return quantity(value, from_unit._units).to(to_unit._units).magnitude
+    return value if factor == 1 else value*factor
+
+
+def magnitude_in(quantity, unit):
+    """Magnitude of a Quantity once expressed in the given unit.
+
+    This is equivalent to quantity.to(unit).magnitude but uses the cached
+    conversion factors.
+
+    """
+    return convert_magnitude(quantity.magnitude, quantity, unit)
@@ -11,15 +11,31 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+import ast
+from threading import Thread, local
+from time import sleep, time
 from future.utils import exec_
 from future.builtins import str
 
 from collections import OrderedDict
 
+from .errors import TimeoutError
+
+
+# Compiled checkers by (checks, signature, ret).
+_CHECKERS = {}
+
+# Textual representation of the comparison operators used in messages.
+_OPERATORS = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=',
+              ast.Gt: '>', ast.GtE: '>=', ast.Is: 'is', ast.IsNot: 'is not',
+              ast.In: 'in', ast.NotIn: 'not in'}
+
 
 def build_checker(checks, signature, ret=''):
     """Assemble a checker function from the provided assertions.
 
+    Checkers are memoized so that identical checks share the same function.
+
     Parameters
     ----------
     checks : unicode
@@ -36,23 +52,149 @@ def build_checker(checks, signature, ret=''):
     Returns
     -------
     checker : function
-        Function to use
+        Function to use. When an assertion fails an AssertionError is raised,
+        for simple comparisons the message includes the value of both
+        operands. The dotted names of the attributes of driver read by the
+        checks are listed in its `features` attribute (see
+        referenced_attributes).
+
+    Raises
+    ------
+    SyntaxError :
+        If one of the assertions is not a valid expression.
 
     """
-    func_def = 'def check' + str(signature) + ':\n'
-    assertions = checks.split(';')
-    for assertion in assertions:
-        # XXXX use AST manipulation to provide more infos about assertion
-        # failure. Take inspiration from pytest.assertions.rewrite.
-        a_mess = '"""Assertion %s failed"""' % assertion
-        func_def += '    assert ' + assertion + ', ' + a_mess + '\n'
+    key = (checks, str(signature), ret)
+    try:
+        return _CHECKERS[key]
+    except KeyError:
+        checker = _CHECKERS[key] = _compile_checker(*key)
+        return checker
+
+
+class _Substitute(ast.NodeTransformer):
+    """Replace the placeholders of a checker template by the AST nodes of the
+    operands and the comparison operators.
+
+    """
+    def __init__(self, nodes, operators):
+        self.nodes = nodes
+        self.operators = operators
+
+    def visit_Name(self, node):
+        if node.id in self.nodes:
+            return ast.copy_location(self.nodes[node.id], node)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left = node.left
+        if isinstance(left, ast.Name) and left.id in self.operators:
+            node.ops = self.operators[left.id]
+        return node
+
+
+def _compile_checker(checks, signature, ret):
+    """Compile a checker function (see build_checker).
+
+    Single comparisons are rewritten so that their operands are evaluated
+    only once and reported in the failure message.
+
+    """
+    lines = ['def check' + signature + ':']
+    exprs = []
+    nodes = {}
+    operators = {}
+    messages = []
+    for i, assertion in enumerate(a.strip() for a in checks.split(';')):
+        try:
+            expr = ast.parse(assertion, mode='eval').body
+        except SyntaxError as e:
+            raise SyntaxError('Invalid check {!r}: {}'.format(assertion,
+                                                              e.msg))
+        exprs.append(expr)
+
+        mess = 'Assertion %s failed' % assertion
+        if isinstance(expr, ast.Compare) and len(expr.ops) == 1:
+            l, r = '_lantz_l{}'.format(i), '_lantz_r{}'.format(i)
+            nodes[l + '_'] = expr.left
+            nodes[r + '_'] = expr.comparators[0]
+            operators[l] = expr.ops
+            lines.extend(['    {0} = {0}_'.format(l),
+                          '    {0} = {0}_'.format(r),
+                          '    if not ({} == {}):'.format(l, r),
+                          '        _lantz_fail({}, {}, {})'.format(i, l, r)])
+            messages.append((mess, _OPERATORS.get(type(expr.ops[0]), '?')))
+        else:
+            lines.extend(['    if not ({}):'.format(assertion),
+                          '        _lantz_fail({})'.format(i)])
+            messages.append((mess, None))
 
     if ret:
-        func_def += '    return %s' % ret
+        lines.append('    return %s' % ret)
+
+    def fail(index, *values):
+        # The assertion is never used as a template as it may contain braces
+        # (set or dict literals) or percent signs.
+        mess, op = messages[index]
+        if values:
+            mess = '%s: %r %s %r' % (mess, values[0], op, values[1])
+        raise AssertionError(mess)
+
+    tree = _Substitute(nodes, operators).visit(ast.parse('\n'.join(lines)))
+    ast.fix_missing_locations(tree)
+    namespace = dict(globals(), _lantz_fail=fail)
+    exec_(compile(tree, '<checks: {}>'.format(checks), 'exec'), namespace)
+    check = namespace['check']
+    check.features = referenced_attributes(exprs, 'driver')
+    return check
+
+
+def referenced_attributes(nodes, root):
+    """Collect the attributes of a variable accessed in some expressions.
 
-    loc = {}
-    exec_(func_def, globals(), loc)
-    return loc['check']
+    Parameters
+    ----------
+    nodes : iterable of ast.AST
+        Parsed expressions to analyse.
+
+    root : unicode
+        Name of the variable whose attributes should be collected.
+
+    Returns
+    -------
+    names : tuple
+        Dotted names of the accessed attributes in order of first use. For
+        method calls only the object holding the method is reported.
+
+    """
+    names = OrderedDict()
+    called = set()
+    for node in nodes:
+        for n in ast.walk(node):
+            if isinstance(n, ast.Call):
+                called.add(id(n.func))
+
+    def visit(node):
+        if isinstance(node, ast.Attribute):
+            parts = []
+            attr = node
+            while isinstance(attr, ast.Attribute):
+                parts.append(attr.attr)
+                attr = attr.value
+            if isinstance(attr, ast.Name) and attr.id == root:
+                parts.reverse()
+                if id(node) in called:
+                    parts.pop()
+                if parts:
+                    names['.'.join(parts)] = None
+                return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    for node in nodes:
+        visit(node)
+    return tuple(names)
 
 
 # The next three function take all driver as first argument for homogeneity.
@@ -134,5 +276,186 @@ def dict_to_byte(values, mapping):
         match the number of bit to endecode.
 
     """
-    byte = sum((2**mapping.index(k) for k in values if values[k]))
-    return byte
+    indexes = {n: i for i, n in enumerate(mapping)}
+    return sum(1 << indexes[k] for k in values if values[k])
+
+
+def parse_wait(wait):
+    """Normalize the wait argument of Features and Actions.
+
+    Parameters
+    ----------
+    wait : unicode or dict
+        Mode of synchronisation or dictionary with a 'mode' key and
+        optionally a 'timeout' key.
+
+    Returns
+    -------
+    wait : dict
+        Dictionary with a 'mode' and a 'timeout' key.
+
+    Raises
+    ------
+    ValueError :
+        If the mode is not supported.
+
+    """
+    if not isinstance(wait, dict):
+        wait = {'mode': wait}
+    wait = dict(wait)
+    wait.setdefault('timeout', None)
+    if wait.get('mode') != 'opc':
+        raise ValueError('Unsupported wait mode {!r}'.format(wait.get('mode')))
+    return wait
+
+
+#: Thread local storage in which the waits for the completion of operations
+#: are collected (see WaitCollector).
+_WAITS = local()
+
+
+def complete_operation(wait, timeout):
+    """Wait for the completion of an operation or record the wait.
+
+    The wait is recorded if a WaitCollector is active in the current thread
+    so that it is performed once the driver lock is released.
+
+    Parameters
+    ----------
+    wait : callable
+        Function returned by HasFeatures.arm_operation_complete.
+
+    timeout : float or None
+        Timeout to pass to wait.
+
+    """
+    waits = getattr(_WAITS, 'waits', None)
+    if waits is not None:
+        waits.append((wait, timeout))
+    else:
+        wait(timeout)
+
+
+class WaitCollector(object):
+    """Context collecting the waits for the completion of operations.
+
+    Only the outermost collector of a thread records the waits, so that
+    nested operations wait only once the outermost one is done, unless own is
+    True.
+
+    Parameters
+    ----------
+    own : bool, optional
+        Whether to collect the waits even if another collector is active.
+
+    """
+    __slots__ = ('own', 'waits', 'previous')
+
+    def __init__(self, own=False):
+        self.own = own
+        self.waits = None
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(_WAITS, 'waits', None)
+        if self.own or self.previous is None:
+            self.waits = _WAITS.waits = []
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.waits is not None:
+            _WAITS.waits = self.previous
+
+    def wait(self):
+        """Perform the collected waits.
+
+        """
+        waits, self.waits = self.waits, None
+        for w, timeout in waits or ():
+            w(timeout)
+
+
+def start_operation(func, *args, **kwargs):
+    """Call a function without waiting for the completion of the operations.
+
+    The function is called in the current thread, the waits it records (see
+    complete_operation) are performed in a background thread. On Python 2
+    this requires the futures backport.
+
+    Returns
+    -------
+    future : concurrent.futures.Future
+        Future whose result is the value returned by func, set once the
+        operations are complete.
+
+    """
+    from concurrent.futures import Future
+    future = Future()
+    try:
+        with WaitCollector(own=True) as collector:
+            res = func(*args, **kwargs)
+    except Exception as e:
+        future.set_exception(e)
+        return future
+
+    if not collector.waits:
+        future.set_result(res)
+        return future
+
+    def wait():
+        try:
+            collector.wait()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(res)
+
+    thread = Thread(target=wait)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def poll_until(condition, timeout=None, min_interval=0.001, max_interval=0.1):
+    """Call a function until it returns a true value.
+
+    The interval between two calls starts at min_interval and is doubled
+    after each unsuccessful call up to max_interval, so that fast conditions
+    are detected with a low latency while slow ones do not saturate the bus.
+    No lock is held between the calls.
+
+    Parameters
+    ----------
+    condition : callable
+        Function called without arguments.
+
+    timeout : float, optional
+        Maximal time to wait in seconds. None means waiting forever.
+
+    min_interval, max_interval : float, optional
+        Bounds of the interval between two calls in seconds.
+
+    Returns
+    -------
+    result :
+        First true value returned by the condition.
+
+    Raises
+    ------
+    TimeoutError :
+        If the condition is not met before the timeout expires.
+
+    """
+    deadline = None if timeout is None else time() + timeout
+    interval = min_interval
+    while True:
+        result = condition()
+        if result:
+            return result
+        if deadline is not None:
+            remaining = deadline - time()
+            if remaining <= 0:
+                raise TimeoutError('Condition not met after %s s' % timeout)
+            interval = min(interval, remaining)
+        sleep(interval)
+        interval = min(2*interval, max_interval)
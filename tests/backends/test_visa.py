@@ -13,6 +13,7 @@ from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 
 import os
+from threading import Timer
 
 import pytest
 
@@ -20,13 +21,15 @@ pytest.importorskip('lantz_core.backends.visa')
 pytest.importorskip('pyvisa-sim')
 
 from pyvisa.highlevel import ResourceManager
-from lantz_core.features import Float
-from lantz_core.errors import InterfaceNotSupported
+from lantz_core.features import Float, Unicode
+from lantz_core.errors import InterfaceNotSupported, TimeoutError
 from lantz_core.backends.visa import (get_visa_resource_manager,
                                       set_visa_resource_manager,
                                       BaseVisaDriver,
                                       VisaMessageDriver,
                                       VisaRegisterDriver,
+                                      CommandTemplate,
+                                      compact_scpi,
                                       errors,
                                       to_canonical_name)
 
@@ -258,6 +261,44 @@ class TestBaseVisaDriver(object):
             visa_driver.uninstall_handler(None, None)
 
 
+# --- Test command templates --------------------------------------------------
+
+class TestCommandTemplate(object):
+
+    def test_constant(self):
+        t = CommandTemplate('CH{id}:VOLT?', {'id': 2})
+        assert t.message == 'CH2:VOLT?'
+        assert t.format() == 'CH2:VOLT?'
+        assert t.encode('ascii', '\n') == b'CH2:VOLT?\n'
+
+    def test_single_value(self):
+        t = CommandTemplate('CH{id}:VOLT {:.2f};{{x}}', {'id': 1})
+        assert t.message is None
+        assert t.format(1) == 'CH1:VOLT 1.00;{x}'
+        assert t.encode('ascii', '\n', 2) == b'CH1:VOLT 2.00;{x}\n'
+        assert t.encode('ascii', '', 2) == b'CH1:VOLT 2.00;{x}'
+
+    def test_conversion(self):
+        t = CommandTemplate('VAL {!r}', {})
+        assert t.format('a') == "VAL 'a'"
+
+    def test_multiple_values(self):
+        t = CommandTemplate('VAL {1},{0}', {})
+        assert t.format(1, 2) == 'VAL 2,1'
+        assert t.encode('ascii', '\n', 1, 2) == b'VAL 2,1\n'
+
+    def test_nested_fields(self):
+        t = CommandTemplate('VAL {:{w}}', {'w': 3})
+        assert t.format(1) == 'VAL   1'
+
+
+def test_compact_scpi():
+    assert (compact_scpi([':SOUR:VOLT:LEV?', ':SOUR:VOLT:OFFS?', '*OPC?',
+                          ':OUTP:STAT?']) ==
+            'SOUR:VOLT:LEV?;OFFS?;*OPC?;:OUTP:STAT?')
+    assert compact_scpi(['FREQ 1', 'FREQ 2']) == 'FREQ 1;FREQ 2'
+
+
 # --- Test message driver specific methods ------------------------------------
 
 class TestVisaMessage(VisaMessageDriver):
@@ -274,6 +315,61 @@ class TestVisaMessage2(VisaMessageDriver):
     MODEL_CODE = '0x39'
 
 
+class StatusDriver(VisaMessageDriver):
+    pass
+
+
+class StatusResource(object):
+    """Fake resource whose status byte is read from a list of values.
+
+    """
+    def __init__(self, stbs, srq=False):
+        self.stbs = list(stbs)
+        self.srq = srq
+        self.srq_stb = None
+        self.reads = 0
+        self.handler = None
+        self.events_enabled = False
+        self.messages = []
+        self.answers = []
+        self.timeout = 2000
+
+    def read_stb(self):
+        self.reads += 1
+        return self.stbs.pop(0) if len(self.stbs) > 1 else self.stbs[0]
+
+    def set_stb(self, stb):
+        self.stbs = [stb]
+
+    def install_handler(self, event_type, handler, user_handle=None):
+        if not self.srq:
+            raise NotImplementedError()
+        self.handler = handler
+        return user_handle
+
+    def uninstall_handler(self, event_type, handler, user_handle=None):
+        assert handler is self.handler
+        self.handler = None
+
+    def enable_event(self, event_type, mechanism):
+        self.events_enabled = True
+        if self.srq_stb is not None:
+            def request():
+                self.set_stb(self.srq_stb)
+                self.handler(None, event_type, None, None)
+            Timer(0.01, request).start()
+
+    def disable_event(self, event_type, mechanism):
+        self.events_enabled = False
+
+    def write(self, message, termination=None, encoding=None):
+        self.messages.append(message)
+
+    def query(self, message, delay=None):
+        self.messages.append(message)
+        return self.answers.pop(0)
+
+
 class TestVisaMessageDriver(object):
 
     def test_via_usb_instr(self):
@@ -369,9 +465,49 @@ class TestVisaMessageDriver(object):
         assert d.freq == 100.0
         d.freq = 10.
         assert d.freq == 10.
+        assert set(d._templates) == {'?FREQ', 'FREQ {}'}
+
+        d.TEMPLATE_CACHE_SIZE = 2
+        assert d.get_template('*IDN?', {}).encode('ascii', '\n') == \
+            b'*IDN?\n'
+        assert set(d._templates) == {'?FREQ', 'FREQ {}'}
 
     def test_status_byte(self):
-        pass
+        d = StatusDriver.via_tcpip('192.168.0.101', backend=base_backend)
+        d._resource = StatusResource([0b110000])
+        status = d.read_status_byte()
+        assert status['Message available'] and status['Event status']
+        assert not status['Request']
+        assert status == 0b110000
+
+    def test_wait_for_status_polling(self):
+        d = StatusDriver.via_tcpip('192.168.0.101', backend=base_backend)
+        d._resource = StatusResource([0, 0, 0b10000, 0b110000])
+        status = d.wait_for_status('Message available')
+        assert status == 0b10000
+        assert d._resource.reads == 3
+
+        with pytest.raises(TimeoutError):
+            d.wait_for_status(['Message available', 'Request'], 0.01)
+
+        # Other threads can communicate while waiting.
+        d._resource = StatusResource([0])
+        Timer(0.01, d._resource.set_stb, (0b1000000,)).start()
+        d.wait_for_status(0b1000000, 1)
+
+    def test_wait_for_status_srq(self):
+        d = StatusDriver.via_tcpip('192.168.0.101', backend=base_backend)
+        d._resource = StatusResource([0], srq=True)
+        d._resource.srq_stb = 0b1010000
+        assert d.wait_for_status('Message available', 1) == 0b1010000
+        assert d._resource.reads == 2
+        assert d._resource.handler is None
+        assert not d._resource.events_enabled
+
+        d._resource = StatusResource([0], srq=True)
+        with pytest.raises(TimeoutError):
+            d.wait_for_status('Request', 0.01)
+        assert d._resource.handler is None
 
 #    def test_write_raw(self):
 #
@@ -387,6 +523,68 @@ class TestVisaMessageDriver(object):
 #        with pytest.raises(NotImplementedError):
 #            self.driver.write_ascii_values('VAL', range(10), 'f', ',')
 
+    def test_operation_complete(self):
+        d = StatusDriver.via_tcpip('192.168.0.101', backend=base_backend)
+        d._resource = StatusResource([0])
+        d._resource.answers = ['0', '32', '33']
+        d.wait_operation_complete(1)
+        assert d._resource.messages == ['*OPC', '*ESR?', '*ESR?', '*ESR?']
+
+        d._resource = StatusResource([0, 0b100000])
+        d._resource.answers = ['1']
+        d.OPC_METHOD = 'srq'
+        d.wait_operation_complete(1)
+        assert d._resource.messages == ['*OPC', '*ESR?']
+
+        class Resource(StatusResource):
+            def query(self, message, delay=None):
+                self.query_timeout = self.timeout
+                return super(Resource, self).query(message, delay)
+
+        d._resource = Resource([0])
+        d._resource.answers = ['1']
+        d.OPC_METHOD = 'query'
+        d.wait_operation_complete(10)
+        assert d._resource.messages == ['*OPC?']
+        assert d._resource.query_timeout == 10000
+        assert d._resource.timeout == 2000
+        del d.OPC_METHOD
+
+    def test_grouped_reads(self):
+        """Test that grouped reads fall back to single reads on a mismatch.
+
+        """
+        class RawResource(StatusResource):
+            encoding = 'ascii'
+            write_termination = '\n'
+            query_delay = 0.0
+
+            def write_raw(self, data):
+                self.messages.append(data)
+
+            def read(self):
+                return self.answers.pop(0)
+
+        class TestGrouped(StatusDriver):
+            COMPOUND_COMMANDS = True
+            name = Unicode('NAME?')
+            freq = Float('FREQ?')
+
+        d = TestGrouped.via_tcpip('192.168.0.101', backend=base_backend)
+        d._resource = RawResource([0])
+        d._resource.answers = ['a;1.0']
+        values = d.read_features(('name', 'freq'))
+        assert list(values.values()) == ['a', 1.0]
+        assert d._resource.messages == [b'NAME?;FREQ?\n']
+
+        d.clear_cache()
+        d._resource.messages = []
+        d._resource.answers = ['a;b;1.0', 'a;b', '1.0']
+        values = d.read_features(('name', 'freq'))
+        assert list(values.values()) == ['a;b', 1.0]
+        assert d._resource.messages == [b'NAME?;FREQ?\n', b'NAME?\n',
+                                        b'FREQ?\n']
+
     def test_write_binary_values(self):
 
         pass
@@ -11,10 +11,14 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+from threading import Event, Thread
+
 from pytest import raises
 from stringparser import Parser
 
-from lantz_core.features.feature import Feature, get_chain, set_chain
+from lantz_core.features.feature import (Feature, get_chain, set_chain,
+                                         prefetch_features, set_features)
+from lantz_core.has_features import subsystem
 from lantz_core.features.util import PostGetComposer
 from lantz_core.errors import LantzError
 from ..testing_tools import DummyParent
@@ -34,7 +38,8 @@ class TestFeatureInit(object):
     parameters = dict(extract='{}',
                       retries=1,
                       checks='1>0',
-                      discard={'limits': 'test'}
+                      discard={'limits': 'test'},
+                      wait='opc'
                       )
 
     exclude = list()
@@ -271,6 +276,138 @@ def test_feature_checkers():
         driver.feat_sch = 1
 
 
+def test_checks_prefetch():
+    """Test that the Features referenced by checks are read in one batch.
+
+    """
+
+    class PrefetchParent(DummyParent):
+
+        enabled = Feature('EN?')
+        mode = Feature('MODE?')
+        out = subsystem()
+        with out as o:
+            o.volt = Feature('VOLT?')
+
+        feat = Feature('FEAT?', 'FEAT {}',
+                       checks=('driver.enabled and driver.mode == "MODE?"'
+                               '; driver.out.volt; driver.get_feat("mode")'))
+
+        def default_get_features(self, requests):
+            self.batches.append([cmd for _, cmd, _ in requests])
+            return super(PrefetchParent,
+                         self).default_get_features(requests)
+
+    assert PrefetchParent.feat.get_check.features == ('enabled', 'mode',
+                                                      'out.volt')
+    driver = PrefetchParent(caching_allowed=True)
+    driver.batches = []
+    assert driver.feat == 'FEAT?'
+    assert driver.batches == [['EN?', 'MODE?', 'VOLT?']]
+
+    # Cached values are not read again.
+    driver.clear_cache(features=['mode'])
+    driver.feat = 1
+    assert driver.batches == [['EN?', 'MODE?', 'VOLT?']]
+    assert driver.d_get_called == 5
+
+    # Without cache the checks read the values themselves.
+    driver = PrefetchParent()
+    driver.batches = []
+    prefetch_features(driver, ('enabled', 'mode'))
+    assert driver.batches == []
+
+
+def test_wait_opc():
+    """Test waiting for the completion of the operation after a set.
+
+    """
+    class OpcParent(DummyParent):
+
+        feat = Feature('FEAT?', 'FEAT {}', wait={'mode': 'opc', 'timeout': 1})
+        ss = subsystem()
+        with ss as s:
+            s.feat = Feature('FEAT?', 'FEAT {}', wait='opc')
+
+        def arm_operation_complete(self):
+            assert self.d_set_called
+            self.waits = []
+            return self.waits.append
+
+    driver = OpcParent()
+    driver.feat = 1
+    assert driver.waits == [1]
+    driver.ss.feat = 1
+    assert driver.waits == [None]
+
+    with raises(ValueError):
+        Feature('FEAT?', 'FEAT {}', wait='sleep')
+
+
+class BlockingOpcParent(DummyParent):
+    """Driver whose operations complete when the completed event is set.
+
+    """
+    feat = Feature('FEAT?', 'FEAT {}', wait={'mode': 'opc', 'timeout': 1})
+    other = Feature('OTHER?', 'OTHER {}')
+
+    def __init__(self, caching_allowed=True):
+        super(BlockingOpcParent, self).__init__(caching_allowed)
+        self.armed = 0
+        self.waiting = Event()
+        self.completed = Event()
+
+    def arm_operation_complete(self):
+        self.armed += 1
+
+        def wait(timeout):
+            self.waiting.set()
+            assert self.completed.wait(timeout)
+
+        return wait
+
+
+def test_wait_opc_releases_lock():
+    """Test that the driver lock is released while waiting.
+
+    """
+    driver = BlockingOpcParent()
+    thread = Thread(target=setattr, args=(driver, 'feat', 1))
+    thread.start()
+    assert driver.waiting.wait(1)
+    # Another thread can use the driver during the wait.
+    driver.other = 2
+    assert driver.d_set_cmd == 'OTHER {}'
+    driver.completed.set()
+    thread.join(1)
+    assert driver.armed == 1
+
+    driver.waiting.clear()
+    set_features([(BlockingOpcParent.feat, driver, 3),
+                  (BlockingOpcParent.other, driver, 4)])
+    assert driver.armed == 2
+
+
+def test_start_set():
+    """Test setting a Feature without waiting for the operation.
+
+    """
+    driver = BlockingOpcParent()
+    future = driver.start_set('feat', 1)
+    assert driver.d_set_cmd == 'FEAT {}'
+    assert driver.armed == 1
+    assert not future.done()
+    driver.completed.set()
+    assert future.result(1) is None
+
+    # Features without wait complete immediately.
+    assert driver.start_set('other', 1).done()
+
+    driver.d_set_raise = LantzError
+    with raises(LantzError):
+        driver.start_set('other', 2).result(1)
+
+
 def test_clone():
     """Test cloning a feature.
 
@@ -15,6 +15,7 @@ from __future__ import (division, unicode_literals, print_function,
 from lantz_core.features.mapping import Mapping
 from lantz_core.features.bool import Bool
 
+from ..testing_tools import DummyParent
 from .test_feature import TestFeatureInit
 
 
@@ -58,3 +59,21 @@ def test_bool():
              aliases={True: ['On', 'on', 'ON'], False: ['Off', 'off', 'OFF']})
     assert b.pre_set(None, 'ON') == 1
     assert b.pre_set(None, 'off') == 2
+
+
+def test_bool_set_aliases():
+    """Test that aliases of the last set value are not sent again.
+
+    """
+    class BoolParent(DummyParent):
+
+        feat = Bool('FEAT?', 'FEAT {}', mapping={True: 1, False: 2},
+                    aliases={True: ['On', 'on', 'ON']})
+
+    driver = BoolParent(caching_allowed=True)
+    driver.feat = True
+    assert driver.d_set_called == 1
+    driver.feat = 'on'
+    assert driver.d_set_called == 1
+    driver.feat = False
+    assert driver.d_set_called == 2
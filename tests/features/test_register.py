@@ -46,3 +46,53 @@ class TestRegister(object):
     def test_pre_set(self):
         r = Register('a', names={'a': 0, 'b': 1, 'r': 15}, length=16)
         assert r.pre_set(None, {'r': True, 'b': False}) == 2**15
+
+    def test_wide_register(self):
+        r = Register('a', names={'ready': 0, 'mode': (4, 3), 'err': 31},
+                     length=32)
+        assert r.names[:3] == ('ready', 1, 2)
+        assert len(r.names) == 30
+        val = r.post_get(None, str(2**31 + 0b1010001))
+        assert val == 2**31 + 0b1010001
+        assert val.ready is True and val['err'] is True
+        assert val.mode == 5
+        assert val[1] is False
+        assert dict(val.items())['mode'] == 5
+        assert 'mode' in val and 'other' not in val
+        with raises(AttributeError):
+            val.other
+        with raises(KeyError):
+            val['other']
+
+        assert r.pre_set(None, {'mode': 7, 'err': True}) == 2**31 + 0b1110000
+        assert r.pre_set(None, val) == val
+        with raises(ValueError):
+            r.pre_set(None, {'mode': 8})
+        with raises(ValueError):
+            r.pre_set(None, {'other': 1})
+
+    def test_64_bits_register(self):
+        r = Register('a', names={'low': (0, 4), 'top': 63}, length=64)
+        val = r.post_get(None, str(2**63 + 3))
+        assert val == 2**63 + 3
+        assert val.top is True and val.low == 3
+        assert hash(val) == hash(2**63 + 3)
+        assert r.pre_set(None, {'top': True, 'low': 3}) == 2**63 + 3
+
+    def test_invalid_fields(self):
+        with raises(ValueError):
+            Register('a', names={'a': (6, 4)})
+        with raises(ValueError):
+            Register('a', names={'a': (0, 4), 'b': 3})
+
+    def test_register_value(self):
+        r = Register('a', names=('a', 'b', None, 'r', None, None, None, None))
+        val = r.post_get(None, '10')
+        assert val == {'a': False, 'b': True, 2: False, 'r': True, 4: False,
+                       5: False, 6: False, 7: False}
+        assert val != {'a': True}
+        assert val == 10 and val != 10.5
+        assert hash(val) == hash(10)
+        assert 'b=True' in repr(val)
+        with raises(AttributeError):
+            val.b = False
@@ -162,6 +162,14 @@ class TestFloat(object):
         assert hasattr(f.post_get(None, 0.1), 'magnitude')
         assert f.post_get(None, 0.1).to('mV').magnitude == 100.
 
+    @mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
+    def test_lazy_unit(self):
+        f = Float(unit='V', limits=FloatLimitsValidator(0, 1, unit='mV'))
+        assert f._unit == 'V'
+        assert f.limits._unit == 'mV'
+        assert f.unit == get_unit_registry().parse_expression('V')
+        assert f.limits.unit == get_unit_registry().parse_expression('mV')
+
     @mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
     def test_post_get_with_extract_and_unit(self):
         f = Float(unit='V', extract='This is the value {}')
@@ -329,3 +337,59 @@ class TestFloat(object):
         parent.val = 1
         parent.fl = 0.2
         assert parent.val == 1
+
+    def test_set_within_tolerance(self):
+        """Test that values matching the last set value within the tolerance
+        are not sent again.
+
+        """
+        parent = CacheFloatTester()
+        parent.fl = 1.0
+        parent.val = 2
+        parent.fl = 1.0000000001
+        assert parent.val == 2
+        parent.fl = 1.1
+        assert parent.val == 1.1
+
+        # Clearing the cache invalidates the last set value.
+        parent.clear_cache()
+        parent.val = 2
+        parent.fl = 1.1
+        assert parent.val == 1.1
+
+    def test_set_within_resolution(self):
+        """Test using the declared resolution to compare set values.
+
+        """
+        class ResolutionTester(CacheFloatTester):
+
+            fl = set_feat(resolution=0.01)
+
+        parent = ResolutionTester()
+        parent.fl = 1.0
+        parent.val = 2
+        parent.fl = 1.004
+        assert parent.val == 2
+        parent.fl = 1.006
+        assert parent.val == 1.006
+
+    @mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
+    def test_set_within_tolerance_with_units(self):
+        """Test comparing set values expressed in different units.
+
+        """
+        class StepTester(UnitCacheFloatTester):
+
+            fl = set_feat(unit='V',
+                          limits=FloatLimitsValidator(0, 10000, 1, unit='mV'))
+
+        ureg = get_unit_registry()
+        parent = StepTester()
+        parent.fl = ureg.parse_expression('1 V')
+        parent.val = 2
+        parent.fl = ureg.parse_expression('1000 mV')
+        assert parent.val == 2
+        parent.fl = 0.1 + 0.2
+        parent.val = 2
+        parent.fl = ureg.parse_expression('300 mV')
+        assert parent.val == 2
@@ -12,9 +12,16 @@
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 
-from pytest import mark, raises
+import inspect
+from threading import Event
+
+from pytest import mark, raises, importorskip
+from funcsigs import signature
 
 from lantz_core.action import Action
+from lantz_core.errors import TimeoutError
+from lantz_core.features.feature import Feature
+from lantz_core.has_features import subsystem
 from lantz_core.limits import IntLimitsValidator
 from lantz_core.unit import UNIT_SUPPORT, get_unit_registry
 from .testing_tools import DummyParent
@@ -145,6 +152,47 @@ def test_action_with_unit():
     assert dummy.test(2, 3) == get_unit_registry().parse_expression('6 V')
 
 
+@mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
+def test_action_with_unit_conversion(monkeypatch):
+    """Test the conversion of Quantity arguments without UnitRegistry.wraps.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(units=('ohm*A', (None, 'ohm', 'A')))
+        def test(self, r, i):
+            return r*i
+
+        @Action(units=(None, (None, 'V')))
+        def plain(self, v):
+            return v
+
+    ureg = get_unit_registry()
+    monkeypatch.setattr(type(ureg), 'wraps', None, raising=False)
+    dummy = Dummy()
+    q = ureg.parse_expression
+    assert dummy.test(q('2 kohm'), i=q('3 mA')) == q('6 V')
+    assert dummy.test(2, i=q('3 mA')) == q('0.006 V')
+    assert dummy.plain(q('10 mV')) == 0.01
+    assert dummy.plain(1) == 1
+
+
+@mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
+def test_action_with_unit_reference():
+    """Test that units referencing arguments are handled by Pint.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(units=('=A**2', (None, '=A')))
+        def test(self, a):
+            return a*a
+
+    ureg = get_unit_registry()
+    assert Dummy().test(ureg.parse_expression('2 V')) ==\
+        ureg.parse_expression('4 V**2')
+
+
 def test_action_with_checks():
     """Test defining an action with checks.
 
@@ -164,3 +212,367 @@ def test_action_with_checks():
 
     with raises(AssertionError):
         dummy.test(3, -1)
+
+
+def test_action_with_complex_signature():
+    """Test validating arguments with defaults, *args and **kwargs.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(checks='b > 0', values={'c': (1, 2)})
+        def test(self, a, b=1, c=2, *args, **kwargs):
+            return a, b, c, args, kwargs
+
+    dummy = Dummy()
+    assert dummy.test(0) == (0, 1, 2, (), {})
+    assert dummy.test(0, c=1, d=3) == (0, 1, 1, (), {'d': 3})
+    assert dummy.test(0, 2, 1, 4) == (0, 2, 1, (4,), {})
+    with raises(AssertionError):
+        dummy.test(0, b=0)
+    with raises(ValueError):
+        dummy.test(0, 1, 3)
+    with raises(TypeError):
+        dummy.test()
+
+
+def test_action_bound_validation_fallback():
+    """Test the validation of callables whose signature cannot be reproduced.
+
+    """
+    def func(driver, a):
+        return a
+
+    action = Action()
+    action.sig = signature(func)
+    validators = action.build_validators({'a': (1, 2)}, {})
+    wrapper = action._add_bound_validation(func, validators, 'a > 0')
+    assert wrapper(None, 1) == 1
+    with raises(ValueError):
+        wrapper(None, 3)
+    with raises(AssertionError):
+        wrapper(None, -1)
+
+
+def test_action_map():
+    """Test calling an action over arrays of values.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(checks='a != 3', values={'b': (1, 2)}, limits={'a': (0, 10)})
+        def test(self, a, b=1):
+            return a*b
+
+    dummy = Dummy()
+    res = dummy.test.map(a=[1, 2, 4], b=2)
+    assert res.results == [2, 4, 8]
+    assert len(res.timings) == 3
+    assert res.elapsed >= sum(res.timings)
+
+    with raises(ValueError) as e:
+        dummy.test.map(a=[1, 11])
+    assert 'call 1' in e.exconly()
+    with raises(ValueError):
+        dummy.test.map(a=[1, 2], b=[1, 3])
+    with raises(ValueError):
+        dummy.test.map(a=[1, 2], b=[1])
+    with raises(AssertionError):
+        dummy.test.map(a=[1, 3])
+
+
+def test_action_map_batched():
+    """Test using a driver provided batched implementation.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(limits={'a': (0, 10)})
+        def test(self, a):
+            return a
+
+        def _map_test(self, a):
+            return [-v for v in a]
+
+    res = Dummy().test.map(a=range(3))
+    assert res.results == [0, -1, -2]
+    assert res.timings is None
+    with raises(ValueError):
+        Dummy().test.map(a=[1, 11])
+
+
+def test_action_map_batched_checks():
+    """Test that the checks are run before calling the batched method.
+
+    """
+    class Dummy(DummyParent):
+
+        batches = 0
+
+        @Action(checks='a > 0')
+        def test(self, a):
+            return a
+
+        def _map_test(self, a):
+            self.batches += 1
+            return list(a)
+
+    d = Dummy()
+    assert d.test.map(a=[1, 2]).results == [1, 2]
+    with raises(AssertionError) as e:
+        d.test.map(a=[1, -1])
+    assert 'Call 1' in str(e.value)
+    assert d.batches == 1
+
+
+def test_action_map_numpy():
+    """Test vectorized validation of NumPy arrays.
+
+    """
+    np = importorskip('numpy')
+
+    class Dummy(DummyParent):
+
+        @Action(limits={'a': (0.0, 1.0, 0.1)})
+        def test(self, a):
+            return a
+
+    dummy = Dummy()
+    assert len(dummy.test.map(a=np.linspace(0, 1, 11)).results) == 11
+    with raises(ValueError) as e:
+        dummy.test.map(a=np.array([0.1, 0.2, 0.25]))
+    assert 'call 2' in e.exconly()
+
+
+@mark.skipif(UNIT_SUPPORT is False, reason="Requires Pint")
+def test_action_map_with_units():
+    """Test that units are converted once for all calls.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(units=('V', (None, 'V')), limits={'v': (0.0, 1.0)})
+        def test(self, v):
+            return v
+
+    q = get_unit_registry().parse_expression
+    res = Dummy().test.map(v=[q('10 mV'), 0.5])
+    assert res.results == [q('0.01 V'), q('0.5 V')]
+
+
+def test_cached_action():
+    """Test caching the results of an action.
+
+    """
+    class Dummy(DummyParent):
+
+        calls = 0
+
+        feat = Feature(setter=True, discard=('test',))
+
+        @Action(cache=True)
+        def test(self, a=1):
+            self.calls += 1
+            return a
+
+        def _set_feat(self, feat, value):
+            pass
+
+    dummy = Dummy(True)
+    other = Dummy(True)
+    assert dummy.test.cache_stats == {'hits': 0, 'misses': 0}
+    assert dummy.test() == 1
+    assert dummy.test() == 1
+    assert dummy.test(a=2) == 2
+    assert dummy.test([1]) == [1]
+    assert dummy.calls == 3
+    assert dummy.test.cache_stats == {'hits': 1, 'misses': 2}
+    # Equivalent calls share the same entry.
+    assert dummy.test(1) == 1
+    assert dummy.test(2) == 2
+    assert dummy.calls == 3
+    assert dummy.test.cache_stats == {'hits': 3, 'misses': 2}
+    # The results are not mixed with the values of the Features.
+    assert dummy.check_cache() == {}
+    # The statistics are specific to each driver.
+    other.test()
+    assert other.test.cache_stats == {'hits': 0, 'misses': 1}
+    assert dummy.test.cache_stats == {'hits': 3, 'misses': 2}
+
+    dummy.clear_cache(features=('test',))
+    dummy.test()
+    assert dummy.calls == 4
+
+    dummy.feat = 1
+    dummy.test()
+    assert dummy.calls == 5
+
+    dummy.clear_action_cache()
+    assert dummy.test.cache_stats == {'hits': 0, 'misses': 0}
+    dummy.test()
+    assert dummy.calls == 6
+    assert other.test.cache_stats == {'hits': 0, 'misses': 1}
+
+    dummy.clear_action_cache(['test'])
+    dummy.test()
+    assert dummy.calls == 7
+
+    dummy.clear_cache()
+    dummy.test()
+    assert dummy.calls == 8
+
+    dummy = Dummy(False)
+    dummy.test()
+    dummy.test()
+    assert dummy.calls == 2
+
+
+def test_clear_action_cache_subsystem():
+    """Test clearing the cache of actions on subsystems.
+
+    """
+    class Dummy(DummyParent):
+
+        calls = 0
+
+        ss = subsystem()
+        with ss as s:
+            @s
+            @Action(cache=True)
+            def test(self):
+                self.parent.calls += 1
+
+    dummy = Dummy(True)
+    dummy.ss.test()
+    dummy.ss.test()
+    assert dummy.calls == 1
+    dummy.clear_action_cache()
+    dummy.ss.test()
+    assert dummy.calls == 2
+
+
+class OpcParent(DummyParent):
+    """Driver whose operations complete after a given number of checks.
+
+    """
+    def __init__(self, caching_allowed=True):
+        super(OpcParent, self).__init__(caching_allowed)
+        self.armed = 0
+        self.completed = Event()
+        self.fail = False
+
+    def arm_operation_complete(self):
+        self.armed += 1
+
+        def wait(timeout=None):
+            if not self.completed.wait(timeout) or self.fail:
+                raise TimeoutError()
+
+        return wait
+
+    @Action(wait={'mode': 'opc', 'timeout': 1})
+    def sweep(self, points):
+        return points
+
+    op = subsystem()
+    with op as o:
+        @o
+        @Action(wait='opc', checks='points > 0')
+        def autocal(self, points):
+            return points
+
+
+def test_action_wait_opc():
+    driver = OpcParent()
+    driver.completed.set()
+    assert driver.sweep(10) == 10
+    assert driver.op.autocal(2) == 2
+    assert driver.armed == 2
+
+    driver.fail = True
+    with raises(TimeoutError):
+        driver.sweep(1)
+
+    with raises(ValueError):
+        Action(wait='sleep')(lambda driver: None)
+
+
+def test_action_start():
+    driver = OpcParent()
+    future = driver.sweep.start(3)
+    assert driver.armed == 1
+    assert not future.done()
+    driver.completed.set()
+    assert future.result(1) == 3
+
+    driver.fail = True
+    with raises(TimeoutError):
+        driver.sweep.start(3).result(1)
+
+    # Failures while sending the commands are reported through the future.
+    with raises(AssertionError):
+        driver.op.autocal.start(-1).result(1)
+
+    # Actions without wait complete immediately.
+    class Parent(DummyParent):
+
+        @Action()
+        def action(self):
+            return 1
+
+    assert Parent().action.start().result(0) == 1
+
+
+def test_action_map_wait():
+    """Test that map waits once for the completion of all the operations.
+
+    """
+    driver = OpcParent()
+    driver.completed.set()
+    res = driver.sweep.map(points=[1, 2, 3])
+    assert res.results == [1, 2, 3]
+    assert driver.armed == 1
+
+    driver.fail = True
+    with raises(TimeoutError):
+        driver.op.autocal.map(points=[1, 2])
+    assert driver.armed == 2
+
+    class Cached(OpcParent):
+
+        @Action(wait='opc', cache=True)
+        def measure(self, points):
+            return points
+
+    driver = Cached()
+    driver.completed.set()
+    assert driver.measure.map(points=[1, 1, 2]).results == [1, 1, 2]
+    assert driver.armed == 1
+    assert driver.measure.cache_stats == {'hits': 1, 'misses': 2}
+
+
+def test_bound_action_introspection():
+    """Test that bound actions expose the metadata of the method.
+
+    """
+    class Dummy(DummyParent):
+
+        @Action(checks='a > 0')
+        def test(self, a, b=2):
+            """Documentation of test.
+
+            """
+            return a
+
+    dummy = Dummy()
+    bound = dummy.test
+    assert bound.__doc__ == Dummy.test.__doc__
+    assert 'Documentation of test.' in bound.__doc__
+    assert bound.__name__ == 'test'
+    assert bound.__wrapped__ is Dummy.test.raw_func
+    assert bound.__self__ is dummy
+    assert bound == dummy.test
+    assert bound.cache_stats is None
+    assert inspect.isroutine(bound)
+    if hasattr(inspect, 'signature'):
+        assert list(inspect.signature(bound).parameters) == ['a', 'b']
@@ -11,8 +11,14 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+from time import sleep
 
-from lantz_core.has_features import channel
+from pytest import raises
+
+from lantz_core.has_features import channel, subsystem
+from lantz_core.channel import format_channel_list
+from lantz_core.features.feature import Feature
+from lantz_core.features.scalars import Int
 from .testing_tools import DummyParent
 
 
@@ -70,3 +76,178 @@ def test_ch_reop():
     ch = a.ch[1]
     ch.reopen_connection()
     assert a.ropen_called == 1
+
+
+# --- Test available channels caching -----------------------------------------
+
+class ListingParent(DummyParent):
+
+    ch = channel('_list_ch')
+
+    def __init__(self, caching_allowed=True):
+        super(ListingParent, self).__init__(caching_allowed)
+        self.listed = 0
+        self.ids = (1, 2)
+
+    def _list_ch(self):
+        self.listed += 1
+        return self.ids
+
+
+def test_available_caching():
+    a = ListingParent()
+    assert a.ch.available == (1, 2)
+    assert [ch.id for ch in a.ch] == [1, 2]
+    assert a.listed == 1
+    assert a.ch.available_stats == {'queries': 1, 'hits': 1}
+
+    a.ids = (1, 3)
+    assert a.ch.refresh_available() == (1, 3)
+    assert a.listed == 2
+    assert 3 in a.ch
+    assert 2 not in a.ch
+
+
+def test_available_ttl():
+    a = ListingParent()
+    a.ch.ttl = 0.01
+    a.ch.available
+    sleep(0.02)
+    a.ch.available
+    assert a.listed == 2
+
+
+def test_getitem_validation():
+    a = ListingParent()
+    a.ch[1]
+    with raises(KeyError):
+        a.ch[3]
+    assert a.listed == 1
+
+    # An unknown id triggers a refresh only if the cached list is outdated.
+    a.ids = (1, 2, 3)
+    a.ch.ttl = 0
+    assert a.ch[3].id == 3
+    assert a.listed == 2
+
+
+def test_ttl_declaration():
+
+    class TTLParent(ListingParent):
+
+        ch = channel(ttl=1.)
+
+    assert TTLParent().ch.ttl == 1.
+    assert ListingParent().ch.ttl is None
+
+
+# --- Test multiple channels access -------------------------------------------
+
+class BulkParent(DummyParent):
+
+    ch = channel((1, 2, 3))
+
+    with ch:
+        ch.feat = Int('feat', 'feat {}')
+
+    def __init__(self, caching_allowed=True):
+        super(BulkParent, self).__init__(caching_allowed)
+        self.bulk_get_ids = []
+        self.bulk_set_values = []
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        super(BulkParent, self).default_get_feature(feat, cmd, *args,
+                                                    **kwargs)
+        return kwargs['id']
+
+
+class BulkParent2(BulkParent):
+
+    def _bulk_get_ch_feat(self, feat, ids):
+        self.bulk_get_ids.append(list(ids))
+        return [str(10*i) for i in ids]
+
+    def _bulk_set_ch_feat(self, feat, values):
+        self.bulk_set_values.append(dict(values))
+
+
+def test_get_all_fallback():
+    a = BulkParent()
+    assert a.ch.get_all('feat') == {1: 1, 2: 2, 3: 3}
+    assert a.d_get_called == 3
+    assert list(a.ch.get_all('feat', ids=(3, 1))) == [3, 1]
+    assert a.d_get_called == 3
+
+
+def test_get_all_bulk():
+    a = BulkParent2()
+    a.ch[2].feat
+    assert a.ch.get_all('feat') == {1: 10, 2: 2, 3: 30}
+    assert a.bulk_get_ids == [[1, 3]]
+    assert a.ch[3].feat == 30
+    assert a.d_get_called == 1
+
+
+def test_set_all_fallback():
+    a = BulkParent()
+    a.ch.set_all('feat', [1, 2, 3])
+    assert a.d_set_called == 3
+    a.ch.set_all('feat', {2: 2})
+    assert a.d_set_called == 3
+
+
+def test_set_all_bulk():
+    a = BulkParent2()
+    a.ch.set_all('feat', {1: 5, 3: 6})
+    assert a.bulk_set_values == [{1: 5, 3: 6}]
+    assert a.d_check_instr == 2
+    assert a.ch[1].feat == 5
+    assert a.d_get_called == 0
+
+
+def test_format_channel_list():
+    assert format_channel_list((1, 2, 3, 5, 7, 8)) == '(@1:3,5,7:8)'
+    assert format_channel_list(('a', 'b')) == '(@a,b)'
+
+
+# --- Test routing ------------------------------------------------------------
+
+class NestedChParent(DummyParent):
+
+    ch = channel((1, 2))
+    with ch as c:
+        c.ss = subsystem()
+        with c.ss as s:
+            s.inner = channel(('a',))
+        c.inner = channel(('a',))
+
+
+def test_nested_channel_routing():
+    a = NestedChParent()
+    a.ch[2].ss.default_get_feature(None, 'Test')
+    assert a.d_get_kwargs == {'id': 2}
+    a.ch[2].inner['a'].default_set_feature(None, 'Test', 1)
+    assert a.d_set_kwargs == {'id': 'a', 'ids': (2, 'a')}
+    a.ch[1].ss.inner['a'].default_get_feature(None, 'Test')
+    assert a.d_get_kwargs == {'id': 'a', 'ids': (1, 'a')}
+    assert a.ch[2].inner['a'].lock is a.lock
+
+
+def test_nested_channel_features():
+
+    class Nested(DummyParent):
+
+        ch = channel((1, 2))
+        with ch as c:
+            c.inner = channel(('a', 'b'))
+            with c.inner as i:
+                i.val = Feature('VAL?')
+
+        def default_get_feature(self, feat, cmd, *args, **kwargs):
+            return '{}{}'.format(*kwargs['ids'])
+
+    a = Nested(True)
+    assert a.ch[1].inner['b'].val == '1b'
+    # Grouped reads receive the same keywords.
+    snap = a.snapshot()
+    assert snap.values['ch'][2]['inner']['a']['val'] == '2a'
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_conditions
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the waits on Features conditions.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from threading import Thread
+
+from pytest import raises
+
+from lantz_core.features.feature import Feature
+from lantz_core.has_features import subsystem
+from lantz_core.conditions import ConditionPoller
+from lantz_core.errors import TimeoutError
+
+from .testing_tools import DummyParent
+
+
+class Ramp(DummyParent):
+    """Driver whose temperature increases by one at each read.
+
+    """
+    temperature = Feature(True)
+
+    state = subsystem()
+    with state as s:
+        s.mode = Feature(True)
+
+        @s
+        def _get_mode(self, feat):
+            return 'IDLE' if self.parent.reads > 3 else 'BUSY'
+
+    def __init__(self, caching_allowed=True):
+        super(Ramp, self).__init__(caching_allowed)
+        self.reads = 0
+
+    def _get_temperature(self, feat):
+        self.reads += 1
+        if self.reads > 100:
+            raise RuntimeError()
+        return self.reads
+
+
+def test_wait_until():
+    driver = Ramp()
+    driver.temperature
+    assert driver.wait_until('temperature', lambda t: t > 3,
+                             min_interval=0.001) == 4
+    assert driver.reads == 4
+    # The read value is cached.
+    assert driver.temperature == 4
+
+    assert driver.wait_until('state.mode', 'IDLE', min_interval=0.001) ==\
+        'IDLE'
+
+    with raises(TimeoutError):
+        driver.wait_until('temperature', lambda t: t < 0, 0.02,
+                          min_interval=0.001)
+
+    # Errors of the predicate and of the reads are propagated.
+    with raises(ZeroDivisionError):
+        driver.wait_until('temperature', lambda t: 1/0)
+    driver.reads = 100
+    with raises(RuntimeError):
+        driver.wait_until('temperature', 0)
+
+
+def test_wait_until_shared():
+    driver = Ramp()
+    results = []
+
+    def wait(threshold):
+        results.append(driver.wait_until('temperature',
+                                          lambda t: t >= threshold,
+                                          1, 0.005, 0.005, shared=True))
+
+    threads = [Thread(target=wait, args=(i,)) for i in (10, 5, 10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results.sort()
+    assert 5 <= results[0] and 10 <= results[1] == results[2]
+    # A single poll loop served the three waiters.
+    assert driver.reads < 15
+    assert not driver._pollers
+
+    with raises(TimeoutError):
+        driver.wait_until('temperature', lambda t: t < 0, 0.01, shared=True)
+
+
+def test_adaptive_interval():
+    poller = ConditionPoller(None, 'feat', 0.01, 0.08)
+    assert poller.next_interval(1) == 0.02
+    assert poller.next_interval(1) == 0.04
+    assert poller.next_interval(1) == 0.08
+    assert poller.next_interval(1) == 0.08
+    assert poller.next_interval(2) == 0.04
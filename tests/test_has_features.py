@@ -13,6 +13,7 @@ from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
 from pytest import raises
 
+from lantz_core import has_features
 from lantz_core.has_features import (subsystem, set_feat, channel, set_action)
 from lantz_core.subsystem import SubSystem
 from lantz_core.channel import Channel
@@ -36,6 +37,67 @@ def test_documenting_feature():
         'This is the docstring for the Feature test.'
 
 
+def test_lazy_documentation(monkeypatch):
+    """Test that the source is analysed only when a docstring is requested.
+
+    """
+    calls = []
+
+    def extract_docs(cls):
+        calls.append(cls)
+        return {'test': 'Feature doc', 'ss': 'Subsystem doc',
+                's.aux': 'Aux doc'}
+
+    monkeypatch.setattr(has_features, 'extract_docs', extract_docs)
+
+    class LazyDocTester(DummyParent):
+
+        test = Feature()
+        ss = subsystem()
+        with ss as s:
+            s.aux = Feature()
+
+    assert not calls
+    assert LazyDocTester.test.clone().__doc__ == 'Feature doc'
+    assert LazyDocTester.test.__doc__ == 'Feature doc'
+    assert LazyDocTester.ss.__doc__ == 'Subsystem doc'
+    assert LazyDocTester.ss.aux.__doc__ == 'Aux doc'
+    assert calls == [LazyDocTester]
+
+
+def test_eager_and_disabled_documentation(monkeypatch):
+    """Test the other policies of docstring extraction.
+
+    """
+    monkeypatch.setattr(has_features, 'DOC_EXTRACTION', 'eager')
+
+    class EagerDocTester(DummyParent):
+
+        #: Feature doc
+        test = Feature()
+
+    assert '_doc_source_' not in EagerDocTester.test.__dict__
+    assert EagerDocTester.test.__doc__ == 'Feature doc'
+
+    monkeypatch.setattr(has_features, 'DOC_EXTRACTION', None)
+
+    class NoDocTester(DummyParent):
+
+        #: Feature doc
+        test = Feature()
+        ss = subsystem()
+
+    assert NoDocTester.test.__doc__ != 'Feature doc'
+    assert not NoDocTester.ss.__doc__
+
+
+def test_feature_class_doc():
+    """Test that the docstring of Feature classes are preserved.
+
+    """
+    assert 'most basic instrument property' in Feature.__doc__
+
+
 # --- Test changing features defaults -----------------------------------------
 
 def test_set_feat():
@@ -614,6 +676,121 @@ def test_channel_declaration3():
             ch = channel()
 
 
+# --- Test command prefixes ---------------------------------------------------
+
+def test_subsystem_command_prefix():
+
+    class PrefixParent(DummyParent):
+
+        ss = subsystem(prefix=':SOUR')
+        with ss as s:
+            s.volt = Feature('VOLT?', 'VOLT {}')
+            s.err = Feature(':SYST:ERR?')
+            s.opc = Feature('*OPC?')
+            s.inner = subsystem(prefix='CURR')
+            with s.inner as i:
+                i.lev = Feature('LEV?')
+            s.default = subsystem()
+            with s.default as d:
+                d.freq = Feature('FREQ?')
+
+        ch = channel((1,), prefix=':OUTP{id}')
+        with ch as c:
+            c.state = Feature('STAT?')
+
+    d = PrefixParent()
+    assert d.ss.volt == ':SOUR:VOLT?'
+    d.ss.volt = 1
+    assert d.d_set_cmd == ':SOUR:VOLT {}'
+    assert d.ss.err == ':SYST:ERR?'
+    assert d.ss.opc == '*OPC?'
+    assert d.ss.inner.lev == ':SOUR:CURR:LEV?'
+    assert d.ss.default.freq == ':SOUR:FREQ?'
+    assert d.ch[1].state == ':OUTP{id}:STAT?'
+    assert d.d_get_kwargs == {'id': 1}
+
+    class PrefixChild(PrefixParent):
+
+        ss = subsystem()
+        with ss as s:
+            s.curr = Feature('CURR?')
+            s.volt = set_feat(getter='VOLT:LEV?')
+
+    d = PrefixChild()
+    assert d.ss.curr == ':SOUR:CURR?'
+    assert d.ss.volt == ':SOUR:VOLT:LEV?'
+
+
+# --- Test multiple features access --------------------------------------------
+
+class BatchParent(DummyParent):
+
+    a = Feature('a?', 'a {}')
+    b = Feature('b?', 'b {}')
+
+    ss = subsystem()
+    with ss as s:
+        s.c = Feature('c?', 'c {}')
+
+    ch = channel((1, 2))
+    with ch as c:
+        c.d = Feature('d?', 'd {}')
+
+    custom = Feature(True, True)
+
+    def __init__(self, caching_allowed=True):
+        super(BatchParent, self).__init__(caching_allowed)
+        self.get_requests = []
+        self.set_requests = []
+        self.custom_set = []
+
+    def default_get_features(self, requests):
+        self.get_requests.append(requests)
+        return super(BatchParent, self).default_get_features(requests)
+
+    def default_set_features(self, requests):
+        self.set_requests.append(requests)
+        return super(BatchParent, self).default_set_features(requests)
+
+    def _get_custom(self, feat):
+        return 'custom'
+
+    def _set_custom(self, feat, value):
+        self.custom_set.append(value)
+
+
+def test_read_features():
+    d = BatchParent()
+    d.b
+    assert d.read_features(['a', 'b', 'ss.c', 'custom']) ==\
+        {'a': 'a?', 'b': 'b?', 'ss.c': 'c?', 'custom': 'custom'}
+    assert len(d.get_requests) == 1
+    assert [r[1] for r in d.get_requests[0]] == ['a?', 'c?']
+    assert d.ss.c == 'c?'
+    assert d.d_get_called == 3
+
+
+def test_read_channel_features():
+    d = BatchParent()
+    d.get_requests = []
+    from lantz_core.features.feature import get_features
+    feat = type(d.ch[1]).d
+    assert get_features([(feat, d.ch[1]), (feat, d.ch[2])]) == ['d?', 'd?']
+    assert [r[2] for r in d.get_requests[0]] == [{'id': 1}, {'id': 2}]
+
+
+def test_write_features():
+    from collections import OrderedDict
+    d = BatchParent()
+    d.b = 2
+    d.write_features(OrderedDict([('a', 1), ('b', 2), ('custom', 4),
+                                  ('ss.c', 3)]))
+    assert [[r[1] for r in req] for req in d.set_requests] ==\
+        [['a {}'], ['c {}']]
+    assert d.custom_set == [4]
+    assert d.ss.check_cache() == {'c': 3}
+
+
 # --- Test cache handling -----------------------------------------------------
 
 class TestHasFeaturesCache(object):
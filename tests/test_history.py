@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_history
+    ~~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the recording of Features values.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from pytest import importorskip
+
+from lantz_core.features.scalars import Float
+from lantz_core.has_features import subsystem
+from lantz_core.history import FeatureHistory
+from lantz_core.unit import get_unit_registry
+
+from .testing_tools import DummyParent
+
+np = importorskip('numpy')
+
+
+class Recorded(DummyParent):
+
+    voltage = Float('VOLT?', 'VOLT {}', unit='V')
+
+    output = subsystem()
+    with output as o:
+        o.current = Float('CURR?', 'CURR {}')
+
+    def __init__(self, caching_allowed=True):
+        super(Recorded, self).__init__(caching_allowed)
+        self.value = 1.0
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        super(Recorded, self).default_get_feature(feat, cmd, *args, **kwargs)
+        return self.value
+
+
+class TestFeatureHistory(object):
+
+    def test_append_and_get(self):
+        h = FeatureHistory(5)
+        for i in range(3):
+            h.append(float(i), timestamp=10. + i)
+        assert len(h) == 3
+        times, values = h.get()
+        np.testing.assert_array_equal(times, [10., 11., 12.])
+        np.testing.assert_array_equal(values, [0., 1., 2.])
+
+    def test_wrap_around(self):
+        h = FeatureHistory(4)
+        for i in range(7):
+            h.append(float(i), timestamp=float(i))
+        assert len(h) == 4
+        times, values = h.get()
+        np.testing.assert_array_equal(values, [3., 4., 5., 6.])
+        times, values = h.get(start=4, stop=5.5)
+        np.testing.assert_array_equal(times, [4., 5.])
+        np.testing.assert_array_equal(values, [4., 5.])
+        # Window spanning the wrap point of the buffer.
+        times, values = h.get(start=3.5)
+        np.testing.assert_array_equal(values, [4., 5., 6.])
+
+    def test_quantity(self):
+        h = FeatureHistory(2)
+        h.append(get_unit_registry().Quantity(2., 'V'))
+        assert h.get()[1][0] == 2.
+
+    def test_clear(self):
+        h = FeatureHistory(2)
+        h.append(1.)
+        h.clear()
+        assert len(h) == 0
+        assert len(h.get()[0]) == 0
+
+    def test_decimate(self):
+        h = FeatureHistory(100)
+        for i in range(10):
+            h.append(float(i % 3), timestamp=float(i))
+        times, mins, maxs = h.decimate(20)
+        np.testing.assert_array_equal(mins, maxs)
+        assert len(times) == 10
+
+        times, mins, maxs = h.decimate(2)
+        np.testing.assert_array_equal(times, [2., 7.])
+        np.testing.assert_array_equal(mins, [0., 0.])
+        np.testing.assert_array_equal(maxs, [2., 2.])
+
+        times, mins, maxs = h.decimate(2, start=6)
+        np.testing.assert_array_equal(times, [6.5, 8.5])
+        np.testing.assert_array_equal(mins, [0., 0.])
+        np.testing.assert_array_equal(maxs, [1., 2.])
+
+
+def test_record_history():
+    driver = Recorded()
+    history = driver.record_history('voltage', depth=3)
+    driver.voltage
+    driver.voltage = 2.
+    driver.clear_cache()
+    driver.value = 3.
+    driver.voltage
+    np.testing.assert_array_equal(history.get()[1], [1., 2., 3.])
+    times = history.get()[0]
+    assert np.all(np.diff(times) >= 0)
+
+    history.stop()
+    driver.voltage = 4.
+    assert len(history) == 3
+
+
+def test_record_history_without_cache():
+    driver = Recorded(False)
+    history = driver.record_history('voltage', depth=3)
+    driver.voltage
+    driver.voltage
+    driver.voltage = 2.
+    np.testing.assert_array_equal(history.get()[1], [1., 1., 2.])
+
+
+def test_record_history_subsystem():
+    driver = Recorded()
+    history = driver.record_history('output.current')
+    driver.output.current = 5.
+    np.testing.assert_array_equal(history.get()[1], [5.])
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_import_time
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Module checking that importing lantz_core and drivers stays cheap.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+import os
+import sys
+import json
+import subprocess
+
+DRIVER = '''
+from lantz_core import Action
+from lantz_core.features import Float, Unicode
+from lantz_core.has_features import HasFeatures, subsystem
+from lantz_core.limits import FloatLimitsValidator
+
+
+class UnitDriver(HasFeatures):
+
+    voltage = Float('VOLT?', 'VOLT {}', unit='V', limits=(0, 10))
+    current = Float('CURR?', 'CURR {}', unit='A',
+                    limits=FloatLimitsValidator(0, 1, unit='mA'))
+    ident = Unicode('*IDN?', extract='{},{}')
+
+    output = subsystem()
+    with output as o:
+        o.frequency = Float('FREQ?', 'FREQ {}', unit='Hz')
+
+    @Action(units=('V', ('V', None)))
+    def ramp(self, value, rate):
+        pass
+'''
+
+SCRIPT = '''
+import sys, json
+sys.path.insert(0, {path!r})
+import lantz_core
+import import_time_driver
+from lantz_core import unit
+print(json.dumps({{'registry': unit.UNIT_REGISTRY is not None,
+                   'modules': sorted(m for m in ('pint', 'stringparser',
+                                                 'pyvisa')
+                                     if m in sys.modules)}}))
+'''
+
+
+def run_import(tmpdir):
+    tmpdir.join('import_time_driver.py').write(DRIVER)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE='1')
+    out = subprocess.check_output([sys.executable, '-c',
+                                   SCRIPT.format(path=str(tmpdir))], env=env)
+    return json.loads(out.decode('utf-8'))
+
+
+def test_heavy_dependencies_not_imported(tmpdir):
+    result = run_import(tmpdir)
+    assert result['modules'] == []
+    assert not result['registry']
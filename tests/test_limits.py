@@ -11,7 +11,7 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
-from pytest import raises, mark
+from pytest import raises, mark, importorskip
 
 from lantz_core.limits import IntLimitsValidator, FloatLimitsValidator
 from lantz_core import unit
@@ -90,6 +90,13 @@ class TestIntLimitsValidator(object):
             IntLimitsValidator(1, step=1.0)
 
 
+    def test_validate_many(self):
+        iv = IntLimitsValidator(1, 9, 2)
+        assert iv.validate_many([1, 2, 3, 10]) == [1, 3]
+        np = importorskip('numpy')
+        assert iv.validate_many(np.arange(-1, 11)) == [0, 1, 3, 5, 7, 9, 11]
+
+
 class TestFloatLimitsValidator(object):
 
     def test_validate_larger(self):
@@ -167,3 +174,19 @@ class TestFloatLimitsValidator(object):
         assert fv.validate(0.1)
         assert fv.validate(100*u.parse_expression('mV'))
         assert not fv.validate(0.1*u.parse_expression('kV'))
+
+    def test_validate_many(self):
+        fv = FloatLimitsValidator(max=1.0, step=0.1)
+        assert fv.validate_many([0.1, 0.15, 1.1]) == [1, 2]
+        np = importorskip('numpy')
+        assert fv.validate_many(np.array([0.1, 0.15, 1.1, -0.3])) == [1, 2]
+
+    @mark.skipif(unit.UNIT_SUPPORT is False, reason="Requires Pint")
+    def test_validate_many_with_unit(self):
+        fv = FloatLimitsValidator(-1.0, 1.0, unit='V')
+        u = get_unit_registry()
+        mV = u.parse_units('mV')
+        assert fv.validate_many([10, 2000], mV) == [1]
+        np = importorskip('numpy')
+        assert fv.validate_many(np.array([10, 2000]), mV) == [1]
+        assert fv.validate_many(np.array([10, 2000])*mV) == [1]
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_observers
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the observation of the Features cache.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from time import sleep
+
+from lantz_core.features.feature import Feature
+from lantz_core.features.scalars import Float
+from lantz_core.has_features import subsystem
+
+from .testing_tools import DummyParent
+
+
+class Observed(DummyParent):
+
+    voltage = Float('VOLT?', 'VOLT {}')
+    current = Feature('CURR?', 'CURR {}')
+
+    output = subsystem()
+    with output as o:
+        o.state = Feature('STATE?', 'STATE {}')
+        o.mode = Feature('MODE?', 'MODE {}')
+
+    def __init__(self, caching_allowed=True):
+        super(Observed, self).__init__(caching_allowed)
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        super(Observed, self).default_get_feature(feat, cmd, *args, **kwargs)
+        return 1.0 if cmd == 'VOLT?' else cmd
+
+
+def test_observe_feature():
+    driver = Observed()
+    events = []
+    observer = driver.observe('voltage', lambda n, v: events.append((n, v)))
+    driver.current
+    driver.voltage
+    driver.voltage = 2
+    # Cached values do not trigger notifications.
+    driver.voltage
+    assert events == [('voltage', 1.0), ('voltage', 2)]
+
+    observer.cancel()
+    driver.voltage = 3
+    assert len(events) == 2
+    assert not driver._observers
+
+
+def test_observe_without_cache():
+    driver = Observed(False)
+    events = []
+    driver.observe('*', lambda n, v: events.append((n, v)))
+    driver.voltage
+    driver.voltage = 2
+    driver.current = 'a'
+    driver.read_features(['voltage', 'current'])
+    assert events == [('voltage', 1.0), ('voltage', 2), ('current', 'a'),
+                      ('voltage', 1.0), ('current', 'CURR?')]
+    assert driver._cache == {}
+
+
+def test_observe_patterns_and_subsystems():
+    driver = Observed()
+    events = []
+
+    def callback(name, value):
+        events.append(name)
+
+    driver.observe('*', callback)
+    driver.observe('output', callback)
+    driver.observe('output.m*', callback)
+    driver.current
+    driver.output.state
+    driver.output.mode = 1
+    assert events == ['current', 'output.state', 'output.mode',
+                      'output.mode']
+
+
+def test_observe_coalescing():
+    driver = Observed()
+    events = []
+    driver.observe('current', lambda n, v: events.append(v), coalesce=0.02)
+    for i in range(10):
+        driver.current = i
+    assert events == []
+    sleep(0.1)
+    assert events == [9]
+
+
+def test_observer_errors():
+    driver = Observed()
+    events = []
+
+    def failing(name, value):
+        raise ValueError()
+
+    driver.observe('current', failing)
+    driver.observe('current', lambda n, v: events.append(v))
+    driver.current = 1
+    assert events == [1]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_poller
+    ~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the background Features poller.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from time import sleep
+
+from pytest import yield_fixture
+
+from lantz_core.features.feature import Feature
+from lantz_core.has_features import subsystem
+from lantz_core.poller import FeaturePoller, get_poller
+
+from .testing_tools import DummyParent
+
+
+class Polled(DummyParent):
+
+    voltage = Feature('VOLT?')
+    current = Feature('CURR?')
+
+    output = subsystem()
+    with output as o:
+        o.state = Feature('STATE?')
+
+    def __init__(self, caching_allowed=True):
+        super(Polled, self).__init__(caching_allowed)
+        self.batches = []
+
+    def default_get_features(self, requests):
+        self.batches.append([cmd for _, cmd, _ in requests])
+        return super(Polled, self).default_get_features(requests)
+
+
+@yield_fixture
+def poller():
+    poller = FeaturePoller()
+    yield poller
+    poller.stop()
+
+
+def test_merged_subscriptions(poller):
+    driver = Polled()
+    values = []
+    subs = [poller.subscribe(driver, 'voltage', 0.05,
+                             lambda n, v, t: values.append((n, v)))
+            for _ in range(10)]
+    sleep(0.22)
+    for s in subs:
+        s.cancel()
+    reads = len(driver.batches)
+    assert 3 <= reads <= 6
+    assert len(values) == 10*reads
+    assert values[0] == ('voltage', 'VOLT?')
+
+    # Once unsubscribed the driver is not polled anymore.
+    sleep(0.1)
+    assert len(driver.batches) == reads
+    assert not poller._schedules
+
+
+def test_batched_reads(poller):
+    driver = Polled()
+    values = {}
+
+    def callback(name, value, timestamp):
+        values[name] = value
+
+    for name in ('voltage', 'current', 'output.state'):
+        poller.subscribe(driver, name, 0.05, callback)
+    sleep(0.12)
+    poller.stop()
+    assert values == {'voltage': 'VOLT?', 'current': 'CURR?',
+                      'output.state': 'STATE?'}
+    assert all(len(b) == 3 for b in driver.batches)
+
+
+def test_min_spacing(poller):
+    driver = Polled()
+    poller.set_min_spacing(driver, 0.1)
+    poller.subscribe(driver, 'voltage', 0.01, lambda n, v, t: None)
+    sleep(0.25)
+    poller.stop()
+    assert len(driver.batches) <= 3
+
+
+def test_callback_errors(poller):
+    driver = Polled()
+    values = []
+
+    def failing(name, value, timestamp):
+        raise ValueError()
+
+    poller.subscribe(driver, 'voltage', 0.02, failing)
+    poller.subscribe(driver, 'voltage', 0.02,
+                     lambda n, v, t: values.append(v))
+    sleep(0.05)
+    assert values
+
+
+def test_get_poller():
+    assert get_poller() is get_poller()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_profiles
+    ~~~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the binary configuration profiles.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+import os
+import stat
+from collections import OrderedDict
+
+from pytest import raises, mark
+
+from lantz_core import profiles
+from lantz_core.features.feature import Feature
+from lantz_core.profiles import (dumps, loads, ProfileStore, MAGIC,
+                                 PROFILE_VERSION)
+from lantz_core.unit import UNIT_SUPPORT, get_unit_registry
+
+from .test_snapshot import Stateful
+
+
+class Identified(Stateful):
+
+    idn = Feature('IDN?')
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        if cmd == 'IDN?':
+            return 'Dummy'
+        return super(Identified, self).default_get_feature(feat, cmd, *args,
+                                                           **kwargs)
+
+
+def test_round_trip():
+    values = OrderedDict([('none', None), ('bool', True), ('int', -3),
+                          ('big', 2**70), ('float', 1.5), ('text', 'é'),
+                          ('bytes', b'\x00\x01'), ('list', [1, 'a']),
+                          ('tuple', (1.0,)), ('ch', {1: {'a': False}})])
+    profile = loads(dumps(values, 'pkg.Driver', 10.))
+    assert profile['driver'] == 'pkg.Driver'
+    assert profile['timestamp'] == 10.
+    assert profile['values'] == values
+    assert list(profile['values']) == list(values)
+    assert isinstance(profile['values']['tuple'], tuple)
+
+
+@mark.skipif(not UNIT_SUPPORT, reason='Requires Pint')
+def test_round_trip_quantity():
+    q = get_unit_registry().Quantity(2.5, 'mV')
+    assert loads(dumps({'q': q}))['values']['q'] == q
+
+
+def test_compression():
+    values = dict(('feat{}'.format(i), 'value') for i in range(100))
+    data = dumps(values)
+    assert data[:4] == MAGIC
+    assert len(data) < 100*len('feat00value')
+
+
+def test_invalid_data():
+    data = dumps({'a': 1})
+    with raises(ValueError):
+        loads(b'LZ')
+    with raises(ValueError):
+        loads(b'XXXX' + data[4:])
+    with raises(ValueError):
+        loads(data[:4] + bytes(bytearray([PROFILE_VERSION + 1])) + data[5:])
+    with raises(TypeError):
+        dumps({'a': object()})
+
+
+def test_save_restore_profile(tmpdir):
+    path = str(tmpdir.join('profile.lzp'))
+    driver = Identified()
+    driver.save_profile(path)
+    profile = loads(open(path, 'rb').read())
+    assert profile['driver'].endswith('.Identified')
+    # Read-only Features are not stored.
+    assert 'idn' not in profile['values']
+    assert profile['values']['ch'][2] == {'gain': 1}
+
+    driver.range = 4.0
+    driver.ch[2].gain = 3
+    driver.written = []
+    res = driver.restore_profile(path)
+    assert driver.written == ['RANGE', 'GAIN2', 'LEVEL']
+    assert set(res.changes) == set(['range', 'ch.2.gain', 'level'])
+
+    # Nothing is written when the profile matches the cache.
+    driver.written = []
+    driver.restore_profile(path)
+    assert driver.written == []
+
+    # All the values are written in two batches (the mode and level depend
+    # on the range).
+    driver.batches = []
+    res = driver.restore_profile(path, force=True)
+    assert sorted(driver.written) == sorted(['MODE', 'LEVEL', 'RANGE',
+                                             'STATE', 'GAIN1', 'GAIN2'])
+    assert driver.batches == [4, 2]
+    assert res.changes['range'] == (2.0, 2.0)
+
+
+def test_restore_profile_other_driver(tmpdir):
+    path = str(tmpdir.join('profile.lzp'))
+    Stateful().save_profile(path)
+    # A profile of a base class can be restored.
+    driver = Identified()
+    driver.restore_profile(path)
+
+    Identified().save_profile(path)
+    driver = Stateful()
+    with raises(ValueError):
+        driver.restore_profile(path)
+    driver.range = 5.0
+    driver.restore_profile(path, strict=False)
+    assert driver.range == 2.0
+
+
+def test_save_profile_atomic(tmpdir, monkeypatch):
+    path = tmpdir.join('profile.lzp')
+    driver = Stateful()
+    driver.save_profile(str(path))
+    data = path.read_binary()
+
+    def fail(src, dst):
+        raise OSError()
+
+    monkeypatch.setattr(profiles, '_replace', fail)
+    driver.range = 5.0
+    with raises(OSError):
+        driver.save_profile(str(path))
+    assert path.read_binary() == data
+    assert tmpdir.listdir() == [path]
+
+
+@mark.skipif(os.name == 'nt', reason='POSIX permissions')
+def test_save_profile_mode(tmpdir):
+    path = str(tmpdir.join('profile.lzp'))
+    umask = os.umask(0o022)
+    try:
+        Stateful().save_profile(path)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    os.chmod(path, 0o640)
+    Stateful().save_profile(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_profile_store(tmpdir):
+    store = ProfileStore(str(tmpdir.join('profiles')))
+    driver = Stateful()
+    store.save(driver, 'b')
+    driver.range = 5.0
+    store.save(driver, 'a')
+    assert store.names == ['a', 'b']
+    assert store.load('a')['values']['range'] == 5.0
+
+    store.restore(driver, 'b')
+    assert driver.range == 2.0
+
+    store.remove('a')
+    assert store.names == ['b']
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_snapshot
+    ~~~~~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the capture of all the Features values.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+from threading import Event
+
+from pytest import raises
+
+from lantz_core.action import Action
+from lantz_core.features.feature import Feature
+from lantz_core.features.scalars import Float
+from lantz_core.has_features import channel, subsystem
+from lantz_core.limits import FloatLimitsValidator
+from lantz_core.snapshot import snapshot_all
+
+from .testing_tools import DummyParent
+
+
+class Snapped(DummyParent):
+
+    voltage = Feature('VOLT?', 'VOLT {}')
+    trigger = Feature(setter='TRIG')
+
+    output = subsystem()
+    with output as o:
+        o.state = Feature('STATE?')
+
+    ch = channel((1, 2))
+    with ch as c:
+        c.gain = Feature('GAIN?')
+        c.offset = Feature('OFFS?')
+
+    def __init__(self, caching_allowed=True):
+        super(Snapped, self).__init__(caching_allowed)
+        self.batches = []
+        self.bulk_ids = []
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        super(Snapped, self).default_get_feature(feat, cmd, *args, **kwargs)
+        if 'id' in kwargs:
+            return '{}{}'.format(cmd, kwargs['id'])
+        return cmd
+
+    def default_get_features(self, requests):
+        self.batches.append([cmd for _, cmd, _ in requests])
+        return super(Snapped, self).default_get_features(requests)
+
+    def _bulk_get_ch_offset(self, feat, ids):
+        self.bulk_ids.append(list(ids))
+        return ['bulk{}'.format(i) for i in ids]
+
+
+def test_snapshot():
+    driver = Snapped()
+    driver.voltage
+    snap = driver.snapshot()
+
+    assert snap.values == {'voltage': 'VOLT?',
+                           'output': {'state': 'STATE?'},
+                           'ch': {1: {'gain': 'GAIN?1', 'offset': 'bulk1'},
+                                  2: {'gain': 'GAIN?2', 'offset': 'bulk2'}}}
+    assert list(snap.values) == ['voltage', 'output', 'ch']
+    assert list(snap.values['ch'][1]) == ['gain', 'offset']
+    # The cached value is reused and the other queries are grouped.
+    assert driver.batches == [['STATE?', 'GAIN?', 'GAIN?']]
+    assert driver.bulk_ids == [[1, 2]]
+    assert snap.cached == 1
+    assert snap.queried == 5
+    assert snap.duration >= 0
+    assert snap.flatten() == {'voltage': 'VOLT?', 'output.state': 'STATE?',
+                              'ch.1.gain': 'GAIN?1', 'ch.1.offset': 'bulk1',
+                              'ch.2.gain': 'GAIN?2', 'ch.2.offset': 'bulk2'}
+
+    driver.batches = []
+    snap = driver.snapshot()
+    assert driver.batches == []
+    assert snap.queried == 0
+
+    snap = driver.snapshot(refresh=True)
+    assert snap.cached == 0
+    assert driver.batches == [['VOLT?', 'STATE?', 'GAIN?', 'GAIN?']]
+
+
+def test_snapshot_all():
+    # Each driver waits for the other one to start reading.
+    events = [Event(), Event()]
+
+    class Waiting(Snapped):
+        def default_get_features(self, requests):
+            events[self.index].set()
+            assert events[1 - self.index].wait(1)
+            return super(Waiting, self).default_get_features(requests)
+
+    drivers = [Waiting(), Waiting()]
+    for i, d in enumerate(drivers):
+        d.index = i
+    snaps = snapshot_all(drivers)
+    assert [s.driver for s in snaps] == drivers
+    assert snaps[0].values['voltage'] == 'VOLT?'
+
+
+def test_snapshot_all_error():
+
+    # Failing to list the channels prevents the capture.
+    class Failing(Snapped):
+        ch = channel('_list_ch')
+
+        def _list_ch(self):
+            raise ValueError()
+
+    with raises(ValueError):
+        snapshot_all([Snapped(), Failing()])
+
+
+def test_snapshot_errors():
+
+    class Failing(Snapped):
+        def default_get_feature(self, feat, cmd, *args, **kwargs):
+            if cmd in ('STATE?', 'GAIN?') and kwargs.get('id') != 2:
+                raise ValueError(cmd)
+            return super(Failing, self).default_get_feature(feat, cmd,
+                                                            *args, **kwargs)
+
+        def default_get_features(self, requests):
+            raise ValueError()
+
+        def _bulk_get_ch_offset(self, feat, ids):
+            raise ValueError()
+
+    snap = Failing().snapshot()
+    assert snap.values == {'voltage': 'VOLT?', 'output': {},
+                           'ch': {1: {'offset': 'OFFS?1'},
+                                  2: {'gain': 'GAIN?2', 'offset': 'OFFS?2'}}}
+    assert list(snap.errors) == ['output.state', 'ch.1.gain']
+    assert all(isinstance(e, ValueError) for e in snap.errors.values())
+
+
+def test_snapshot_refresh_keeps_actions_cache():
+
+    class Cached(Snapped):
+        calls = 0
+
+        @Action(cache=True)
+        def identify(self):
+            Cached.calls += 1
+            return 'ID'
+
+    driver = Cached()
+    driver.identify()
+    driver.snapshot(refresh=True)
+    driver.identify()
+    assert Cached.calls == 1
+    assert driver.identify.cache_stats == {'hits': 1, 'misses': 1}
+
+
+class Stateful(DummyParent):
+    """Driver storing the values set in a dict.
+
+    """
+    mode = Feature('MODE?', 'MODE {}', checks=(None, 'driver.range > 1'))
+    level = Float('LEVEL?', 'LEVEL {}', limits='level')
+    range = Float('RANGE?', 'RANGE {}', discard={'features': ('level',),
+                                                 'limits': ('level',)})
+    trigger = Feature(setter='TRIG {}')
+
+    output = subsystem()
+    with output as o:
+        o.state = Feature('STATE?', 'STATE {}')
+
+    ch = channel((1, 2))
+    with ch as c:
+        c.gain = Feature('GAIN?', 'GAIN {}')
+
+    def __init__(self, caching_allowed=True):
+        super(Stateful, self).__init__(caching_allowed)
+        self.state = {'MODE': 'A', 'LEVEL': 1.0, 'RANGE': 2.0, 'STATE': 'ON',
+                      'GAIN1': 1, 'GAIN2': 1}
+        self.written = []
+        self.batches = []
+
+    def _key(self, cmd, kwargs):
+        return cmd.split('?')[0].split(' ')[0] + str(kwargs.get('id', ''))
+
+    def default_get_feature(self, feat, cmd, *args, **kwargs):
+        super(Stateful, self).default_get_feature(feat, cmd, *args, **kwargs)
+        return self.state[self._key(cmd, kwargs)]
+
+    def default_set_feature(self, feat, cmd, *args, **kwargs):
+        super(Stateful, self).default_set_feature(feat, cmd, *args, **kwargs)
+        key = self._key(cmd, kwargs)
+        self.state[key] = args[0]
+        self.written.append(key)
+
+    def default_set_features(self, requests):
+        self.batches.append(len(requests))
+        return super(Stateful, self).default_set_features(requests)
+
+    def _limits_level(self):
+        return FloatLimitsValidator(0, self.range)
+
+
+def test_apply_state():
+    driver = Stateful()
+    target = driver.snapshot().values
+    target['mode'] = 'B'
+    target['level'] = 5.0
+    target['range'] = 10.0
+    target['ch'][2]['gain'] = 3
+    target['trigger'] = 1
+    driver.batches = []
+
+    res = driver.apply_state(target)
+    # The range is set first as it affects the limits of the level and the
+    # checks of the mode.
+    assert driver.written == ['RANGE', 'GAIN2', 'TRIG', 'MODE', 'LEVEL']
+    assert driver.batches == [3, 2]
+    assert res.changes == {'range': (2.0, 10.0), 'ch.2.gain': (1, 3),
+                           'trigger': (None, 1), 'mode': ('A', 'B'),
+                           'level': (1.0, 5.0)}
+    assert sorted(res.unchanged) == ['ch.1.gain', 'output.state']
+    assert res.duration >= 0
+
+    driver.written = []
+    assert not driver.apply_state(target).changes
+    assert driver.written == []
+
+
+def test_apply_state_discarded():
+    # The level is written again when the range changes even if it already
+    # has the right value.
+    driver = Stateful()
+    driver.apply_state({'range': 5.0, 'level': 1.0})
+    assert driver.written == ['RANGE', 'LEVEL']
+
+
+def test_apply_state_refresh():
+    driver = Stateful()
+    driver.snapshot()
+    driver.state['STATE'] = 'OFF'
+    driver.apply_state({'output': {'state': 'ON'}})
+    assert driver.written == []
+    driver.apply_state({'output': {'state': 'ON'}}, refresh=True)
+    assert driver.written == ['STATE']
+
+
+def test_apply_state_snapshot():
+    driver = Stateful()
+    snap = driver.snapshot()
+    driver.range = 4.0
+    driver.written = []
+    res = driver.apply_state(snap)
+    assert driver.written == ['RANGE', 'LEVEL']
+    assert res.changes['range'] == (4.0, 2.0)
+
+
+def test_apply_state_errors():
+    driver = Stateful()
+    with raises(AttributeError):
+        driver.apply_state({'unknown': 1})
+    with raises(ValueError):
+        driver.apply_state({'level': 5.0})
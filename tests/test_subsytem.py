@@ -61,3 +61,39 @@ def test_ss_reop():
     a = SSParent()
     a.ss.reopen_connection()
     assert a.ropen_called == 1
+
+
+class NestedParent(DummyParent):
+
+    ss = subsystem()
+    with ss as s:
+        s.inner = subsystem()
+
+
+def test_ss_direct_routing():
+    a = NestedParent()
+    inner = a.ss.inner
+    assert inner.lock is a.lock
+    inner.default_get_feature(None, 'Test', a=2)
+    assert a.d_get_called == 1
+    assert a.d_get_kwargs == {'a': 2}
+    assert inner.default_set_feature == a.default_set_feature
+    inner.reopen_connection()
+    assert a.ropen_called == 1
+
+
+def test_ss_custom_routing():
+
+    class CustomParent(DummyParent):
+
+        ss = subsystem()
+        with ss as s:
+            s.inner = subsystem()
+
+            @s
+            def default_get_feature(self, feat, cmd, *args, **kwargs):
+                return 'custom'
+
+    a = CustomParent()
+    assert a.ss.inner.default_get_feature(None, 'Test') == 'custom'
+    assert a.d_get_called == 0
@@ -11,10 +11,19 @@
 """
 from __future__ import (division, unicode_literals, print_function,
                         absolute_import)
+import sys
+
 from pytest import raises, yield_fixture, mark
 
 from lantz_core import unit
-from lantz_core.unit import set_unit_registry, get_unit_registry
+from lantz_core.action import Action
+from lantz_core.features.scalars import Float
+from lantz_core.limits import FloatLimitsValidator
+from lantz_core.unit import (set_unit_registry, get_unit_registry,
+                             is_quantity, get_conversion_factor,
+                             convert_magnitude, magnitude_in)
+
+from .testing_tools import DummyParent
 
 try:
     from pint import UnitRegistry
@@ -37,9 +46,69 @@ def test_set_unit_registry(teardown):
     assert get_unit_registry() is ureg
 
 
+def test_pint_import_failure(teardown, monkeypatch):
+    # A None entry in sys.modules makes the import fail.
+    monkeypatch.setitem(sys.modules, 'pint', None)
+    monkeypatch.setattr(unit, 'UNIT_SUPPORT', True)
+    with raises(ImportError):
+        get_unit_registry()
+    assert unit.UNIT_SUPPORT is False
+
+
+def test_features_pint_import_failure(teardown, monkeypatch):
+    # Units are declared while Pint seems available but fail to load later.
+    monkeypatch.setattr(unit, 'UNIT_SUPPORT', True)
+
+    class Dummy(DummyParent):
+        volt = Float('1.5', 'V {}', unit='V', limits=(0, 10))
+
+        @Action(units=('V', (None, 'V')))
+        def ramp(self, value):
+            return value
+
+    monkeypatch.setitem(sys.modules, 'pint', None)
+    d = Dummy(True)
+    assert d.volt == 1.5
+    d.volt = 2.0
+    assert d.volt == 2.0
+    with raises(ValueError):
+        d.volt = 11.0
+    assert d.ramp(1.0) == 1.0
+    assert FloatLimitsValidator(0, 1, unit='V').validate(0.5)
+    assert unit.UNIT_SUPPORT is False
+
+
 @mark.skipif(unit.UNIT_SUPPORT is False, reason="Requires Pint")
 def test_reset_unit_registry(teardown):
     ureg = UnitRegistry()
     set_unit_registry(ureg)
     with raises(ValueError):
         set_unit_registry(ureg)
+
+
+@mark.skipif(unit.UNIT_SUPPORT is False, reason="Requires Pint")
+def test_is_quantity(teardown):
+    assert not is_quantity(1.0)
+    assert is_quantity(get_unit_registry().parse_expression('1 V'))
+
+
+@mark.skipif(unit.UNIT_SUPPORT is False, reason="Requires Pint")
+def test_conversion_factors(teardown):
+    ureg = get_unit_registry()
+    mV = ureg.parse_units('mV')
+    V = ureg.parse_expression('V')
+    assert get_conversion_factor(mV, V) == 0.001
+    assert get_conversion_factor(V, V) == 1
+    assert (getattr(mV, '_units'), getattr(V, '_units')) in unit._FACTORS
+    assert convert_magnitude(2, V, mV) == 2000
+    assert magnitude_in(ureg.parse_expression('3 mV'), V) == 0.003
+
+
+@mark.skipif(unit.UNIT_SUPPORT is False, reason="Requires Pint")
+def test_offset_conversion(teardown):
+    ureg = get_unit_registry()
+    degC = ureg.parse_units('degC')
+    K = ureg.parse_units('K')
+    assert get_conversion_factor(degC, K) is None
+    assert convert_magnitude(0, degC, K) == 273.15
+    assert magnitude_in(ureg.Quantity(10, degC), K) == 283.15
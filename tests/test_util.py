@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+    tests.test_util
+    ~~~~~~~~~~~~~~~
+
+    Module dedicated to testing the utility functions.
+
+    :copyright: 2015 by Lantz Authors, see AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+from __future__ import (division, unicode_literals, print_function,
+                        absolute_import)
+
+from pytest import raises
+
+from lantz_core.util import build_checker, poll_until
+from lantz_core.errors import TimeoutError
+
+
+class Counter(object):
+
+    def __init__(self, value):
+        self.value = value
+        self.count = 0
+
+    @property
+    def val(self):
+        self.count += 1
+        return self.value
+
+
+def test_build_checker_memoization():
+    checker = build_checker('value > 0', '(driver, value)')
+    assert build_checker('value > 0', '(driver, value)') is checker
+    assert build_checker('value > 0', '(driver, value)', 'value') is not checker
+
+
+def test_build_checker_invalid_syntax():
+    with raises(SyntaxError) as excinfo:
+        build_checker('value >; value < 2', '(driver, value)')
+    assert 'value >' in str(excinfo.value)
+
+
+def test_build_checker_return():
+    checker = build_checker('driver.val; value < 3', '(driver, value)',
+                            'value')
+    assert checker(Counter(True), 2) == 2
+
+
+def test_build_checker_messages():
+    checker = build_checker('driver.val < value; 1 < value < 3; driver.val',
+                            '(driver, value)')
+    driver = Counter(2)
+    with raises(AssertionError) as excinfo:
+        checker(driver, 1)
+    assert str(excinfo.value) == 'Assertion driver.val < value failed: 2 < 1'
+    # The operands are evaluated only once.
+    assert driver.count == 1
+
+    with raises(AssertionError) as excinfo:
+        checker(Counter(2), 3)
+    assert str(excinfo.value) == 'Assertion 1 < value < 3 failed'
+
+    with raises(AssertionError) as excinfo:
+        checker(Counter(0), 2)
+    assert str(excinfo.value) == 'Assertion driver.val failed'
+
+    checker = build_checker('value not in driver.val', '(driver, value)')
+    with raises(AssertionError) as excinfo:
+        checker(Counter((1, 2)), 1)
+    assert str(excinfo.value).endswith(': 1 not in (1, 2)')
+
+
+def test_build_checker_messages_braces():
+    # Set and dict literals must not break the formatting of the message.
+    checker = build_checker('value in {1, 2}', '(self, driver, value)',
+                            'value')
+    with raises(AssertionError) as excinfo:
+        checker(None, None, 3)
+    assert (str(excinfo.value) ==
+            'Assertion value in {1, 2} failed: 3 in {1, 2}')
+
+    checker = build_checker('{"a": value}["a"] % 2', '(value)')
+    with raises(AssertionError) as excinfo:
+        checker(4)
+    assert str(excinfo.value) == 'Assertion {"a": value}["a"] % 2 failed'
+
+
+def test_poll_until():
+    answers = [0, None, 2]
+    calls = []
+
+    def condition():
+        calls.append(None)
+        return answers.pop(0)
+
+    assert poll_until(condition, 1, 0.001, 0.002) == 2
+    assert len(calls) == 3
+
+    with raises(TimeoutError):
+        poll_until(lambda: False, 0.01)